@@ -0,0 +1,260 @@
+import math
+
+import numpy as np
+
+# =================================================================================
+#                   COMMON AVAILABILITY: IN-MEMORY INTERVAL INDEX
+# =================================================================================
+# Every registered user gets one row of start/end minutes per weekday in a
+# NumPy array. A per-day, per-minute coverage count for the default 75% quorum
+# is kept up to date incrementally, so one /set_availability call only
+# touches the day it changed and only the common_availability rows that
+# actually differ get written back. Ad-hoc queries (other quorums, minimum
+# slot lengths, one major) are answered from the same arrays in a single
+# vectorized pass without going back to SQLite.
+
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday',
+                'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_INDEX = {day: i for i, day in enumerate(DAYS_OF_WEEK)}
+MINUTES_PER_DAY = 24 * 60
+
+# Share of registered users that must be free for a slot to count as common
+QUORUM = 0.75
+
+
+def time_to_minutes(time_str):
+    if time_str == 'N/A':
+        return None
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+
+def minutes_to_time(minutes):
+    hours = minutes // 60
+    mins = minutes % 60
+    return f"{hours:02d}:{mins:02d}"
+
+
+def _required(quorum, users):
+    # Rounded first so e.g. 0.07 * 100 == 7.000000000000001 doesn't ceil to 8
+    return math.ceil(round(quorum * users, 9))
+
+
+def _runs(mask):
+    """
+    Turns a (days x minutes) boolean mask into {day_index: [(start, end), ...]}
+    of maximal half-open runs of True.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_days, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    runs = {}
+    for day, start, end in zip(start_days.tolist(), starts.tolist(), ends.tolist()):
+        runs.setdefault(day, []).append((start, end))
+    return runs
+
+
+class AvailabilityIndex:
+    """
+    Users x 7 arrays of interval start/end minutes (half-open [start, end),
+    start == end meaning unavailable) plus the common slots currently derived
+    from them for the default quorum.
+    """
+
+    def __init__(self, quorum=QUORUM, capacity=64):
+        self.quorum = quorum
+        self.rows = {}  # user_id -> row in the arrays below
+        self.major_ids = {}  # lower-cased degree_major -> small integer code
+        self.major_codes = np.zeros(capacity, dtype=np.int32)
+        self.starts = np.zeros((capacity, 7), dtype=np.int16)
+        self.ends = np.zeros((capacity, 7), dtype=np.int16)
+        self.coverage = np.zeros((7, MINUTES_PER_DAY), dtype=np.int32)
+        self.slots = {day: [] for day in DAYS_OF_WEEK}
+
+    @property
+    def total_users(self):
+        return len(self.rows)
+
+    @property
+    def required(self):
+        return _required(self.quorum, self.total_users)
+
+    def load(self, users, availability_rows, stored_slots=()):
+        """
+        Builds the index from (user_id, degree_major) and
+        (user_id, day, start_time, end_time) rows. stored_slots are the
+        (day, start_time, end_time) rows already in common_availability; the
+        returned changes bring that table in sync.
+        """
+        for user_id, major in users:
+            self._row(user_id, major)
+        for user_id, day, start, end in availability_rows:
+            if user_id in self.rows:
+                self._set(self.rows[user_id], DAY_INDEX[day], time_to_minutes(start), time_to_minutes(end))
+        for day, start, end in stored_slots:
+            self.slots[day].append((time_to_minutes(start), time_to_minutes(end)))
+        return self._rebuild(DAYS_OF_WEEK)
+
+    def set_user(self, user_id, major):
+        """
+        Adds or updates a registered user. Slots are only rebuilt when the
+        ceil(quorum * users) threshold actually moves.
+        """
+        old_required = self.required
+        self._row(user_id, major)
+        if self.required == old_required:
+            return {}
+        return self._rebuild(DAYS_OF_WEEK)
+
+    def set_interval(self, user_id, day, start, end):
+        """
+        Replaces one user's interval for a day (None for unavailable) and
+        returns the resulting slot changes for that day only.
+        """
+        if user_id not in self.rows:
+            return {}
+        self._set(self.rows[user_id], DAY_INDEX[day], start, end)
+        return self._rebuild([day])
+
+    def snapshot_user(self, user_id):
+        """What restore_user() needs to put user_id back the way it is now."""
+        row = self.rows.get(user_id)
+        if row is None:
+            return user_id, None, None, None
+        return user_id, int(self.major_codes[row]), self.starts[row].copy(), self.ends[row].copy()
+
+    def restore_user(self, saved):
+        """
+        Undoes what happened to one user since snapshot_user() returned
+        saved (their write to SQLite failed), removing them if they weren't
+        registered then. The slots are rebuilt; bring common_availability
+        back in line with diff_slots().
+        """
+        user_id, code, starts, ends = saved
+        row = self.rows.get(user_id)
+        if row is None:
+            return
+        if code is None:
+            self._remove(user_id)
+        else:
+            self.major_codes[row] = code
+            for day in range(7):
+                self._set(row, day, int(starts[day]), int(ends[day]))
+        self._rebuild(DAYS_OF_WEEK)
+
+    def diff_slots(self, stored_slots):
+        """
+        The changes that turn stored (day, start_time, end_time) rows of
+        common_availability into the current slots.
+        """
+        stored = {day: set() for day in DAYS_OF_WEEK}
+        for day, start, end in stored_slots:
+            stored[day].add((time_to_minutes(start), time_to_minutes(end)))
+        changes = {}
+        for day in DAYS_OF_WEEK:
+            current = set(self.slots[day])
+            if current != stored[day]:
+                changes[day] = (sorted(stored[day] - current), sorted(current - stored[day]))
+        return changes
+
+    def query(self, quorum=QUORUM, min_minutes=0, major=None, user_ids=None):
+        """
+        Common slots for any quorum (0-1], minimum slot length and subset of
+        users (one degree_major and/or explicit user ids), computed for all
+        seven days at once. Returns {day: [(start, end), ...]}.
+        """
+        count = self.total_users
+        mask = np.ones(count, dtype=bool)
+        if major is not None:
+            code = self.major_ids.get(major.strip().lower())
+            if code is None:
+                return {}
+            mask &= self.major_codes[:count] == code
+        if user_ids is not None:
+            wanted = np.zeros(count, dtype=bool)
+            wanted[[self.rows[u] for u in user_ids if u in self.rows]] = True
+            mask &= wanted
+
+        members = int(mask.sum())
+        required = _required(quorum, members)
+        if required == 0:
+            return {}
+
+        starts = self.starts[:count][mask].astype(np.int64)
+        ends = self.ends[:count][mask].astype(np.int64)
+        valid = ends > starts
+        day_offsets = np.arange(7, dtype=np.int64) * (MINUTES_PER_DAY + 1)
+        width = 7 * (MINUTES_PER_DAY + 1)
+        diff = (np.bincount((starts + day_offsets)[valid], minlength=width)
+                - np.bincount((ends + day_offsets)[valid], minlength=width))
+        coverage = np.cumsum(diff.reshape(7, MINUTES_PER_DAY + 1), axis=1)[:, :MINUTES_PER_DAY]
+
+        result = {}
+        for day, runs in _runs(coverage >= required).items():
+            runs = [(s, e) for s, e in runs if e - s >= min_minutes]
+            if runs:
+                result[DAYS_OF_WEEK[day]] = runs
+        return result
+
+    def _row(self, user_id, major):
+        code = self.major_ids.setdefault(major.strip().lower(), len(self.major_ids))
+        if user_id in self.rows:
+            self.major_codes[self.rows[user_id]] = code
+            return
+        row = len(self.rows)
+        if row == len(self.starts):
+            # Double the arrays so appends stay amortised O(1)
+            self.starts = np.concatenate([self.starts, np.zeros_like(self.starts)])
+            self.ends = np.concatenate([self.ends, np.zeros_like(self.ends)])
+            self.major_codes = np.concatenate([self.major_codes, np.zeros_like(self.major_codes)])
+        self.rows[user_id] = row
+        self.major_codes[row] = code
+
+    def _remove(self, user_id):
+        # The last row moves into the hole, so the arrays stay dense
+        row = self.rows.pop(user_id)
+        for day in range(7):
+            self._set(row, day, None, None)
+        last = len(self.rows)
+        if row != last:
+            moved = next(other for other, other_row in self.rows.items() if other_row == last)
+            self.starts[row] = self.starts[last]
+            self.ends[row] = self.ends[last]
+            self.major_codes[row] = self.major_codes[last]
+            self.rows[moved] = row
+        self.starts[last] = self.ends[last] = 0
+        self.major_codes[last] = 0
+
+    def _set(self, row, day, start, end):
+        old_start, old_end = int(self.starts[row, day]), int(self.ends[row, day])
+        if old_end > old_start:
+            self.coverage[day, old_start:old_end] -= 1
+        if start is None or end is None or end <= start:
+            start = end = 0
+        self.starts[row, day] = start
+        self.ends[row, day] = end
+        if end > start:
+            self.coverage[day, start:end] += 1
+
+    def _rebuild(self, days):
+        """
+        Recomputes the slots for the given days and returns
+        {day: (removed_slots, added_slots)} for the days that changed.
+        """
+        required = self.required
+        day_numbers = [DAY_INDEX[day] for day in days]
+        if required == 0:
+            runs = {}
+        else:
+            runs = _runs(self.coverage[day_numbers] >= required)
+        changes = {}
+        for i, day in enumerate(days):
+            new_slots = runs.get(i, [])
+            old = set(self.slots[day])
+            new = set(new_slots)
+            if old != new:
+                changes[day] = (sorted(old - new), sorted(new - old))
+            self.slots[day] = new_slots
+        return changes
@@ -0,0 +1,114 @@
+"""
+Compares the old sweep-line update_common_availability (full SQLite reread,
+sort and rewrite on every change) with the in-memory AvailabilityIndex.
+
+    python benchmarks/bench_availability.py --users 10000
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import AvailabilityIndex, DAYS_OF_WEEK, minutes_to_time, time_to_minutes
+
+MAJORS = ['Computer Science', 'Mathematics', 'Physics', 'Biology']
+
+
+def make_database(users):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE users (user_id TEXT PRIMARY KEY, degree_major TEXT)')
+    conn.execute('CREATE TABLE availability (user_id TEXT, day_of_week TEXT, start_time TEXT, end_time TEXT, PRIMARY KEY (user_id, day_of_week))')
+    conn.execute('CREATE TABLE common_availability (day_of_week TEXT, start_time TEXT, end_time TEXT, PRIMARY KEY (day_of_week, start_time, end_time))')
+    rng = random.Random(42)
+    for i in range(users):
+        conn.execute('INSERT INTO users VALUES (?, ?)', (str(i), rng.choice(MAJORS)))
+        for day in DAYS_OF_WEEK:
+            if rng.random() < 0.2:
+                start = end = 'N/A'
+            else:
+                s = rng.randint(6 * 60, 12 * 60)
+                start, end = minutes_to_time(s), minutes_to_time(rng.randint(s + 60, 22 * 60))
+            conn.execute('INSERT INTO availability VALUES (?, ?, ?, ?)', (str(i), day, start, end))
+    conn.commit()
+    return conn
+
+
+def legacy_update_common_availability(conn):
+    # The pre-index implementation, kept here only as the baseline
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users")
+    required = math.ceil(0.75 * cursor.fetchone()[0])
+    for day in DAYS_OF_WEEK:
+        cursor.execute("SELECT start_time, end_time FROM availability WHERE day_of_week = ? AND start_time != 'N/A' AND end_time != 'N/A'", (day,))
+        events = []
+        for start, end in cursor.fetchall():
+            events.append((time_to_minutes(start), 'start'))
+            events.append((time_to_minutes(end), 'end'))
+        events.sort(key=lambda x: (x[0], x[1] == 'end'))
+        common_slots = []
+        current_active = 0
+        common_start = None
+        for moment, typ in events:
+            if typ == 'start':
+                current_active += 1
+                if current_active >= required and common_start is None:
+                    common_start = moment
+            else:
+                if current_active >= required and common_start is not None:
+                    common_slots.append((common_start, moment))
+                    common_start = None
+                current_active -= 1
+        cursor.execute("DELETE FROM common_availability WHERE day_of_week = ?", (day,))
+        for start, end in common_slots:
+            cursor.execute("INSERT INTO common_availability VALUES (?, ?, ?)", (day, minutes_to_time(start), minutes_to_time(end)))
+    conn.commit()
+
+
+def timed(label, func, repeat):
+    began = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_call = (time.perf_counter() - began) / repeat
+    print(f"{label:<45} {per_call * 1000:10.3f} ms")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = make_database(args.users)
+    print(f"{args.users} users, 7 days\n")
+
+    legacy = timed("legacy sweep-line update (per change)", lambda: legacy_update_common_availability(conn), 3)
+
+    index = AvailabilityIndex()
+    cursor = conn.cursor()
+    began = time.perf_counter()
+    index.load(cursor.execute("SELECT user_id, degree_major FROM users").fetchall(),
+               cursor.execute("SELECT * FROM availability WHERE start_time != 'N/A'").fetchall())
+    print(f"{'index load (once at startup)':<45} {(time.perf_counter() - began) * 1000:10.3f} ms")
+
+    rng = random.Random(7)
+
+    def one_change():
+        start = rng.randint(6 * 60, 12 * 60)
+        index.set_interval(str(rng.randrange(args.users)), rng.choice(DAYS_OF_WEEK), start, start + 300)
+
+    incremental = timed("index set_interval (per change)", one_change, args.repeat * 50)
+    query = timed("vectorized query, 75% of everyone", lambda: index.query(0.75), args.repeat)
+    timed("vectorized query, 50% of one major, >=60min", lambda: index.query(0.5, 60, major='Physics'), args.repeat)
+
+    print(f"\nper-change speedup: {legacy / incremental:8.1f}x")
+    print(f"ad-hoc query vs legacy update: {legacy / query:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
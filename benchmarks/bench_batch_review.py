@@ -0,0 +1,75 @@
+"""
+Time to review --members submissions one /perform_review at a time versus
+in one /batch_review (cogs.llm.review_batch, --parallel generations at
+once), against the stub Ollama in fake_ollama.py serving --parallel
+sequences like OLLAMA_NUM_PARALLEL. The stub gives every sequence the full
+token rate; on a real GPU parallel sequences share it, less than linearly,
+so measure with your own model before raising the parallelism.
+
+    python benchmarks/bench_batch_review.py --members 12 --parallel 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ollama
+
+PORT = 11497
+
+
+async def run(args):
+    runner = web.AppRunner(fake_ollama.make_app(args.tokens_per_second, args.reasoning_tokens, args.answer_tokens,
+                                                parallel=args.parallel, latency=args.latency))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{PORT}"
+    os.environ["LLM_ROUTES"] = "ollama-large"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.parallel)
+    os.environ["BOT_LOG_LEVEL"] = "WARNING"
+    import http_client
+    from cogs import llm
+
+    def texts(run_name):
+        # Different per run so the response cache doesn't answer the second one
+        return [f"{run_name} member {n}: shipped the release, mentored two juniors, ran the retro." for n in range(args.members)]
+
+    began = time.perf_counter()
+    for text in texts("one by one"):
+        await llm.complete_long(llm.REVIEW_PROMPT, text)
+    sequential = time.perf_counter() - began
+
+    began = time.perf_counter()
+    reviews = await llm.review_batch(texts("batch"), parallel=args.parallel)
+    batch = time.perf_counter() - began
+    assert not any(review.startswith("⚠️") for review in reviews)
+
+    print(f"{args.members} submissions, {args.parallel} generations at once")
+    print(f"  one by one  {sequential:7.2f} s  ({sequential / args.members:5.2f} s each)")
+    print(f"  batch       {batch:7.2f} s  ({batch / args.members:5.2f} s each, {sequential / batch:.1f}x faster)")
+
+    await http_client.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=12)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--reasoning-tokens", type=int, default=300)
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
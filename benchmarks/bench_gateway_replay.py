@@ -0,0 +1,189 @@
+"""
+Replays a gateway event stream through discord.py's own event parsing, shard
+by shard, with every intent enabled (what DPB used to request) and with the
+minimal intents main.py derives from its cogs. Events the gateway would not
+send for an intent set are dropped before replay, like Discord does.
+
+Record a real stream with GATEWAY_RECORD=events.jsonl python main.py and
+replay it with --events events.jsonl; without --events a synthetic stream is
+generated (chatty guilds with presence, typing and member traffic).
+
+    python benchmarks/bench_gateway_replay.py --shards 4 --guilds 200 --events-per-guild 500
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+import discord
+from discord.ext import commands
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cogs
+from main import intents_for
+
+# Which intent Discord requires before it sends an event (guild, DM)
+EVENT_INTENTS = {
+    "MESSAGE_CREATE": ("guild_messages", "dm_messages"),
+    "MESSAGE_UPDATE": ("guild_messages", "dm_messages"),
+    "MESSAGE_DELETE": ("guild_messages", "dm_messages"),
+    "MESSAGE_REACTION_ADD": ("guild_reactions", "dm_reactions"),
+    "MESSAGE_REACTION_REMOVE": ("guild_reactions", "dm_reactions"),
+    "TYPING_START": ("guild_typing", "dm_typing"),
+    "PRESENCE_UPDATE": ("presences", None),
+    "GUILD_MEMBER_ADD": ("members", None),
+    "GUILD_MEMBER_UPDATE": ("members", None),
+    "GUILD_MEMBER_REMOVE": ("members", None),
+    "VOICE_STATE_UPDATE": ("voice_states", None),
+}
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def shard_for(guild_id, shard_count):
+    return (int(guild_id) >> 22) % shard_count if guild_id else 0
+
+
+def user(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None}
+
+
+def member(user_id):
+    return {"user": user(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}
+
+
+def synthetic_stream(guilds, events_per_guild, members_per_guild, seed=1):
+    """Returns a list of (event name, data) like a recording would contain."""
+    rng = random.Random(seed)
+    stream = []
+    guild_ids = [(1_000_000 + i) << 22 for i in range(guilds)]
+    for guild_id in guild_ids:
+        member_ids = [guild_id + m + 1 for m in range(members_per_guild)]
+        stream.append(("GUILD_CREATE", {
+            "id": str(guild_id), "name": f"guild {guild_id}", "unavailable": False, "owner_id": str(member_ids[0]),
+            "member_count": members_per_guild, "large": members_per_guild > 250,
+            "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                       "hoist": False, "managed": False, "mentionable": False, "flags": 0}],
+            "channels": [{"id": str(guild_id + 1), "type": 0, "name": "general", "position": 0, "permission_overwrites": []}],
+            "members": [member(user_id) for user_id in member_ids],
+            "presences": [{"user": {"id": str(user_id)}, "status": "online", "activities": [], "client_status": {"desktop": "online"}}
+                          for user_id in member_ids],
+            "voice_states": [], "threads": [], "emojis": [], "stickers": [], "features": [],
+            "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+        }))
+
+    kinds = ["PRESENCE_UPDATE"] * 45 + ["MESSAGE_CREATE"] * 25 + ["TYPING_START"] * 20 + ["GUILD_MEMBER_UPDATE"] * 10
+    for n in range(guilds * events_per_guild):
+        guild_id = rng.choice(guild_ids)
+        user_id = guild_id + rng.randint(1, members_per_guild)
+        channel_id = str(guild_id + 1)
+        kind = rng.choice(kinds)
+        if kind == "PRESENCE_UPDATE":
+            data = {"user": {"id": str(user_id)}, "guild_id": str(guild_id), "status": rng.choice(["online", "idle", "dnd"]),
+                    "activities": [], "client_status": {"desktop": "online"}}
+        elif kind == "MESSAGE_CREATE":
+            data = {"id": str(10 ** 17 + n), "channel_id": channel_id, "guild_id": str(guild_id), "author": user(user_id),
+                    "member": {key: value for key, value in member(user_id).items() if key != "user"},
+                    "content": "just chatting", "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False,
+                    "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+                    "pinned": False, "type": 0}
+        elif kind == "TYPING_START":
+            data = {"channel_id": channel_id, "guild_id": str(guild_id), "user_id": str(user_id), "timestamp": 1700000000,
+                    "member": member(user_id)}
+        else:
+            data = dict(member(user_id), guild_id=str(guild_id))
+        stream.append((kind, data))
+    return stream
+
+
+def recorded_stream(path):
+    stream = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            payload = json.loads(line)
+            if payload.get("op") == 0 and payload.get("t"):
+                stream.append((payload["t"], payload["d"]))
+    return stream
+
+
+def delivered(stream, intents):
+    """The part of stream the gateway sends to a client with these intents."""
+    kept = []
+    for event, data in stream:
+        if event == "GUILD_CREATE":
+            data = dict(data)
+            if not intents.presences:
+                data["presences"] = []
+            if not intents.members:
+                data["members"] = []
+        elif event in EVENT_INTENTS:
+            guild_flag, dm_flag = EVENT_INTENTS[event]
+            flag = guild_flag if data.get("guild_id") else dm_flag
+            if flag is None or not getattr(intents, flag):
+                continue
+        kept.append((event, data))
+    return kept
+
+
+async def replay_shard(events, intents, shard_id, shard_count):
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, shard_ids=[shard_id], shard_count=shard_count,
+                                  chunk_guilds_at_startup=False)
+    async with bot:
+        parsers = bot._connection.parsers
+        setup = [(event, data) for event, data in events if event == "GUILD_CREATE"]
+        traffic = [(event, data) for event, data in events if event != "GUILD_CREATE"]
+        for event, data in setup:
+            parsers[event](data)
+
+        gc.collect()  # Don't bill one shard for the garbage of the last
+        began = time.perf_counter()
+        for event, data in traffic:
+            parser = parsers.get(event)
+            if parser is not None:
+                parser(data)
+        # Let the listener tasks the events spawned (on_message etc.) finish too
+        current = asyncio.current_task()
+        while any(task is not current for task in asyncio.all_tasks()):
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - began
+        members = sum(len(guild.members) for guild in bot.guilds)
+    return len(traffic), elapsed, members
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", help="JSONL recording from GATEWAY_RECORD")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--events-per-guild", type=int, default=500)
+    parser.add_argument("--members-per-guild", type=int, default=200)
+    parser.add_argument("--cogs", default=",".join(cogs.AVAILABLE))
+    args = parser.parse_args()
+
+    if args.events:
+        stream = recorded_stream(args.events)
+    else:
+        stream = synthetic_stream(args.guilds, args.events_per_guild, args.members_per_guild)
+    per_shard = {shard_id: [] for shard_id in range(args.shards)}
+    for event, data in stream:
+        per_shard[shard_for(data.get("guild_id") or (data.get("id") if event == "GUILD_CREATE" else None), args.shards)].append((event, data))
+
+    modes = (("all intents", discord.Intents.all()), ("minimal intents", intents_for(args.cogs.split(","))))
+    for label, intents in modes:
+        print(f"{label} ({intents.value}):")
+        total_events = total_time = 0
+        for shard_id, events in per_shard.items():
+            count, elapsed, members = asyncio.run(replay_shard(delivered(events, intents), intents, shard_id, args.shards))
+            total_events += count
+            total_time += elapsed
+            rate = count / elapsed if elapsed else 0
+            print(f"  shard {shard_id}: {count:8d} events {elapsed * 1000:9.1f} ms {rate:10.0f} events/s   cached members {members}")
+        print(f"  total:   {total_events:8d} events {total_time * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Messages per second through the on_message classification stage alone (no
+Discord, no downloads): the old per-message print plus substring check
+against the bot-author skip, precompiled Shorts extraction and rate-limited
+debug logging.
+
+    python benchmarks/bench_on_message.py --messages 200000
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shorts
+from bot_logging import get_logger
+
+CHATTER = [
+    "lol",
+    "anyone up for ranked tonight?",
+    "I bought new shorts for the summer",
+    "!ask what is the capital of France",
+    "meeting moved to 3pm, see the doc https://docs.google.com/document/d/abc",
+    "check this out https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "this one is great https://youtube.com/shorts/abcdefghijk?feature=share",
+    "https://youtu.be/ZZZZZZZZZZZ and https://www.youtube.com/shorts/bbbbbbbbbbb",
+    "a much longer message that goes on for a while about nothing in particular " * 5,
+]
+
+
+def make_messages(count, bot_share=0.1, seed=1):
+    rng = random.Random(seed)
+    me = SimpleNamespace(id=1, bot=True)
+    messages = []
+    for i in range(count):
+        author = me if rng.random() < bot_share else SimpleNamespace(id=1000 + i % 50, bot=False)
+        messages.append(SimpleNamespace(
+            author=author,
+            content=rng.choice(CHATTER),
+            guild=SimpleNamespace(id=42),
+            channel=SimpleNamespace(id=7),
+        ))
+    return messages, me
+
+
+def legacy_handler(me):
+    def handle(message):
+        if message.author == me:
+            return None
+        print(f'Message from {message.author}: {message.content}')
+        if 'shorts' in message.content.lower():
+            return [message.content]  # The whole message went to yt-dlp
+        return None
+    return handle
+
+
+def new_handler():
+    log = get_logger("bench_on_message")
+
+    def handle(message):
+        if message.author.bot:
+            return None
+        log.debug("message guild=%s channel=%s author=%s length=%d", message.guild and message.guild.id, message.channel.id, message.author.id, len(message.content))
+        return shorts.find_shorts(message.content) or None
+    return handle
+
+
+def run(handle, messages):
+    # Line-buffered like a terminal or a service's log pipe, but discarded
+    with open(os.devnull, "w", buffering=1) as sink, contextlib.redirect_stdout(sink):
+        began = time.perf_counter()
+        triggered = sum(1 for message in messages if handle(message))
+        elapsed = time.perf_counter() - began
+    return elapsed, triggered
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+
+    messages, me = make_messages(args.messages)
+    for label, handle in (("print + 'shorts' in content", legacy_handler(me)), ("precompiled + rate-limited log", new_handler())):
+        elapsed, triggered = run(handle, messages)
+        print(f"{label:<32} {len(messages) / elapsed:12.0f} messages/s   downloads triggered {triggered}")
+
+
+if __name__ == "__main__":
+    main()
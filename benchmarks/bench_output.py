@@ -0,0 +1,89 @@
+"""
+Delivering a long LLM answer (--chars characters) to a channel the old way,
+one awaited send per DISCORD_MESSAGE_LIMIT characters, versus
+discord_output.send_text, which sends one message with the first page and
+page buttons. The channel is a stand-in that takes --rest-latency seconds
+per call and, like Discord, allows 5 messages per 5 seconds per channel
+before making the bot wait. Also times the fence-safe chunking itself.
+
+    python benchmarks/bench_output.py --chars 12000 --rest-latency 0.08
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord_output
+
+RATE_LIMIT = 5
+RATE_WINDOW = 5.0
+
+
+class Channel:
+    """Answers sends after rest_latency, holding back the 6th message in 5 seconds."""
+
+    def __init__(self, rest_latency):
+        self.rest_latency = rest_latency
+        self.sent = deque()
+        self.calls = 0
+
+    async def send(self, content=None, **kwargs):
+        if len(self.sent) >= RATE_LIMIT:
+            wait = self.sent[0] + RATE_WINDOW - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.sent.popleft()
+        await asyncio.sleep(self.rest_latency)
+        self.sent.append(time.perf_counter())
+        self.calls += 1
+
+
+def answer(chars):
+    # Prose with a code block in the middle, like a typical !ask answer
+    prose = "A good review checks the change does what it says and that it is tested. " * 40 + "\n\n"
+    code = "```python\n" + "".join(f"def step_{i}(x):\n    return x * {i}\n\n" for i in range(60)) + "```\n\n"
+    text = prose + code
+    return (text * (chars // len(text) + 1))[:chars]
+
+
+async def run(args):
+    text = answer(args.chars)
+    limit = discord_output.DISCORD_MESSAGE_LIMIT
+
+    channel = Channel(args.rest_latency)
+    began = time.perf_counter()
+    for i in range(0, len(text), limit):
+        await channel.send(text[i:i + limit])
+    sliced, sliced_calls = time.perf_counter() - began, channel.calls
+
+    channel = Channel(args.rest_latency)
+    began = time.perf_counter()
+    await discord_output.send_text(channel, text)
+    paged, paged_calls = time.perf_counter() - began, channel.calls
+
+    print(f"{args.chars} character answer, {args.rest_latency * 1000:g} ms per Discord call")
+    print(f"  one send per {limit} characters  {sliced_calls:3d} messages  {sliced:6.2f} s")
+    pages = len(discord_output.chunks(text, discord_output.EMBED_DESCRIPTION_LIMIT)) if len(text) > limit else 0
+    print(f"  send_text (paged embeds)        {paged_calls:3d} message   {paged:6.2f} s  ({pages} embed pages, rendered when opened)")
+
+    began = time.perf_counter()
+    for _ in range(args.repeat):
+        discord_output.chunks(text)
+    print(f"  chunks() on code block boundaries: {(time.perf_counter() - began) / args.repeat * 1e6:.0f} us per answer")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=12000)
+    parser.add_argument("--rest-latency", type=float, default=0.08)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Message handling throughput while --pending prompts ("please send the text
+to summarize") are open: with one client.wait_for listener per prompt, as
+the commands used to do, and with conversations.Conversations, which main.py
+now uses. Ordinary chat messages go through discord.py's own
+MESSAGE_CREATE parsing, dispatch and process_commands in both cases; at the
+end every prompt gets its reply, to check that none were lost.
+
+    python benchmarks/bench_pending_prompts.py --pending 1000 --messages 20000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+
+import discord
+from discord.ext import commands
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conversations
+
+GUILD_ID = 1_000_000 << 22
+CHANNELS = 50
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def message(n, channel_id, user_id, content):
+    return {"id": str(10 ** 17 + n), "channel_id": str(channel_id), "guild_id": str(GUILD_ID),
+            "author": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None},
+            "member": {"roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0},
+            "content": content, "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0}
+
+
+class ListenerBot(commands.Bot):
+    """Prompts wait with client.wait_for, like the old commands."""
+
+    handled = 0
+
+    def open_prompt(self, channel_id, user_id):
+        def check(m):
+            return m.author.id == user_id and m.channel.id == channel_id
+        return self.wait_for("message", timeout=None, check=check)
+
+    async def on_message(self, message):
+        try:
+            await self.process_commands(message)
+        finally:
+            self.handled += 1
+
+
+class TableBot(commands.Bot):
+    """Prompts wait in a Conversations table, like main.Bot."""
+
+    handled = 0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.conversations = conversations.Conversations()
+
+    def open_prompt(self, channel_id, user_id):
+        return self.conversations.wait_for_reply(channel_id, user_id, timeout=None)
+
+    async def on_message(self, message):
+        try:
+            if not self.conversations.feed(message):
+                await self.process_commands(message)
+        finally:
+            self.handled += 1
+
+
+async def measure(bot_class, pending, messages):
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = bot_class(command_prefix="!", intents=intents)
+    async with bot:
+        bot._connection.user = discord.ClientUser(state=bot._connection, data={
+            "id": "1", "username": "bench", "discriminator": "0", "avatar": None, "bot": True})
+        parsers = bot._connection.parsers
+        channel_ids = [GUILD_ID + 1 + i for i in range(CHANNELS)]
+        parsers["GUILD_CREATE"]({
+            "id": str(GUILD_ID), "name": "bench", "unavailable": False, "owner_id": "1", "member_count": 0,
+            "roles": [], "members": [], "presences": [], "voice_states": [], "threads": [], "emojis": [], "stickers": [],
+            "features": [], "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+            "channels": [{"id": str(channel_id), "type": 0, "name": f"c{channel_id}", "position": 0, "permission_overwrites": []}
+                         for channel_id in channel_ids],
+        })
+
+        # Users 1..pending each have a prompt open; the chatter comes from other users
+        prompts = [(channel_ids[i % CHANNELS], i + 1) for i in range(pending)]
+        waiters = [asyncio.ensure_future(bot.open_prompt(channel_id, user_id)) for channel_id, user_id in prompts]
+        await asyncio.sleep(0)
+        traffic = [message(n, channel_ids[n % CHANNELS], 10 ** 6 + n % 997, "just chatting") for n in range(messages)]
+
+        gc.collect()
+        began = time.perf_counter()
+        for data in traffic:
+            parsers["MESSAGE_CREATE"](data)
+        while bot.handled < messages:
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - began
+
+        for n, (channel_id, user_id) in enumerate(prompts):
+            parsers["MESSAGE_CREATE"](message(messages + n, channel_id, user_id, "the text to summarize"))
+        answered = await asyncio.wait_for(asyncio.gather(*waiters), 10)
+        assert all(reply.content == "the text to summarize" for reply in answered)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pending", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    for pending in sorted({0, args.pending}):
+        for label, bot_class in (("wait_for listeners", ListenerBot), ("(channel, author) table", TableBot)):
+            elapsed = asyncio.run(measure(bot_class, pending, args.messages))
+            print(f"{pending:5d} pending  {label:<24} {args.messages / elapsed:10.0f} messages/s  {elapsed / args.messages * 1e6:8.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency and output tokens of one !Perform_Review generation with R1's
+reasoning left alone, cut at LLM_THINK_TOKENS and continued to the answer,
+and turned off (the default), against the stub Ollama in fake_ollama.py (no
+GPU needed). Numbers come from llm_backend.generation_stats, the same
+per-command tracking the bot does.
+
+    python benchmarks/bench_reasoning.py --requests 5 --tokens-per-second 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ollama
+
+PORT = 11499
+
+
+async def run(args):
+    runner = web.AppRunner(fake_ollama.make_app(args.tokens_per_second, args.reasoning_tokens, args.answer_tokens, parallel=4))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{PORT}"
+    os.environ["LLM_ROUTES"] = "ollama-large"
+    os.environ["BOT_LOG_LEVEL"] = "WARNING"
+    import http_client
+    import llm_backend
+    import scheduler
+
+    scheduler.current_request.set(scheduler.RequestInfo(command="Perform_Review"))
+    for mode in ("full", "capped", "off"):
+        llm_backend.REASONING = mode
+        llm_backend.generation_stats = llm_backend.GenerationStats(baseline_every=0)
+        began = time.perf_counter()
+        for _ in range(args.requests):
+            answer = await llm_backend.chat("Provide a one hundred word performance review of: shipped the release")
+        elapsed = (time.perf_counter() - began) / args.requests
+        stats = llm_backend.generation_stats.snapshot()["Perform_Review"]
+        print(f"{mode:7s} {elapsed * 1000:8.0f} ms/request  reasoning {stats['reasoning_tokens'] / args.requests:6.0f} tokens"
+              f"  answer {stats['answer_tokens'] / args.requests:5.0f} tokens  cut {stats['cut']}  answer starts {answer[:12]!r}")
+
+    await http_client.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--reasoning-tokens", type=int, default=600)
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Latency of a mixed !ask / !summarize workload against mock backends (no
+Ollama needed): everything pinned to the large local model, as the bots
+used to do, versus llm_router with a small and a large local model, and
+versus the router with a flaky hosted route added. Local routes share one
+scheduler, like the real Ollama routes do.
+
+    python benchmarks/bench_router.py --requests 400 --rate 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_logging import get_logger
+from http_client import BackendUnavailable
+from llm_router import LARGE, SMALL, LLMRouter, MockBackend, Route
+from scheduler import LLMScheduler
+
+SHORT_PROMPT = "what is the capital of France?"
+LONG_PROMPT = "Summarize the following text briefly:\n\n" + "a sentence about the quarterly planning meeting. " * 60
+
+
+def route(name, size, scheduler, latency, failure_rate=0.0, seed=1):
+    mock = MockBackend(name, latency=latency, failure_rate=failure_rate, seed=seed)
+    return Route(name, size, mock.chat, mock.stream_chat, breaker=mock.breaker, scheduler=scheduler, expected_latency=latency)
+
+
+def setups(scale):
+    local = LLMScheduler(2)
+    yield "pinned to large", LLMRouter([route("large", LARGE, local, 4 * scale)])
+
+    local = LLMScheduler(2)
+    yield "routed small+large", LLMRouter([route("small", SMALL, local, scale), route("large", LARGE, local, 4 * scale)])
+
+    local = LLMScheduler(2)
+    yield "routed + flaky hosted", LLMRouter([
+        route("small", SMALL, local, scale),
+        route("large", LARGE, local, 4 * scale),
+        route("hosted", LARGE, LLMScheduler(4), 5 * scale, failure_rate=0.3, seed=2),
+    ])
+
+
+async def run(router, requests, rate, short_share, seed=1):
+    rng = random.Random(seed)
+    latencies = {"short": [], "long": []}
+    errors = 0
+
+    async def one(kind, prompt):
+        nonlocal errors
+        began = time.perf_counter()
+        try:
+            await router.chat(prompt)
+        except BackendUnavailable:
+            errors += 1
+            return
+        latencies[kind].append(time.perf_counter() - began)
+
+    tasks = []
+    for _ in range(requests):
+        kind = "short" if rng.random() < short_share else "long"
+        tasks.append(asyncio.create_task(one(kind, SHORT_PROMPT if kind == "short" else LONG_PROMPT)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=8.0, help="requests per second")
+    parser.add_argument("--short-share", type=float, default=0.7)
+    parser.add_argument("--scale", type=float, default=0.05, help="small model latency in seconds")
+    args = parser.parse_args()
+    get_logger("llm_router").disabled = True  # Fallback warnings would drown the table
+
+    for label, router in setups(args.scale):
+        latencies, errors = asyncio.run(run(router, args.requests, args.rate, args.short_share))
+        print(f"{label}:")
+        for kind, values in latencies.items():
+            print(f"  {kind:5s} n={len(values):4d} p50 {percentile(values, 0.5) * 1000:8.0f} ms  p95 {percentile(values, 0.95) * 1000:8.0f} ms")
+        calls = ", ".join(f"{name}={stats['calls']}" for name, stats in router.stats().items())
+        print(f"  errors {errors}  fallbacks {router.fallbacks}  calls: {calls}")
+
+
+if __name__ == "__main__":
+    main()
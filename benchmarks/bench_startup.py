@@ -0,0 +1,95 @@
+"""
+Startup time and resident memory of the four old bot scripts, run as four
+separate processes (each is now main.py with that bot's cogs), against one
+combined main.py with all cogs enabled. Each target runs in a fresh
+interpreter in a scratch directory; bot.run() is replaced with "run
+setup_hook, then exit", so nothing connects to Discord and slash commands
+are not synced.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEPARATE = ["DPB ~ DeepSeek Copy.py", "Joel's Bot.py", "bot.py", "WideShmeerCleaned.py"]
+COMBINED = "main.py"
+
+
+def child(script):
+    """Runs script up to its bot.run() call and prints its peak RSS in KiB."""
+    import asyncio
+
+    import discord
+    from discord import app_commands
+
+    async def start(client):
+        async with client:
+            await client.setup_hook()
+
+    def run(client, *args, **kwargs):
+        asyncio.run(start(client))
+        print(json.dumps({"rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+        sys.stdout.flush()
+        os._exit(0)
+
+    async def no_sync(self, *args, **kwargs):
+        return []
+
+    discord.Client.run = run
+    app_commands.CommandTree.sync = no_sync
+    os.environ.setdefault("DISCORD_BOT_TOKEN", "benchmark")
+    sys.path.insert(0, ROOT)
+    sys.argv = [script]
+
+    path = os.path.join(ROOT, script)
+    with open(path, encoding="utf-8") as file:
+        source = file.read()
+    exec(compile(source, path, "exec"), {"__name__": "__main__", "__file__": path})
+    raise SystemExit(f"{script} returned without starting the bot")
+
+
+def measure(script, scratch):
+    began = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", script],
+        cwd=scratch, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - began
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} failed:\n{result.stderr}")
+    rss = json.loads(result.stdout.strip().splitlines()[-1])["rss_kib"]
+    return elapsed, rss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for script in SEPARATE + [COMBINED]:
+            runs = [measure(script, scratch) for _ in range(args.repeat)]
+            results[script] = (statistics.median(t for t, _ in runs), statistics.median(m for _, m in runs))
+            print(f"{script:<26} startup {results[script][0] * 1000:8.0f} ms   peak RSS {results[script][1]:7.1f} MiB")
+
+    separate_time = sum(results[script][0] for script in SEPARATE)
+    separate_rss = sum(results[script][1] for script in SEPARATE)
+    print(f"{'four separate (total)':<26} startup {separate_time * 1000:8.0f} ms   peak RSS {separate_rss:7.1f} MiB")
+    print(f"{'combined main.py':<26} startup {results[COMBINED][0] * 1000:8.0f} ms   peak RSS {results[COMBINED][1]:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
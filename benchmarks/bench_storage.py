@@ -0,0 +1,109 @@
+"""
+Simulates a burst of /register interactions and compares the old pattern
+(one blocking connection, eight statements and a commit per registration)
+with AsyncDatabase's queued, group-committed writes.
+
+    python benchmarks/bench_storage.py --registrations 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import DAYS_OF_WEEK
+from storage import AsyncDatabase
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, preferred_name TEXT, email TEXT, phone_number TEXT, degree_major TEXT)",
+    "CREATE TABLE IF NOT EXISTS availability (user_id TEXT, day_of_week TEXT, start_time TEXT, end_time TEXT, PRIMARY KEY (user_id, day_of_week))",
+]
+UPSERT_USER = "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)"
+INSERT_EMPTY_DAY = "INSERT OR IGNORE INTO availability VALUES (?, ?, 'N/A', 'N/A')"
+
+
+def registration(i):
+    return (str(i), f"user{i}", f"user{i}@example.com", "555-0100", "Computer Science")
+
+
+async def legacy_burst(path, count, concurrency):
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    lags = []
+
+    async def register(i):
+        # Blocking calls straight on the event loop, like the old handlers
+        cursor = conn.cursor()
+        cursor.execute(UPSERT_USER, registration(i))
+        for day in DAYS_OF_WEEK:
+            cursor.execute(INSERT_EMPTY_DAY, (str(i), day))
+        conn.commit()
+
+    await run_burst(register, count, concurrency, lags)
+    conn.close()
+    return lags
+
+
+async def async_burst(path, count, concurrency):
+    db = AsyncDatabase(path, schema=SCHEMA)
+    lags = []
+
+    async def register(i):
+        await db.write([
+            (UPSERT_USER, registration(i)),
+            (INSERT_EMPTY_DAY, [(str(i), day) for day in DAYS_OF_WEEK]),
+        ])
+
+    await run_burst(register, count, concurrency, lags)
+    await db.close()
+    return lags
+
+
+async def run_burst(register, count, concurrency, lags):
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+
+    async def watch_lag():
+        # How late a 10 ms timer fires tells us how blocked the loop is
+        while not stop.is_set():
+            began = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - began - 0.01)
+
+    async def one(i):
+        async with semaphore:
+            await register(i)
+
+    watcher = asyncio.create_task(watch_lag())
+    await asyncio.gather(*(one(i) for i in range(count)))
+    stop.set()
+    await watcher
+
+
+def report(label, count, elapsed, lags):
+    worst = max(lags) * 1000 if lags else float("nan")
+    print(f"{label:<28} {count / elapsed:10.0f} registrations/s   worst loop lag {worst:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registrations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, burst in (("blocking sqlite3 + commit", legacy_burst), ("AsyncDatabase group commit", async_burst)):
+            path = os.path.join(tmp, f"{burst.__name__}.db")
+            began = time.perf_counter()
+            lags = asyncio.run(burst(path, args.registrations, args.concurrency))
+            report(label, args.registrations, time.perf_counter() - began, lags)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold starts with Ollama's default keep_alive versus model_lifecycle's
+preloading, traffic-sized keep_alive and hot-model pinning, on the same
+bursty traffic against the stub Ollama in fake_ollama.py (which loads models
+for --load-seconds and unloads them keep_alive after their last request).
+
+Time is scaled down: --keep-alive stands for Ollama's 5 minute default and
+the traffic's gaps are drawn relative to it, so a run takes seconds. !ask
+goes to the small model, !summarize and !Perform_Review to the large one.
+
+    python benchmarks/bench_warmup.py --requests 30 --load-seconds 2 --keep-alive 1
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_ollama
+
+PORT = 11496
+COMMANDS = {"ask": "small", "summarize": "large", "Perform_Review": "large"}
+
+
+def traffic(requests, keep_alive, seed=1):
+    """(seconds to wait first, command) pairs: bursts, then idle stretches longer than keep_alive."""
+    rng = random.Random(seed)
+    return [(rng.uniform(0.1, 0.5) * keep_alive if rng.random() < 0.6 else rng.uniform(1.2, 3.0) * keep_alive,
+             rng.choice(list(COMMANDS)))
+            for _ in range(requests)]
+
+
+async def run_once(args, managed, llm_backend, model_lifecycle, scheduler):
+    runner = web.AppRunner(fake_ollama.make_app(args.tokens_per_second, 40, 60, parallel=2,
+                                                load_seconds=args.load_seconds, keep_alive=args.keep_alive, max_loaded=2))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    models = {"small": llm_backend.SMALL_MODEL, "large": llm_backend.LARGE_MODEL}
+    if managed:
+        lifecycle = model_lifecycle.ModelLifecycle(
+            llm_backend.OLLAMA, list(models.values()), quiet_hours="",
+            min_keep_alive=args.keep_alive, max_keep_alive=args.keep_alive * 24, default_keep_alive=args.keep_alive,
+            hot_window=args.keep_alive * 2, check_interval=args.keep_alive / 5,
+        )
+    else:
+        # Never started, and always asks for Ollama's default: only the accounting is used
+        lifecycle = model_lifecycle.ModelLifecycle(
+            llm_backend.OLLAMA, list(models.values()), quiet_hours="", pin_hot=False,
+            min_keep_alive=args.keep_alive, max_keep_alive=args.keep_alive, default_keep_alive=args.keep_alive,
+        )
+    llm_backend.models = lifecycle
+    if managed:
+        # What on_ready does; the bot is online before the first command
+        lifecycle.start()
+        await asyncio.sleep(args.load_seconds * len(models) + 0.5)
+
+    latencies = {command: [] for command in COMMANDS}
+    for n, (wait, command) in enumerate(traffic(args.requests, args.keep_alive)):
+        await asyncio.sleep(wait)
+        scheduler.current_request.set(scheduler.RequestInfo(command=command))
+        began = time.perf_counter()
+        await llm_backend.chat(f"request {n}: {command}", model=models[COMMANDS[command]])
+        latencies[command].append(time.perf_counter() - began)
+
+    await lifecycle.stop()
+    await runner.cleanup()
+    return latencies, lifecycle.snapshot()
+
+
+async def run(args):
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{PORT}"
+    os.environ["LLM_ROUTES"] = "ollama-small,ollama-large"
+    os.environ["LLM_MAX_CONCURRENCY"] = "2"
+    os.environ["BOT_LOG_LEVEL"] = "WARNING"
+    import http_client
+    import llm_backend
+    import model_lifecycle
+    import scheduler
+
+    for label, managed in (("Ollama default keep_alive", False), ("model_lifecycle", True)):
+        latencies, stats = await run_once(args, managed, llm_backend, model_lifecycle, scheduler)
+        print(f"{label}:")
+        for command, values in latencies.items():
+            entry = stats.get(command, {"cold_starts": 0, "avoided": 0, "saved_seconds": 0.0})
+            print(f"  {command:<15} {len(values):3d} calls  mean {sum(values) / max(len(values), 1):5.2f} s"
+                  f"  cold starts {entry['cold_starts']:3d}  avoided {entry['avoided']:3d}  saved {entry['saved_seconds']:6.2f} s")
+    await http_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--load-seconds", type=float, default=2.0)
+    parser.add_argument("--keep-alive", type=float, default=1.0, help="stands for Ollama's default 5 minutes")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Stub Ollama server for benchmarks and trying the bots without a GPU. Serves
+/api/chat like a DeepSeek R1 model would: a <think> block of
+--reasoning-tokens tokens, then --answer-tokens tokens of answer, at
+--tokens-per-second per generation after --latency seconds (prompt
+processing), at most --parallel generations at once (OLLAMA_NUM_PARALLEL).
+Honours "stream", "think": false, options.num_predict and a trailing
+assistant message (continued with the answer only).
+
+Models load like Ollama's: a request for a model that isn't loaded first
+waits --load-seconds (reported as load_duration), a model stays loaded for
+its request's keep_alive (--keep-alive seconds by default, -1 for good, 0
+unloads it) and at most --max-loaded fit at once. /api/generate without a
+prompt only loads or unloads.
+
+    python benchmarks/fake_ollama.py --port 11434 --tokens-per-second 40
+    OLLAMA_HOST=http://localhost:11434 python main.py
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+WORD = "tok "  # one token (llm_backend estimates four characters per token)
+
+
+def parse_keep_alive(value, default):
+    """Ollama's keep_alive: seconds, or a duration like "5m"; negative is forever."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value[-1:] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def make_app(tokens_per_second=40.0, reasoning_tokens=600, answer_tokens=120, parallel=1, latency=0.0,
+             load_seconds=0.0, keep_alive=300.0, max_loaded=None):
+    gpu = asyncio.Semaphore(parallel)
+    loaded = {}  # model -> when it unloads (monotonic), None while in use or kept for good
+
+    async def load(model):
+        """Returns the seconds spent loading model (0 if it already was)."""
+        now = time.monotonic()
+        for name, until in list(loaded.items()):
+            if until is not None and until <= now:
+                del loaded[name]
+        if model in loaded:
+            loaded[model] = None
+            return 0.0
+        if max_loaded is not None and len(loaded) >= max_loaded:
+            # Evict whichever would have expired first, like Ollama's scheduler
+            victim = min(loaded, key=lambda name: float("inf") if loaded[name] is None else loaded[name])
+            del loaded[victim]
+        await asyncio.sleep(load_seconds)
+        loaded[model] = None
+        return load_seconds
+
+    def release(model, body):
+        seconds = parse_keep_alive(body.get("keep_alive"), keep_alive)
+        if seconds == 0:
+            loaded.pop(model, None)
+        elif model in loaded:
+            loaded[model] = None if seconds < 0 else time.monotonic() + seconds
+
+    def tokens_for(body):
+        messages = body.get("messages") or [{}]
+        # A trailing assistant message is continued; the bot sends one with the reasoning closed
+        think = body.get("think", True) is not False and messages[-1].get("role") != "assistant"
+        tokens = (["<think>"] + [WORD] * reasoning_tokens + ["</think>", "\n\n"] if think else []) + [WORD] * answer_tokens
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict is not None and num_predict >= 0:
+            tokens = tokens[:num_predict]
+        return tokens
+
+    def chunk(body, content, done):
+        return {"model": body.get("model"), "message": {"role": "assistant", "content": content}, "done": done}
+
+    async def chat(request):
+        body = await request.json()
+        tokens = tokens_for(body)
+        async with gpu:
+            load_duration = await load(body.get("model"))
+            done = {"eval_count": len(tokens), "load_duration": int(load_duration * 1e9)}
+            if not body.get("stream", True):
+                await asyncio.sleep(latency + len(tokens) / tokens_per_second)
+                release(body.get("model"), body)
+                return web.json_response(dict(chunk(body, "".join(tokens), True), **done))
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            began = time.monotonic() + latency
+            try:
+                for n, token in enumerate(tokens, 1):
+                    # Sleep to the schedule rather than per token, so timer slack doesn't add up
+                    delay = began + n / tokens_per_second - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    await response.write(json.dumps(chunk(body, token, False)).encode() + b"\n")
+                await response.write(json.dumps(dict(chunk(body, "", True), **done)).encode() + b"\n")
+                await response.write_eof()
+            except ConnectionResetError:
+                pass  # The client stopped reading (e.g. cut the reasoning short); Ollama stops generating too
+            finally:
+                release(body.get("model"), body)
+            return response
+
+    async def generate(request):
+        body = await request.json()
+        model = body.get("model")
+        if parse_keep_alive(body.get("keep_alive"), keep_alive) == 0:
+            loaded.pop(model, None)
+            return web.json_response({"model": model, "response": "", "done": True, "done_reason": "unload"})
+        async with gpu:
+            load_duration = await load(model)
+            release(model, body)
+        return web.json_response({"model": model, "response": "", "done": True, "done_reason": "load",
+                                  "load_duration": int(load_duration * 1e9)})
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    app.router.add_post("/api/generate", generate)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--reasoning-tokens", type=int, default=600)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--load-seconds", type=float, default=0.0)
+    parser.add_argument("--keep-alive", type=float, default=300.0)
+    parser.add_argument("--max-loaded", type=int)
+    args = parser.parse_args()
+    app = make_app(args.tokens_per_second, args.reasoning_tokens, args.answer_tokens, args.parallel, args.latency,
+                   args.load_seconds, args.keep_alive, args.max_loaded)
+    web.run_app(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for yt-dlp, enough for exercising shorts.py without network
+access. Point the bots or a script at it with
+
+    YT_DLP_PATH=benchmarks/fake_yt_dlp.py
+
+It understands -J (prints metadata with a realistic format list), -f and
+-o. Video ids starting with "big" only have formats over 25MB, ids starting
+with "fail" make it exit with an error. FAKE_YT_DLP_DELAY adds seconds of
+latency to every call.
+"""
+import json
+import os
+import sys
+import time
+
+MB = 1024 * 1024
+DURATION = 45
+
+
+def formats_for(video_id):
+    scale = 10 if video_id.startswith("big") else 1
+    return [
+        {"format_id": "18", "vcodec": "avc1", "acodec": "mp4a", "height": 360, "tbr": 500, "filesize": 3 * MB * scale},
+        {"format_id": "22", "vcodec": "avc1", "acodec": "mp4a", "height": 720, "tbr": 1500, "filesize": 9 * MB * scale},
+        {"format_id": "137", "vcodec": "avc1", "acodec": "none", "height": 1080, "tbr": 4000, "filesize": 24 * MB * scale},
+        {"format_id": "136", "vcodec": "avc1", "acodec": "none", "height": 720, "tbr": 2200, "filesize_approx": 12 * MB * scale},
+        {"format_id": "140", "vcodec": "none", "acodec": "mp4a", "tbr": 128, "filesize": 1 * MB * scale},
+        # No size reported, only a bitrate
+        {"format_id": "251", "vcodec": "none", "acodec": "opus", "tbr": 160},
+    ]
+
+
+def file_size(fmt):
+    return fmt.get("filesize") or fmt.get("filesize_approx") or fmt["tbr"] * 1000 // 8 * DURATION
+
+
+def main(args):
+    time.sleep(float(os.getenv("FAKE_YT_DLP_DELAY", "0")))
+    url = args[-1]
+    video_id = url.rstrip("/").rsplit("/", 1)[-1].split("?")[0]
+    if video_id.startswith("fail"):
+        print(f"ERROR: [youtube] {video_id}: Video unavailable", file=sys.stderr)
+        return 1
+
+    formats = formats_for(video_id)
+    if "-J" in args:
+        print(json.dumps({"id": video_id, "duration": DURATION, "formats": formats}))
+        return 0
+
+    by_id = {fmt["format_id"]: fmt for fmt in formats}
+    wanted = args[args.index("-f") + 1].split("+") if "-f" in args else ["22"]
+    size = sum(file_size(by_id[format_id]) for format_id in wanted)
+    template = args[args.index("-o") + 1] if "-o" in args else "%(id)s.%(ext)s"
+    path = template.replace("%(id)s", video_id).replace("%(ext)s", "mp4")
+    with open(path, "wb") as file:
+        file.truncate(size)  # Sparse, so big fakes cost no disk
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,509 @@
+"""
+End-to-end load test of the combined bot (main.py) with nothing real behind
+it: gateway events are fed straight into discord.py's parsers, REST calls and
+interaction callbacks are answered by an in-process fake Discord, the model
+is the stub Ollama in fake_ollama.py (its own process, so its work doesn't
+show up as event-loop lag) and Shorts downloads use fake_yt_dlp.py.
+
+Each scenario has --users virtual users, each in their own channel, sending
+--requests commands between them as fast as the bot answers. Commands that
+wait for a follow-up message (!summarize, !Perform_Review, !JoinGroup) get
+it as soon as the bot's prompt shows up. A command's latency runs from its
+gateway event until discord.py reports it finished (for Shorts: until the
+video is posted). Reported: throughput, p50/p99 latency and how late the
+event loop ran a 10 ms timer meanwhile.
+
+    python benchmarks/load_test.py --users 8 --requests 40 --tokens-per-second 200
+    python benchmarks/load_test.py --scenarios view_common,set_availability --users 50 --requests 2000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import discord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+APP_ID = 900_000_000_000_000_001
+GUILD_ID = 900_000_000_000_000_002
+BOT_USER_ID = 900_000_000_000_000_003
+FIRST_USER_ID = 800_000_000_000_000_000
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+# How the cogs word a failure they handled themselves
+ERROR_PREFIXES = ("⚠️", "❌", "Timed out or an error", "Request failed", "Error")
+LAG_PROBE_INTERVAL = 0.01
+
+TEXT = ("The team shipped the new onboarding flow two weeks early, cut the support backlog in half and "
+        "wrote the runbook everyone now uses for incidents. Code reviews were thorough but sometimes slow, "
+        "and the migration plan slipped once because a dependency was not flagged early enough. ") * 3
+
+
+def user(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None}
+
+
+def member(user_id):
+    return {"user": user(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}
+
+
+def channel(channel_id):
+    return {"id": str(channel_id), "type": 0, "guild_id": str(GUILD_ID), "name": f"load-{channel_id}",
+            "position": 0, "permission_overwrites": []}
+
+
+class FakeDiscord:
+    """The gateway and REST API as seen by one bot in one guild."""
+
+    def __init__(self, users, rest_latency):
+        self.users = users
+        self.rest_latency = rest_latency
+        self.bot_user = dict(user(BOT_USER_ID), username="loadbot", bot=True)
+        self._ids = itertools.count()
+        self._channels_by_token = {}
+        self.sent = {u.channel_id: [] for u in users}
+        self._changed = {u.channel_id: asyncio.Condition() for u in users}
+        self._pending = {}
+        self.posted = {}  # channel id -> the bot's last message there, with its buttons
+        self.parsers = None
+
+    def connect(self, bot):
+        self.parsers = bot._connection.parsers
+        self.parsers["GUILD_CREATE"]({
+            "id": str(GUILD_ID), "name": "load test", "unavailable": False, "owner_id": str(FIRST_USER_ID),
+            "member_count": len(self.users), "large": False,
+            "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "2147483647", "position": 0, "color": 0,
+                       "hoist": False, "managed": False, "mentionable": False, "flags": 0}],
+            "channels": [channel(u.channel_id) for u in self.users],
+            "members": [], "presences": [], "voice_states": [], "threads": [], "emojis": [], "stickers": [],
+            "features": [], "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+        })
+
+    def snowflake(self):
+        # Timestamped like real ids: interaction latency is measured from them
+        return discord.utils.time_snowflake(discord.utils.utcnow()) | (next(self._ids) & 0x3FFFFF)
+
+    # -------------------------------
+    # Gateway: what users do
+    # -------------------------------
+    def start(self, u):
+        """Begins timing one command of u; resolved by finish()."""
+        self.sent[u.channel_id].clear()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[u.channel_id] = (time.perf_counter(), future)
+        return future
+
+    def finish(self, channel_id, failed=False):
+        began, future = self._pending.pop(channel_id, (None, None))
+        if future is None or future.done():
+            return
+        failed = failed or any(content.startswith(ERROR_PREFIXES) for content in self.sent[channel_id])
+        future.set_result((time.perf_counter() - began, failed))
+
+    def message(self, u, content):
+        self.parsers["MESSAGE_CREATE"]({
+            "id": str(self.snowflake()), "channel_id": str(u.channel_id), "guild_id": str(GUILD_ID),
+            "author": user(u.id), "member": {key: value for key, value in member(u.id).items() if key != "user"},
+            "content": content, "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0,
+        })
+
+    def _interaction(self, u, interaction_type, data, **extra):
+        interaction_id = self.snowflake()
+        token = f"token{interaction_id}"
+        self._channels_by_token[token] = u.channel_id
+        self.parsers["INTERACTION_CREATE"](dict({
+            "id": str(interaction_id), "application_id": str(APP_ID), "type": interaction_type, "token": token, "version": 1,
+            "guild_id": str(GUILD_ID), "channel_id": str(u.channel_id), "channel": channel(u.channel_id),
+            "member": dict(member(u.id), permissions="2147483647"), "data": data,
+            "locale": "en-US", "guild_locale": "en-US", "app_permissions": "2147483647",
+            "attachment_size_limit": 25 * 1024 * 1024, "entitlements": [],
+            "authorizing_integration_owners": {"0": str(GUILD_ID)}, "context": 0,
+        }, **extra))
+
+    def interaction(self, u, name, **options):
+        self._interaction(u, 2, {"id": str(APP_ID + 1), "name": name, "type": 1, "options": [
+            {"name": key, "type": 4 if isinstance(value, int) else 3, "value": value} for key, value in options.items()
+        ]})
+
+    def click(self, u, label):
+        """Presses the button labelled label under the bot's last message in u's channel."""
+        message = self.posted[u.channel_id]
+        custom_id = next(button["custom_id"] for row in message["components"] for button in row["components"]
+                         if button.get("label") == label)
+        self._interaction(u, 3, {"custom_id": custom_id, "component_type": 2}, message=message)
+
+    async def sends(self, u, count):
+        """Waits until the bot has sent count messages to u's channel."""
+        condition = self._changed[u.channel_id]
+        async with condition:
+            await condition.wait_for(lambda: len(self.sent[u.channel_id]) >= count)
+
+    # -------------------------------
+    # REST: what the bot does
+    # -------------------------------
+    def message_payload(self, channel_id, content, files=(), webhook=False, embeds=(), components=()):
+        message_id = self.snowflake()
+        payload = {
+            "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(GUILD_ID), "author": self.bot_user,
+            "content": content or "", "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "embeds": list(embeds),
+            "components": list(components), "pinned": False, "type": 0,
+            "attachments": [{"id": str(message_id), "filename": file.filename, "size": 0,
+                             "url": f"https://cdn.example/{message_id}/{file.filename}",
+                             "proxy_url": f"https://cdn.example/{message_id}/{file.filename}"} for file in files],
+        }
+        if webhook:
+            payload["webhook_id"] = str(APP_ID)
+        return payload
+
+    async def _record(self, channel_id, content):
+        if channel_id not in self.sent:
+            return
+        self.sent[channel_id].append(content or "")
+        condition = self._changed[channel_id]
+        async with condition:
+            condition.notify_all()
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        await asyncio.sleep(self.rest_latency)
+        body = kwargs.get("json")
+        if body is None and form:
+            body = json.loads(form[0]["value"])
+        body = body or {}
+        if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+            await self._record(route.channel_id, body.get("content"))
+            payload = self.message_payload(route.channel_id, body.get("content"), files or (),
+                                           embeds=body.get("embeds") or (), components=body.get("components") or ())
+            self.posted[route.channel_id] = payload
+            return payload
+        if route.method == "PATCH" and route.path == "/channels/{channel_id}/messages/{message_id}":
+            return self.message_payload(route.channel_id, body.get("content"))
+        return None
+
+    async def webhook_request(self, route, session=None, *, payload=None, multipart=None, files=None, **kwargs):
+        # Interaction callbacks and followups; the webhook token is the interaction's
+        await asyncio.sleep(self.rest_latency)
+        if payload is None and multipart:
+            payload = json.loads(multipart[0]["value"])
+        payload = payload or {}
+        channel_id = self._channels_by_token.get(route.webhook_token)
+        if route.path.endswith("/callback"):
+            response_type = payload["type"]
+            data = payload.get("data") or {}
+            resource = {"type": response_type}
+            message_id = None
+            if response_type in (4, 7):  # A new message, or a message updated in place (page buttons)
+                await self._record(channel_id, data.get("content"))
+                resource["message"] = self.message_payload(channel_id, data.get("content"), webhook=True,
+                                                           embeds=data.get("embeds") or (), components=data.get("components") or ())
+                message_id = resource["message"]["id"]
+            return {
+                "interaction": {"id": str(route.webhook_id), "type": 2, "response_message_id": message_id,
+                                "response_message_loading": response_type == 5, "response_message_ephemeral": False},
+                "resource": resource,
+            }
+        if route.method == "POST":
+            await self._record(channel_id, payload.get("content"))
+        return self.message_payload(channel_id, payload.get("content"), files or (), webhook=True)
+
+
+# -------------------------------
+# Scenarios: one command each, returns (seconds, failed)
+# -------------------------------
+async def summarize(fake, u, n):
+    done = fake.start(u)
+    fake.message(u, "!summarize")
+    await fake.sends(u, 1)
+    fake.message(u, f"Request {n}. {TEXT}")
+    return await done
+
+
+async def perform_review(fake, u, n):
+    done = fake.start(u)
+    fake.message(u, "!Perform_Review")
+    await fake.sends(u, 1)
+    fake.message(u, f"Request {n}. {TEXT}")
+    return await done
+
+
+async def join_group(fake, u, n):
+    done = fake.start(u)
+    fake.message(u, "!JoinGroup")
+    await fake.sends(u, 1)
+    fake.message(u, f"user{u.id} {n % 8 + 1}")
+    return await done
+
+
+async def summarize_slash(fake, u, n):
+    done = fake.start(u)
+    fake.interaction(u, "summarize", text=f"Request {n}. {TEXT}")
+    return await done
+
+
+async def join_group_slash(fake, u, n):
+    done = fake.start(u)
+    fake.interaction(u, "join_group", username=f"user{u.id}", group_number=str(n % 8 + 1))
+    return await done
+
+
+async def batch_review(fake, u, n):
+    # Joining the group and submitting are setup; the group grows with every run
+    for name, options in (("join_group", {"username": f"user{u.id}", "group_number": "batch"}),
+                          ("submit_review", {"text": f"Request {n}. {TEXT}"})):
+        saved = fake.start(u)
+        fake.interaction(u, name, **options)
+        await saved
+    done = fake.start(u)
+    fake.interaction(u, "batch_review", group="batch")
+    return await done
+
+
+async def set_availability(fake, u, n):
+    rng = random.Random(n)
+    start = rng.randrange(8 * 60, 16 * 60, 30)
+    done = fake.start(u)
+    fake.interaction(u, "set_availability", day=rng.choice(DAYS), start_time=f"{start // 60:02d}:{start % 60:02d}",
+                     end_time=f"{(start + 180) // 60:02d}:{start % 60:02d}")
+    return await done
+
+
+async def view_common(fake, u, n):
+    done = fake.start(u)
+    fake.interaction(u, "view_common", quorum=50)
+    return await done
+
+
+async def show_groups(fake, u, n):
+    # The first page, then a turn to the second one, which is fetched only now
+    done = fake.start(u)
+    fake.message(u, "!ShowGroups")
+    seconds, failed = await done
+    turned = fake.start(u)
+    fake.click(u, "›")
+    await fake.sends(u, 1)
+    fake.finish(u.channel_id)
+    turn_seconds, turn_failed = await turned
+    return seconds + turn_seconds, failed or turn_failed
+
+
+async def ask(fake, u, n):
+    done = fake.start(u)
+    fake.message(u, f"!ask ({n}) what makes a good code review?")
+    return await done
+
+
+async def opinions(fake, u, n):
+    # Saving the thought first is setup, not part of the measured command
+    saved = fake.start(u)
+    fake.message(u, f"!thoughts request {n}: code reviews should be quicker")
+    await saved
+    done = fake.start(u)
+    fake.message(u, f"!opinions user{u.id}")
+    return await done
+
+
+async def shorts_link(fake, u, n):
+    done = fake.start(u)
+    fake.message(u, f"look at this https://youtube.com/shorts/load{n:07d}")
+    await fake.sends(u, 2)  # The greeting, then the video
+    fake.finish(u.channel_id)
+    return await done
+
+
+SCENARIOS = {
+    "summarize": summarize,
+    "Perform_Review": perform_review,
+    "JoinGroup": join_group,
+    "ShowGroups": show_groups,
+    "summarize_slash": summarize_slash,
+    "join_group": join_group_slash,
+    "batch_review": batch_review,
+    "set_availability": set_availability,
+    "view_common": view_common,
+    "ask": ask,
+    "opinions": opinions,
+    "on_message": shorts_link,
+}
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+
+
+# -------------------------------
+# Running and reporting
+# -------------------------------
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def probe_loop_lag(lags):
+    while True:
+        began = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - began - LAG_PROBE_INTERVAL))
+
+
+async def run_load(fake, scenarios, requests, timeout):
+    """Runs requests commands (cycling through scenarios) from every virtual user at once."""
+    numbers = itertools.count()
+    latencies, lags = [], []
+    errors = 0
+
+    async def virtual_user(u):
+        nonlocal errors
+        while (n := next(numbers)) < requests:
+            try:
+                seconds, failed = await asyncio.wait_for(scenarios[n % len(scenarios)](fake, u, n), timeout)
+            except asyncio.TimeoutError:
+                # Late replies would land in the next command's channel log, so this user stops
+                errors += 1
+                return
+            latencies.append(seconds)
+            errors += failed
+
+    probe = asyncio.create_task(probe_loop_lag(lags))
+    began = time.perf_counter()
+    await asyncio.gather(*(virtual_user(u) for u in fake.users))
+    elapsed = time.perf_counter() - began
+    probe.cancel()
+    return SimpleNamespace(count=len(latencies), errors=errors, elapsed=elapsed, latencies=latencies, lags=lags)
+
+
+def report(label, result):
+    rate = result.count / result.elapsed if result.elapsed else 0
+    print(f"{label:<17} {result.count:6d} ok {result.errors:4d} err {rate:9.1f} req/s"
+          f"   p50 {percentile(result.latencies, 0.5) * 1000:8.1f} ms  p99 {percentile(result.latencies, 0.99) * 1000:8.1f} ms"
+          f"   loop lag p99 {percentile(result.lags, 0.99) * 1000:6.1f} ms  max {max(result.lags, default=0) * 1000:6.1f} ms")
+
+
+def start_fake_ollama(args):
+    process = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "fake_ollama.py"), "--port", str(args.ollama_port),
+        "--tokens-per-second", str(args.tokens_per_second), "--latency", str(args.latency),
+        "--reasoning-tokens", str(args.reasoning_tokens), "--answer-tokens", str(args.answer_tokens),
+        "--parallel", str(args.parallel),
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", args.ollama_port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit(f"fake_ollama.py did not start on port {args.ollama_port}")
+
+
+async def run(args, names):
+    import bot_store
+    import main
+
+    users = [SimpleNamespace(id=FIRST_USER_ID + i, channel_id=GUILD_ID + 1 + i) for i in range(args.users)]
+    fake = FakeDiscord(users, args.rest_latency)
+
+    class LoadBot(main.Bot):
+        async def setup_hook(self):
+            # No /metrics endpoint and no command sync, there is no Discord to sync to
+            await self.open_store()
+            for name in self.cog_names:
+                await self.load_extension(f"cogs.{name}")
+
+        async def invoke(self, ctx):
+            try:
+                await super().invoke(ctx)
+            finally:
+                if ctx.command is not None:
+                    fake.finish(ctx.channel.id, ctx.command_failed)
+
+        async def on_app_command_completion(self, interaction, command):
+            await super().on_app_command_completion(interaction, command)
+            fake.finish(interaction.channel_id)
+
+    bot = LoadBot(main.enabled_cogs())
+    async with bot:
+        bot.http.request = fake.request
+        discord.webhook.async_.async_context.get().request = fake.webhook_request
+        bot._connection.user = discord.ClientUser(state=bot._connection, data=fake.bot_user)
+        bot._connection.application_id = APP_ID
+
+        @bot.tree.error
+        async def on_tree_error(interaction, error):
+            await main.MetricsTree.on_error(bot.tree, interaction, error)
+            fake.finish(interaction.channel_id, failed=True)
+
+        await bot.setup_hook()
+        fake.connect(bot)
+
+        # Everyone is registered before /view_common and /set_availability are measured
+        for u in users:
+            done = fake.start(u)
+            fake.interaction(u, "register", preferred_name=f"user{u.id}", email=f"user{u.id}@example.com",
+                             phone="555-0100", major="Computer Science")
+            await done
+        # Enough group members for !ShowGroups to have pages to turn
+        for i in range(3 * bot_store.GROUPS_PAGE_SIZE):
+            await bot.store.add_group_member(str(GUILD_ID), "load test", str(i), f"member{i}", str(i % 8 + 1))
+
+        for name in names:
+            report(name, await run_load(fake, [SCENARIOS[name]], args.requests, args.timeout))
+        if args.mixed:
+            report("mixed", await run_load(fake, [SCENARIOS[name] for name in names], args.requests, args.timeout))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--no-mixed", dest="mixed", action="store_false", help="skip the run with all scenarios interleaved")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40, help="commands per scenario")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a command counts as lost")
+    parser.add_argument("--rest-latency", type=float, default=0.03, help="seconds per Discord REST call")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the stub model's first token")
+    parser.add_argument("--reasoning-tokens", type=int, default=300)
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--parallel", type=int, default=2, help="generations at once (LLM_MAX_CONCURRENCY too)")
+    parser.add_argument("--ollama-port", type=int, default=11498)
+    args = parser.parse_args()
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(SCENARIOS))
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+
+    # Settings modules read at import time, so these go in before main is imported
+    work = tempfile.mkdtemp(prefix="bot-load-")
+    os.chdir(work)  # SQLite databases
+    os.environ.update({
+        "OLLAMA_HOST": f"http://127.0.0.1:{args.ollama_port}",
+        "LLM_ROUTES": "ollama-large",
+        "LLM_MAX_CONCURRENCY": str(args.parallel),
+        "METRICS_PORT": "0",
+        "BOT_LOG_LEVEL": "WARNING",
+        "YT_DLP_PATH": os.path.join(HERE, "fake_yt_dlp.py"),
+        "SHORTS_WORK_DIR": os.path.join(work, "downloads"),
+        "MEDIA_CACHE_DIR": os.path.join(work, "media"),
+    })
+    print(f"{args.users} users, {args.requests} commands per scenario, model {args.tokens_per_second:g} tokens/s "
+          f"after {args.latency:g} s ({args.parallel} at once), Discord REST {args.rest_latency * 1000:g} ms; data in {work}")
+    ollama = start_fake_ollama(args)
+    try:
+        asyncio.run(run(args, names))
+    finally:
+        ollama.terminate()
+
+
+if __name__ == "__main__":
+    main()
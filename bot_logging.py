@@ -0,0 +1,55 @@
+import logging
+import os
+import time
+
+# =================================================================================
+#                   RATE-LIMITED LOGGING FOR HOT PATHS
+# =================================================================================
+# Handlers like on_message run for every message the bot can see, so a print
+# per message floods the console and costs real time on busy servers. Loggers
+# from get_logger() write one key=value line per event and let at most
+# MAX_RECORDS records of the same kind through every INTERVAL seconds; the
+# rest are dropped and counted in the next record that gets through.
+
+LOG_LEVEL = os.getenv("BOT_LOG_LEVEL", "INFO").upper()
+MAX_RECORDS = 20
+INTERVAL = 10.0  # seconds
+
+FORMAT = "%(asctime)s level=%(levelname)s logger=%(name)s %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, max_records=MAX_RECORDS, interval=INTERVAL):
+        super().__init__()
+        self.max_records = max_records
+        self.interval = interval
+        self._windows = {}  # (logger, message template) -> [window start, passed, dropped]
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            dropped = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if dropped:
+                record.msg = f"{record.msg} suppressed={dropped}"
+            return True
+        if window[1] < self.max_records:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+def get_logger(name):
+    """Returns a rate-limited logger writing key=value lines to stderr."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(FORMAT))
+        handler.addFilter(RateLimitFilter())
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False  # discord.py's root handler would print it twice
+    return logger
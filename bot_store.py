@@ -0,0 +1,205 @@
+import os
+import re
+import sqlite3
+
+from storage import AsyncDatabase
+
+# =================================================================================
+#                   INDEXED STORE FOR GROUPS AND SAVED THOUGHTS
+# =================================================================================
+# Replaces the Bot_Storage.txt and thoughts.txt flat files. Lookups go through
+# indexes keyed by guild and user, so they cost O(matching rows) instead of a
+# scan of the whole history, and usernames are matched exactly rather than by
+# substring.
+
+STORE_PATH = "bot_store.db"
+GROUPS_PAGE_SIZE = 20
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS group_members (
+        id INTEGER PRIMARY KEY,
+        guild_id TEXT,
+        guild_name TEXT NOT NULL,
+        user_id TEXT,
+        username TEXT NOT NULL,
+        group_number TEXT NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS group_members_by_guild ON group_members (guild_id, id)",
+    "CREATE INDEX IF NOT EXISTS group_members_by_guild_name ON group_members (guild_name, id)",
+    '''
+    CREATE TABLE IF NOT EXISTS thoughts (
+        id INTEGER PRIMARY KEY,
+        guild_id TEXT,
+        user_id TEXT,
+        username TEXT NOT NULL,
+        thought TEXT NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS thoughts_by_user ON thoughts (guild_id, user_id, id)",
+    # Names are resolved to user ids within a guild; imported rows have neither id
+    "CREATE INDEX IF NOT EXISTS thoughts_by_guild_username ON thoughts (guild_id, username, id)",
+    # Rolling LLM summary per member and the last thought folded into it
+    '''
+    CREATE TABLE IF NOT EXISTS opinion_summaries (
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        last_thought_id INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id)
+    )
+    ''',
+    # The latest text each member submitted for review, for /batch_review
+    '''
+    CREATE TABLE IF NOT EXISTS review_submissions (
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (guild_id, user_id)
+    )
+    ''',
+    # Remembers which legacy text files have already been imported
+    "CREATE TABLE IF NOT EXISTS legacy_imports (path TEXT PRIMARY KEY)",
+]
+
+INSERT_GROUP_MEMBER = "INSERT INTO group_members (guild_id, guild_name, user_id, username, group_number) VALUES (?, ?, ?, ?, ?)"
+# Rows imported from Bot_Storage.txt only know the guild's name
+GUILD_FILTER = "(guild_id = ? OR (guild_id IS NULL AND guild_name = ?))"
+COUNT_GROUP_MEMBERS = f"SELECT COUNT(*) FROM group_members WHERE {GUILD_FILTER}"
+COUNT_GROUP_MEMBERS_IN_GROUP = f"SELECT COUNT(*) FROM group_members WHERE {GUILD_FILTER} AND group_number = ?"
+PAGE_GROUP_MEMBERS = f"SELECT guild_name, username, group_number FROM group_members WHERE {GUILD_FILTER} ORDER BY id LIMIT ? OFFSET ?"
+PAGE_GROUP_MEMBERS_IN_GROUP = f"SELECT guild_name, username, group_number FROM group_members WHERE {GUILD_FILTER} AND group_number = ? ORDER BY id LIMIT ? OFFSET ?"
+# Members with a Discord id (imported rows have none), under the name they last joined with
+SELECT_GROUP_USERS = f"SELECT user_id, username, MAX(id) FROM group_members WHERE {GUILD_FILTER} AND group_number = ? AND user_id IS NOT NULL GROUP BY user_id ORDER BY MIN(id)"
+UPSERT_SUBMISSION = "INSERT OR REPLACE INTO review_submissions VALUES (?, ?, ?)"
+SELECT_SUBMISSIONS = "SELECT user_id, text FROM review_submissions WHERE guild_id = ?"
+INSERT_THOUGHT = "INSERT INTO thoughts (guild_id, user_id, username, thought) VALUES (?, ?, ?, ?)"
+# Imported rows have no guild or user id; they count for whoever has that name
+LEGACY_THOUGHT_FILTER = "(guild_id IS NULL AND user_id IS NULL AND username = ?)"
+# The member who last saved a thought in the guild under this name (None: only imported rows)
+SELECT_THOUGHT_AUTHOR = (
+    "SELECT user_id FROM thoughts WHERE (guild_id = ? AND username = ?) "
+    f"OR {LEGACY_THOUGHT_FILTER} ORDER BY user_id IS NULL, id DESC LIMIT 1"
+)
+SELECT_THOUGHTS_SINCE = f"SELECT id, thought FROM thoughts WHERE ((guild_id = ? AND user_id = ?) OR {LEGACY_THOUGHT_FILTER}) AND id > ? ORDER BY id"
+SELECT_OPINION_SUMMARY = "SELECT summary, last_thought_id FROM opinion_summaries WHERE guild_id = ? AND user_id = ?"
+UPSERT_OPINION_SUMMARY = "INSERT OR REPLACE INTO opinion_summaries VALUES (?, ?, ?, ?)"
+
+LEGACY_THOUGHT = re.compile(r"^user (.+?): (.*)$")
+
+
+class BotStore:
+    """
+    Async access to groups and thoughts. guild_id/user_id are Discord ids as
+    strings (None in DMs or for rows imported from the old text files).
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.db = AsyncDatabase(path, schema=SCHEMA)
+
+    # -------------------------------
+    # Groups
+    # -------------------------------
+    async def add_group_member(self, guild_id, guild_name, user_id, username, group_number):
+        await self.db.write([(INSERT_GROUP_MEMBER, (guild_id, guild_name, user_id, username, group_number))])
+
+    async def group_members(self, guild_id, guild_name, page=1, group_number=None, page_size=GROUPS_PAGE_SIZE):
+        """
+        One page of (guild_name, username, group_number) rows for a guild,
+        optionally for a single group. Returns (rows, total_rows).
+        """
+        offset = (page - 1) * page_size
+        if group_number is None:
+            total = await self.db.fetchone(COUNT_GROUP_MEMBERS, (guild_id, guild_name))
+            rows = await self.db.fetchall(PAGE_GROUP_MEMBERS, (guild_id, guild_name, page_size, offset))
+        else:
+            total = await self.db.fetchone(COUNT_GROUP_MEMBERS_IN_GROUP, (guild_id, guild_name, group_number))
+            rows = await self.db.fetchall(PAGE_GROUP_MEMBERS_IN_GROUP, (guild_id, guild_name, group_number, page_size, offset))
+        return rows, total[0]
+
+    async def group_users(self, guild_id, guild_name, group_number):
+        """(user_id, username) of everyone who joined a group, in joining order."""
+        rows = await self.db.fetchall(SELECT_GROUP_USERS, (guild_id, guild_name, group_number))
+        return [(user_id, username) for user_id, username, _ in rows]
+
+    # -------------------------------
+    # Review submissions
+    # -------------------------------
+    async def save_submission(self, guild_id, user_id, text):
+        await self.db.write([(UPSERT_SUBMISSION, (guild_id, user_id, text))])
+
+    async def submissions(self, guild_id):
+        """{user_id: text} of the latest submission of each member of a guild."""
+        return dict(await self.db.fetchall(SELECT_SUBMISSIONS, (guild_id,)))
+
+    # -------------------------------
+    # Thoughts
+    # -------------------------------
+    async def add_thought(self, guild_id, user_id, username, thought):
+        await self.db.write([(INSERT_THOUGHT, (guild_id, user_id, username, thought))])
+
+    async def thought_author(self, guild_id, username):
+        """
+        Returns (found, user_id) for a name as saved in a guild's thoughts.
+        user_id is None when the name only appears in imported rows.
+        """
+        row = await self.db.fetchone(SELECT_THOUGHT_AUTHOR, (guild_id, username, username))
+        return (True, row[0]) if row else (False, None)
+
+    async def thoughts_since(self, guild_id, user_id, username, after_id=0):
+        """
+        (id, thought) rows a member saved in a guild after after_id, plus the
+        imported ones under their name, oldest first.
+        """
+        return await self.db.fetchall(SELECT_THOUGHTS_SINCE, (guild_id, user_id, username, after_id))
+
+    # -------------------------------
+    # Opinion summaries
+    # -------------------------------
+    async def opinion_summary(self, guild_id, user_id):
+        """Returns (summary, last_thought_id) or None if never summarized."""
+        return await self.db.fetchone(SELECT_OPINION_SUMMARY, (guild_id, user_id))
+
+    async def save_opinion_summary(self, guild_id, user_id, summary, last_thought_id):
+        await self.db.write([(UPSERT_OPINION_SUMMARY, (guild_id, user_id, summary, last_thought_id))])
+
+
+def import_legacy_files(path=STORE_PATH, groups_file="Bot_Storage.txt", thoughts_file="thoughts.txt"):
+    """
+    One-time import of the old flat files. Each file is only imported once;
+    the originals are left in place.
+    """
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    with conn:
+        if _should_import(conn, groups_file):
+            with open(groups_file) as file:
+                next(file, None)  # "Guild, Username, Group Number" header
+                rows = []
+                for line in file:
+                    parts = [part.strip() for part in line.rsplit(",", 2)]
+                    if len(parts) == 3:
+                        rows.append((None, parts[0], None, parts[1], parts[2]))
+            conn.executemany(INSERT_GROUP_MEMBER, rows)
+        if _should_import(conn, thoughts_file):
+            with open(thoughts_file) as file:
+                rows = []
+                for line in file:
+                    match = LEGACY_THOUGHT.match(line.rstrip("\n"))
+                    if match:
+                        rows.append((None, None, match.group(1), match.group(2)))
+            conn.executemany(INSERT_THOUGHT, rows)
+    conn.close()
+
+
+def _should_import(conn, file_path):
+    if not os.path.exists(file_path):
+        return False
+    key = os.path.abspath(file_path)
+    if conn.execute("SELECT 1 FROM legacy_imports WHERE path = ?", (key,)).fetchone():
+        return False
+    conn.execute("INSERT INTO legacy_imports VALUES (?)", (key,))
+    return True
@@ -0,0 +1,23 @@
+# =================================================================================
+#                   FEATURE MODULES FOR THE COMBINED BOT (main.py)
+# =================================================================================
+# Each module is a discord.py extension holding one cog. A deployment picks
+# the ones it wants with BOT_COGS (comma separated, default: all of them), and
+# only the dependencies of enabled cogs are ever imported.
+
+AVAILABLE = ["general", "groups", "thoughts", "llm", "shorts", "scheduling"]
+
+# Gateway intents each cog relies on. "guilds" is always on (slash commands
+# and the channel cache need it); nothing here needs presences or members,
+# which are by far the noisiest event streams.
+INTENTS = {
+    "general": ("guild_messages", "dm_messages", "message_content"),
+    "groups": ("guild_messages", "message_content"),
+    "thoughts": ("guild_messages", "dm_messages", "message_content"),
+    "llm": ("guild_messages", "dm_messages", "message_content"),
+    "shorts": ("guild_messages", "message_content"),
+    "scheduling": (),
+}
+
+# Cogs that keep their data in the shared BotStore (main.Bot.store)
+USES_STORE = {"groups", "thoughts", "llm"}
@@ -0,0 +1,36 @@
+from discord.ext import commands
+
+
+class General(commands.Cog):
+    """Small talk and the command list."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command()
+    async def ping(self, ctx):
+        """Checks that the bot is alive"""
+        await ctx.send("pong!")
+
+    @commands.command()
+    async def hello(self, ctx):
+        """Says hello back"""
+        await ctx.send("World!")
+
+    @commands.command()
+    async def HiShmeer(self, ctx):
+        """Says hello back, politely"""
+        await ctx.send("Hello! Happy to see you!")
+
+    @commands.command()
+    async def commandhelp(self, ctx):
+        """Shows this help message"""
+        # Built from whatever cogs this deployment has enabled
+        lines = ["List of Commands:"]
+        for command in sorted(self.bot.commands, key=lambda command: command.name.lower()):
+            lines.append(f"!{command.name}: {command.short_doc}" if command.short_doc else f"!{command.name}")
+        await ctx.send("\n".join(lines))
+
+
+async def setup(bot):
+    await bot.add_cog(General(bot))
@@ -0,0 +1,86 @@
+import asyncio
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import bot_store
+import discord_output
+import metrics
+
+
+class Groups(commands.Cog):
+    """Per-server group sign-ups (from the DPB bot)."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def save_member(self, guild, user_id, username, group_number):
+        # Save the entry under this guild
+        await self.bot.store.add_group_member(str(guild.id), guild.name, str(user_id), username, group_number)
+        return f"Saved: Guild = {guild.name}, Username = {username}, Group Number = {group_number}"
+
+    @commands.command()
+    async def JoinGroup(self, ctx, *, entry: str = None):
+        """Assign your Username and Group #: !JoinGroup [username group]"""
+        try:
+            if entry is None:
+                await ctx.send("Please enter your username followed by your group number, separated by a space (e.g., 'Amir 2').")
+                # The user's next message in this channel is the answer (up to 60 seconds)
+                message = await self.bot.conversations.wait_for_reply(ctx.channel.id, ctx.author.id, timeout=60.0)
+                entry = message.content
+            content = entry.split()
+
+            if len(content) == 2:
+                await ctx.send(await self.save_member(ctx.guild, ctx.author.id, content[0], content[1]))
+            else:
+                await ctx.send("Invalid format. Please use 'username group_number' format.")
+
+        except asyncio.TimeoutError:
+            metrics.WAIT_FOR_TIMEOUTS.inc(command="JoinGroup")
+            metrics.command_failed(ctx)
+            await ctx.send("Timed out or an error occurred. Please try again.")
+        except Exception:
+            metrics.command_failed(ctx)
+            await ctx.send("Timed out or an error occurred. Please try again.")
+
+    @app_commands.command(name="join_group", description="Assign your username and group number")
+    @app_commands.describe(username="The name to list you under", group_number="Your group")
+    @app_commands.guild_only()
+    async def join_group(self, interaction: discord.Interaction, username: str, group_number: str):
+        try:
+            await interaction.response.send_message(await self.save_member(interaction.guild, interaction.user.id, username, group_number))
+        except Exception as e:
+            metrics.command_failed(interaction)
+            await interaction.response.send_message(f"❌ Could not save: {e}")
+
+    @commands.command()
+    async def ShowGroups(self, ctx, page: int = 1, group_number: str = None):
+        """Display stored Group and Username information: !ShowGroups [page] [group]"""
+        if ctx.guild is None:
+            await ctx.send("Groups are stored per server, please use this in a server.")
+            return
+
+        guild_id, guild_name = str(ctx.guild.id), ctx.guild.name
+        page = max(page, 1)
+        rows, total = await self.bot.store.group_members(guild_id, guild_name, page, group_number)
+        if not rows:
+            await ctx.send("No data stored yet." if total == 0 else f"There is no page {page}.")
+            return
+
+        fetched = {page - 1: rows}
+
+        async def render(index):
+            # Other pages are read from the store when someone turns to them
+            page_rows = fetched.pop(index, None)
+            if page_rows is None:
+                page_rows, _ = await self.bot.store.group_members(guild_id, guild_name, index + 1, group_number)
+            data = "Guild, Username, Group Number\n" + "".join(f"{guild}, {username}, {group}\n" for guild, username, group in page_rows)
+            return discord.Embed(title="Stored Data", description=f"```{data}```")
+
+        pages = -(-total // bot_store.GROUPS_PAGE_SIZE)
+        await discord_output.send_pages(ctx, pages, render, index=page - 1)
+
+
+async def setup(bot):
+    await bot.add_cog(Groups(bot))
@@ -0,0 +1,309 @@
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import conversations
+import discord_output
+import llm_backend
+import llm_cache
+import metrics
+import scheduler
+import summarization
+
+# Prompt templates shared by the streaming and non-streaming paths
+REVIEW_PROMPT = "Provide a one hundred word performance review along with a rating from 1-10 based on the following:\n\n{text}"
+SUMMARY_PROMPT = "Summarize the following text briefly:\n\n{text}"
+
+# /batch_review: how many members it covers, and how many reviews are generated
+# at once (more than the scheduler's slots would only queue there)
+BATCH_REVIEW_LIMIT = 50
+BATCH_REVIEW_PARALLEL = int(os.getenv("BATCH_REVIEW_PARALLEL", str(scheduler.MAX_IN_FLIGHT)))
+# Interaction tokens last 15 minutes; closer to that than this, the report goes to the channel
+FOLLOWUP_MARGIN = 30
+
+
+async def message_text(message, content=None):
+    """
+    Returns the text of a message (or content, e.g. the argument of the
+    command in it) plus any attached .txt files, so long documents can be
+    sent as attachments instead of pasted.
+    """
+    parts = [(message.content if content is None else content).strip()]
+    for attachment in message.attachments:
+        if attachment.filename.lower().endswith(".txt"):
+            data = await attachment.read()
+            parts.append(data.decode("utf-8", errors="replace").strip())
+    return "\n\n".join(part for part in parts if part)
+
+
+async def interaction_text(text, attachment):
+    """An option's text plus the contents of an attached .txt file."""
+    if attachment is not None and attachment.filename.lower().endswith(".txt"):
+        data = await attachment.read()
+        text = "\n\n".join(part for part in (text, data.decode("utf-8", errors="replace")) if part)
+    return text or ""
+
+
+async def complete_long(template, text):
+    """
+    Condenses text to fit the model's context, then runs template on it and
+    returns the answer.
+    """
+    condensed_text = await summarization.condense(llm_backend.completer(), text)
+    return await llm_backend.cached_chat(template, condensed_text)
+
+
+async def review_batch(texts, parallel=BATCH_REVIEW_PARALLEL, on_progress=None):
+    """
+    Returns the reviews of texts, in order, generating at most parallel at a
+    time. Every prompt starts with the same REVIEW_PROMPT instructions, so
+    Ollama reuses their prompt cache from one review to the next. A review
+    that fails is an error line in the result instead. on_progress(done,
+    total) is awaited as each one finishes.
+    """
+    semaphore = asyncio.Semaphore(parallel)
+    done = 0
+
+    async def review(text):
+        nonlocal done
+        async with semaphore:
+            try:
+                result = await complete_long(REVIEW_PROMPT, text)
+            except llm_backend.BackendUnavailable as e:
+                result = f"⚠️ {e}"
+            except Exception:
+                result = "⚠️ This review could not be generated."
+        done += 1
+        if on_progress is not None:
+            await on_progress(done, len(texts))
+        return result
+
+    return await asyncio.gather(*(review(text) for text in texts))
+
+
+class LLM(commands.Cog):
+    """DeepSeek R1 commands: questions, reviews and summaries."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_unload(self):
+        await llm_backend.models.stop()
+        await llm_cache.cache.close()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Load the models now rather than on the first command
+        llm_backend.models.start()
+
+    async def save_submission(self, guild, user, text):
+        # The latest text someone had reviewed is what /batch_review uses for them
+        if guild is not None and text:
+            await self.bot.store.save_submission(str(guild.id), str(user.id), text)
+
+    async def prompt_and_answer(self, ctx, text, question, working, template, heading, submission=False):
+        # Shared flow of !Perform_Review and !summarize
+        try:
+            if text or ctx.message.attachments:
+                # Sent along with the command
+                text = await message_text(ctx.message, text or "")
+            else:
+                # Ask for it; the user's next message in this channel is the answer (60 second timeout)
+                await ctx.send(question)
+                reply = await self.bot.conversations.wait_for_reply(ctx.channel.id, ctx.author.id, timeout=60.0)
+                text = await message_text(reply)
+
+            if not text:
+                await ctx.send("No text received. Please try again.")
+                return
+            if submission:
+                await self.save_submission(ctx.guild, ctx.author, text)
+
+            await ctx.send(working)
+            scheduler.track_command(ctx)
+
+            if llm_backend.STREAM_RESPONSES:
+                # Stream the answer into the channel as it is generated
+                condensed_text = await summarization.condense(llm_backend.completer(), text)
+                tokens = llm_backend.cached_stream_chat(template, condensed_text)
+                await discord_output.stream_to_discord(ctx, tokens, prefix=f"**{heading}:**\n")
+                return
+
+            answer = await complete_long(template, text)
+            # Long answers become one message with page buttons
+            await discord_output.send_text(ctx, f"**{heading}:**\n{answer}")
+
+        except llm_backend.BackendUnavailable as e:
+            metrics.command_failed(ctx)
+            await ctx.send(f"⚠️ {e}")
+        except asyncio.TimeoutError:
+            metrics.WAIT_FOR_TIMEOUTS.inc(command=ctx.command.qualified_name)
+            metrics.command_failed(ctx)
+            await ctx.send("Timed out or an error occurred. Please try again.")
+        except Exception:
+            metrics.command_failed(ctx)
+            await ctx.send("Timed out or an error occurred. Please try again.")
+
+    async def answer_interaction(self, interaction, template, heading, text, attachment=None, submission=False):
+        # Shared flow of /perform_review and /summarize once there is something to work on
+        await interaction.response.defer()
+        text = await interaction_text(text, attachment)
+        if submission:
+            await self.save_submission(interaction.guild, interaction.user, text)
+        scheduler.track_interaction(interaction)
+        try:
+            answer = await complete_long(template, text)
+        except llm_backend.BackendUnavailable as e:
+            metrics.command_failed(interaction)
+            answer = f"⚠️ {e}"
+        except Exception:
+            metrics.command_failed(interaction)
+            answer = "⚠️ Our AI is currently unavailable. Please try again later!"
+        await discord_output.send_text(interaction, f'**{heading}:**\n{answer}')
+
+    @commands.command()
+    async def Perform_Review(self, ctx, *, description: str = None):
+        """Generates a performance review and rating based on your input: !Perform_Review [description]"""
+        await self.prompt_and_answer(ctx, description, "Please enter your description!", "Performing Review...", REVIEW_PROMPT, "Review", submission=True)
+
+    @commands.command()
+    async def summarize(self, ctx, *, text: str = None):
+        """Provide text (or a .txt file) for summarization using DeepSeek R1: !summarize [text]"""
+        await self.prompt_and_answer(ctx, text, "Please enter the text you would like to summarize:", "Summarizing your text...", SUMMARY_PROMPT, "Summary")
+
+    @commands.command(name="ask")
+    async def ask(self, ctx, *, user_message: str):
+        """Ask DeepSeek R1 anything: !ask <question>"""
+        scheduler.track_command(ctx)
+        try:
+            if llm_backend.STREAM_RESPONSES:
+                # Edit the answer into place as tokens arrive instead of waiting for all of it
+                tokens = llm_backend.cached_stream_chat(llm_backend.RAW_PROMPT, user_message)
+                await discord_output.stream_to_discord(ctx, tokens)
+                return
+
+            response = await llm_backend.cached_chat(llm_backend.RAW_PROMPT, user_message) or "No response received."
+            # One message, paged with buttons if it is long, instead of one send per 2000 characters
+            await discord_output.send_text(ctx, response)
+        except Exception as e:
+            metrics.command_failed(ctx)
+            await ctx.send(f"Request failed: {e}")
+
+    @app_commands.command(name="perform_review", description="Get AI feedback on your text")
+    @app_commands.describe(
+        description="The text to review (leave out to type it in a form)",
+        attachment="Optional .txt file with more text"
+    )
+    async def perform_review(self, interaction: discord.Interaction, description: str = None, attachment: discord.Attachment = None):
+        if description is None and attachment is None:
+            async def on_text(modal_interaction, text):
+                await self.answer_interaction(modal_interaction, REVIEW_PROMPT, "AI Review", text, submission=True)
+            await interaction.response.send_modal(conversations.TextModal("Performance review", "What should be reviewed?", on_text))
+            return
+        await self.answer_interaction(interaction, REVIEW_PROMPT, "AI Review", description, attachment, submission=True)
+
+    @app_commands.command(name="summarize", description="Summarize text using DeepSeek R1")
+    @app_commands.describe(
+        text="The text to summarize (leave out to type it in a form)",
+        attachment="Optional .txt file with more text"
+    )
+    async def summarize_slash(self, interaction: discord.Interaction, text: str = None, attachment: discord.Attachment = None):
+        if text is None and attachment is None:
+            async def on_text(modal_interaction, text):
+                await self.answer_interaction(modal_interaction, SUMMARY_PROMPT, "Summary", text)
+            await interaction.response.send_modal(conversations.TextModal("Summarize", "Text to summarize", on_text))
+            return
+        await self.answer_interaction(interaction, SUMMARY_PROMPT, "Summary", text, attachment)
+
+    @app_commands.command(name="submit_review", description="Save the text to use for you in the next /batch_review")
+    @app_commands.describe(
+        text="What should be reviewed (leave out to type it in a form)",
+        attachment="Optional .txt file with more text"
+    )
+    @app_commands.guild_only()
+    async def submit_review(self, interaction: discord.Interaction, text: str = None, attachment: discord.Attachment = None):
+        async def save(interaction, text, attachment=None):
+            await interaction.response.defer(ephemeral=True)
+            await self.save_submission(interaction.guild, interaction.user, await interaction_text(text, attachment))
+            await interaction.followup.send("✅ Saved, it will be part of the next batch review.", ephemeral=True)
+
+        if text is None and attachment is None:
+            await interaction.response.send_modal(conversations.TextModal("Submit for review", "What should be reviewed?", save))
+            return
+        await save(interaction, text, attachment)
+
+    @app_commands.command(name="batch_review", description="Review the latest submission of everyone in a group or study program")
+    @app_commands.describe(group="A group number from /join_group", major="A study program from /register")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def batch_review(self, interaction: discord.Interaction, group: str = None, major: str = None):
+        if (group is None) == (major is None):
+            await interaction.response.send_message("Pick either a group or a major.", ephemeral=True)
+            return
+        await interaction.response.defer()
+
+        guild = interaction.guild
+        if group is not None:
+            members = await self.bot.store.group_users(str(guild.id), guild.name, group)
+            title = f"group {group}"
+        else:
+            scheduling = self.bot.get_cog("Scheduling")
+            if scheduling is None:
+                await interaction.followup.send("Reviewing by major needs the scheduling feature (/register).")
+                return
+            members = await scheduling.users_with_major(major)
+            title = major
+
+        submissions = await self.bot.store.submissions(str(guild.id))
+        entries = [(name, submissions[user_id]) for user_id, name in members if user_id in submissions]
+        missing = [name for user_id, name in members if user_id not in submissions]
+        if not entries:
+            await interaction.followup.send(f"Nobody in {title} has submitted anything to review yet (/submit_review or /perform_review).")
+            return
+        skipped = entries[BATCH_REVIEW_LIMIT:]
+        entries = entries[:BATCH_REVIEW_LIMIT]
+
+        scheduler.track_interaction(interaction)
+        heading = f"Reviewing {len(entries)} submissions from {title}..."
+        progress = await interaction.followup.send(heading, wait=True)
+        last_edit = time.monotonic()
+
+        async def on_progress(done, total):
+            nonlocal last_edit
+            # Same edit rate limit as streamed answers; the last one always shows
+            if done < total and time.monotonic() - last_edit < discord_output.MIN_EDIT_INTERVAL:
+                return
+            last_edit = time.monotonic()
+            # Progress is cosmetic: a failed edit (rate limit, expired token) mustn't stop the batch
+            with contextlib.suppress(discord.HTTPException):
+                await progress.edit(content=f"{heading} {done}/{total} done")
+
+        reviews = await review_batch([text for _, text in entries], on_progress=on_progress)
+
+        summary = f"**Batch review of {title}:** {len(entries)} reviewed"
+        if missing:
+            summary += f", no submission from {', '.join(missing)}"
+        if skipped:
+            summary += f", {len(skipped)} left out (at most {BATCH_REVIEW_LIMIT} per batch)"
+        report = "\n\n".join(f"**{name}**\n{review}" for (name, _), review in zip(entries, reviews))
+        send = interaction.followup.send
+        if (interaction.expires_at - discord.utils.utcnow()).total_seconds() < FOLLOWUP_MARGIN:
+            # A large batch can outlast the interaction token; followups would fail with 401
+            send = interaction.channel.send
+            summary = f"{interaction.user.mention} {summary}"
+        if len(summary) + len(report) + 2 <= discord_output.DISCORD_MESSAGE_LIMIT:
+            await send(f"{summary}\n\n{report}")
+        else:
+            # One report, as a file rather than a stream of messages
+            report_file = discord.File(io.BytesIO(report.encode("utf-8")), filename="batch_review.md")
+            await send(summary[:discord_output.DISCORD_MESSAGE_LIMIT], file=report_file)
+
+
+async def setup(bot):
+    await bot.add_cog(LLM(bot))
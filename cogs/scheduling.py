@@ -0,0 +1,219 @@
+from datetime import datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import discord_output
+import metrics
+from availability import AvailabilityIndex, DAYS_OF_WEEK, time_to_minutes, minutes_to_time
+from storage import AsyncDatabase
+
+# =================================================================================
+#                           DATABASE LAYOUT AND QUERIES
+# =================================================================================
+# The database WideShmeer has always used, so existing registrations carry over
+DB_PATH = "WideShmeerBackend.db"
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY,
+        preferred_name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        phone_number TEXT NOT NULL,
+        degree_major TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS availability (
+        user_id TEXT,
+        day_of_week TEXT CHECK(day_of_week IN (
+            'Monday', 'Tuesday', 'Wednesday',
+            'Thursday', 'Friday', 'Saturday', 'Sunday'
+        )),
+        start_time TEXT,
+        end_time TEXT,
+        PRIMARY KEY (user_id, day_of_week),
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS common_availability (
+        day_of_week TEXT,
+        start_time TEXT,
+        end_time TEXT,
+        PRIMARY KEY (day_of_week, start_time, end_time)
+    )
+    ''',
+]
+
+UPSERT_USER = "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)"
+INSERT_EMPTY_DAY = "INSERT OR IGNORE INTO availability VALUES (?, ?, 'N/A', 'N/A')"
+UPSERT_AVAILABILITY = "INSERT OR REPLACE INTO availability VALUES (?, ?, ?, ?)"
+DELETE_COMMON_SLOT = "DELETE FROM common_availability WHERE day_of_week = ? AND start_time = ? AND end_time = ?"
+INSERT_COMMON_SLOT = "INSERT OR IGNORE INTO common_availability (day_of_week, start_time, end_time) VALUES (?, ?, ?)"
+SELECT_USER = "SELECT * FROM users WHERE user_id = ?"
+SELECT_USERS = "SELECT user_id, degree_major FROM users"
+SELECT_USERS_IN_MAJOR = "SELECT user_id, preferred_name FROM users WHERE degree_major = ? COLLATE NOCASE ORDER BY preferred_name"
+SELECT_INTERVALS = "SELECT user_id, day_of_week, start_time, end_time FROM availability WHERE start_time != 'N/A' AND end_time != 'N/A'"
+SELECT_COMMON_SLOTS = "SELECT day_of_week, start_time, end_time FROM common_availability"
+
+
+def common_changes_statements(changes):
+    statements = []
+    for day, (removed, added) in changes.items():
+        statements.append((DELETE_COMMON_SLOT, [(day, minutes_to_time(start), minutes_to_time(end)) for start, end in removed]))
+        statements.append((INSERT_COMMON_SLOT, [(day, minutes_to_time(start), minutes_to_time(end)) for start, end in added]))
+    return statements
+
+
+class Scheduling(commands.Cog):
+    """Registration, weekly availability and common free time (WideShmeer)."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = AsyncDatabase(DB_PATH, schema=SCHEMA)
+        self.availability = AvailabilityIndex()
+
+    async def cog_load(self):
+        # Build the in-memory interval index once; after this only deltas hit SQLite
+        users = await self.db.fetchall(SELECT_USERS)
+        rows = await self.db.fetchall(SELECT_INTERVALS)
+        stored = await self.db.fetchall(SELECT_COMMON_SLOTS)
+        changes = self.availability.load(users, rows, stored)
+        await self.db.write(common_changes_statements(changes))
+
+    async def cog_unload(self):
+        await self.db.close()
+
+    async def write_user(self, user_id, statements, update):
+        """
+        Runs update() (an AvailabilityIndex change for user_id that returns
+        slot changes) and writes statements plus those slot changes as one
+        job. If the job fails, the index change is undone as well and
+        common_availability re-synced from the index (writes made in the
+        meantime were worked out with the change in place).
+        """
+        saved = self.availability.snapshot_user(user_id)
+        changes = update()
+        try:
+            await self.db.write([*statements, *common_changes_statements(changes)])
+        except Exception:
+            self.availability.restore_user(saved)
+            stored = await self.db.fetchall(SELECT_COMMON_SLOTS)
+            await self.db.write(common_changes_statements(self.availability.diff_slots(stored)))
+            raise
+
+    async def users_with_major(self, major):
+        """(user_id, preferred_name) of the registered users in a study program."""
+        return await self.db.fetchall(SELECT_USERS_IN_MAJOR, (major,))
+
+    @app_commands.command(name="register", description="Save your name, contact info, and major")
+    @app_commands.describe(
+        preferred_name="What you like to be called",
+        email="Your email address",
+        phone="Your phone number",
+        major="Your study program (e.g., 'Computer Science')"
+    )
+    async def register(self, interaction: discord.Interaction, preferred_name: str, email: str, phone: str, major: str):
+        user_id = str(interaction.user.id)
+        try:
+            # One queued job: group-committed with whatever else is being written
+            with metrics.timer(metrics.AVAILABILITY_UPDATE_SECONDS, command="register"):
+                await self.write_user(user_id, [
+                    (UPSERT_USER, (user_id, preferred_name, email, phone, major)),
+                    (INSERT_EMPTY_DAY, [(user_id, day) for day in DAYS_OF_WEEK]),
+                ], lambda: self.availability.set_user(user_id, major))
+            await interaction.response.send_message("✅ Successfully registered!")
+        except Exception as e:
+            metrics.command_failed(interaction)
+            await interaction.response.send_message(f"❌ Registration failed: {str(e)}")
+
+    @app_commands.command(name="set_availability", description="Update your available times for a day (use N/A for unavailable)")
+    @app_commands.describe(
+        day="Select a day",
+        start_time="Start time (HH:MM or N/A)",
+        end_time="End time (HH:MM or N/A)"
+    )
+    @app_commands.choices(day=[app_commands.Choice(name=d, value=d) for d in DAYS_OF_WEEK])
+    async def set_availability(self, interaction: discord.Interaction, day: str, start_time: str, end_time: str):
+        user_id = str(interaction.user.id)
+        start_time = start_time.upper()
+        end_time = end_time.upper()
+
+        if start_time == 'N/A' or end_time == 'N/A':
+            if start_time != end_time:
+                await interaction.response.send_message("❌ Both times must be N/A to mark unavailable")
+                return
+        else:
+            try:
+                datetime.strptime(start_time, "%H:%M")
+                datetime.strptime(end_time, "%H:%M")
+            except ValueError:
+                await interaction.response.send_message("❌ Invalid format. Use HH:MM or N/A")
+                return
+
+        try:
+            with metrics.timer(metrics.AVAILABILITY_UPDATE_SECONDS, command="set_availability"):
+                await self.write_user(
+                    user_id, [(UPSERT_AVAILABILITY, (user_id, day, start_time, end_time))],
+                    lambda: self.availability.set_interval(user_id, day, time_to_minutes(start_time), time_to_minutes(end_time)),
+                )
+
+            if start_time == 'N/A':
+                await interaction.response.send_message(f"✅ Marked {day} as unavailable")
+            else:
+                await interaction.response.send_message(f"✅ {day} availability set to {start_time}-{end_time}")
+        except Exception as e:
+            metrics.command_failed(interaction)
+            await interaction.response.send_message(f"❌ Error: {str(e)}")
+
+    @app_commands.command(name="view_common", description="Show time slots when enough users are free (quorum %, minimum length, major)")
+    @app_commands.describe(
+        quorum="Percent of users that must be free (default 75)",
+        min_minutes="Only show slots at least this many minutes long",
+        major="Only count users in this study program"
+    )
+    async def view_common(self, interaction: discord.Interaction, quorum: app_commands.Range[int, 1, 100] = 75, min_minutes: app_commands.Range[int, 0, 1440] = 0, major: str = None):
+        # Answered straight from the in-memory availability index, no SQLite round-trip
+        schedule = self.availability.query(quorum / 100, min_minutes=min_minutes, major=major)
+
+        if not schedule:
+            await interaction.response.send_message("No common time slots available")
+            return
+
+        title = f"**Common Availability ({quorum}%+ Users Free"
+        if major:
+            title += f", {major} only"
+        response = [title + ")**"]
+
+        for day in DAYS_OF_WEEK:
+            if day in schedule:
+                times = "\n".join(f"{minutes_to_time(start)} - {minutes_to_time(end)}" for start, end in schedule[day])
+                response.append(f"\n**{day}:**\n{times}")
+            else:
+                response.append(f"\n**{day}:** No common slots")
+
+        # Over 2000 characters (a low quorum over many short slots) it is paged with buttons
+        await discord_output.send_text(interaction, "\n".join(response))
+
+    @app_commands.command(name="my_info", description="View your registered information")
+    async def my_info(self, interaction: discord.Interaction):
+        user = await self.db.fetchone(SELECT_USER, (str(interaction.user.id),))
+
+        if user:
+            response = (
+                "**Your Information**\n"
+                f"Name: {user[1]}\n"
+                f"Email: {user[2]}\n"
+                f"Phone: {user[3]}\n"
+                f"Major: {user[4]}"
+            )
+        else:
+            response = "❌ You're not registered! Use `/register` first"
+        await interaction.response.send_message(response)
+
+
+async def setup(bot):
+    await bot.add_cog(Scheduling(bot))
@@ -0,0 +1,75 @@
+import asyncio
+import contextlib
+import os
+
+import discord
+from discord.ext import commands
+
+import media_cache
+import shorts
+
+
+class Shorts(commands.Cog):
+    """Reposts linked YouTube Shorts as uploads (Joel's Bot / bot.py)."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # yt-dlp runs as a subprocess in a bounded pool, one temp directory per job
+        self.downloader = shorts.ShortsDownloader()
+        # Downloaded Shorts and their Discord links, reused when a video is posted again
+        self.media = media_cache.MediaCache()
+
+    async def cog_unload(self):
+        await self.media.db.close()
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        # Other bots (and this one) can't trigger anything
+        if message.author.bot:
+            return
+
+        links = shorts.find_shorts(message.content)
+        if not links:
+            return
+        await message.channel.send(f"Hi {message.author.mention}, Morgi doesn't like 'shorts'!")
+        # Hide YouTube's preview of the link; on someone else's message that needs Manage Messages
+        with contextlib.suppress(discord.Forbidden, discord.NotFound):
+            await message.edit(suppress=True)
+
+        # Every Shorts link in the message, in parallel
+        await asyncio.gather(*(self.send_short(message.channel, video_id, url) for video_id, url in links))
+
+    async def send_short(self, channel, video_id, url):
+        # Pinned so another post's download can't evict the file before it's uploaded
+        async with self.media.pinned(video_id):
+            # Re-posted Shorts are served from the media cache: the earlier upload's link, or the file on disk
+            attachment_url, video_path = await self.media.lookup(video_id)
+            if attachment_url:
+                await channel.send(attachment_url)
+                return
+            try:
+                if video_path is None:
+                    # One download per video, however many posts link it at once
+                    video_path = await self.media.fetch(video_id, lambda: self.download(video_id, url))
+                    if video_path is None:
+                        await channel.send("Error: Video file is larger than 25MB and cannot be sent.")
+                        return
+                sent = await channel.send(file=discord.File(video_path))
+                if sent.attachments:
+                    await self.media.remember_attachment(video_id, sent.attachments[0].url)
+            except shorts.VideoTooLarge:
+                await channel.send("Error: Video file is larger than 25MB and cannot be sent.")
+            except shorts.DownloadError:
+                await channel.send("Error downloading YouTube Shorts video.")
+
+    async def download(self, video_id, url):
+        """Downloads a Short into the media cache; None if it came out over the upload limit."""
+        # Pick a format under 25MB before downloading anything
+        format_spec, _ = await self.downloader.probe(video_id, url)
+        async with self.downloader.download(url, format_spec) as downloaded_path:
+            if os.path.getsize(downloaded_path) > shorts.UPLOAD_LIMIT:
+                return None
+            return await self.media.add(video_id, downloaded_path)
+
+async def setup(bot):
+    await bot.add_cog(Shorts(bot))
@@ -0,0 +1,71 @@
+from discord.ext import commands
+
+import llm_backend
+import metrics
+import scheduler
+import summarization
+
+class Thoughts(commands.Cog):
+    """Saved thoughts and LLM summaries of them."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Load the models now rather than on the first !opinions (no-op if the llm cog already did)
+        llm_backend.models.start()
+
+    @commands.command()
+    async def thoughts(self, ctx, *, thought: str):
+        """Save a thought: !thoughts <text>"""
+        guild_id = str(ctx.guild.id) if ctx.guild else None
+        await self.bot.store.add_thought(guild_id, str(ctx.author.id), str(ctx.author), thought)
+        await ctx.send(f"Your thought has been saved, {ctx.author}!")
+
+    @commands.command()
+    @commands.guild_only()
+    async def opinions(self, ctx, *, username: str):
+        """Summarize a member's saved thoughts: !opinions <username or @mention>"""
+        scheduler.track_command(ctx)
+        store = self.bot.store
+        guild_id = str(ctx.guild.id)
+        if ctx.message.mentions:
+            mentioned = ctx.message.mentions[0]
+            user_id, username = str(mentioned.id), str(mentioned)
+        else:
+            found, user_id = await store.thought_author(guild_id, username)
+            if not found:
+                await ctx.send(f"No thoughts found for {username}.")
+                return
+        # Only thoughts saved since the last summary are sent to the model.
+        # Names known only from the imported thoughts.txt have no id to key a summary on.
+        stored = await store.opinion_summary(guild_id, user_id) if user_id else None
+        previous_summary, last_id = stored if stored else (None, 0)
+        new_thoughts = await store.thoughts_since(guild_id, user_id, username, last_id)
+
+        if not new_thoughts:
+            if previous_summary:
+                await ctx.send(f"Summary of {username}'s thoughts:\n{previous_summary}")
+            else:
+                await ctx.send(f"No thoughts found for {username}.")
+            return
+
+        try:
+            summary = await summarization.fold_summary(llm_backend.completer(), username, previous_summary, [thought for _, thought in new_thoughts])
+        except llm_backend.BackendUnavailable as e:
+            metrics.command_failed(ctx)
+            await ctx.send(f"⚠️ {e}")
+            return
+        except Exception:
+            metrics.command_failed(ctx)
+            await ctx.send("Error summarizing the thoughts.")
+            return
+
+        if user_id:
+            await store.save_opinion_summary(guild_id, user_id, summary, new_thoughts[-1][0])
+        await ctx.send(f"Summary of {username}'s thoughts:\n{summary}")
+
+
+async def setup(bot):
+    await bot.add_cog(Thoughts(bot))
@@ -0,0 +1,73 @@
+import asyncio
+
+import discord
+
+# =================================================================================
+#                   ASKING USERS FOR INPUT WITHOUT wait_for
+# =================================================================================
+# client.wait_for("message", check=...) adds a listener that discord.py runs
+# against every message the bot receives, in every channel, until it fires
+# or times out: with N prompts open, each message costs N check() calls.
+#
+# Commands take their input as arguments (slash command options, or the rest
+# of a prefix command), and a slash command with nothing to go on opens a
+# TextModal. The remaining "!summarize, then send the text" flows register
+# here, keyed by (channel id, author id), and the bot's on_message hands each
+# message over with one dict lookup:
+#
+#     reply = await conversations.wait_for_reply(ctx.channel.id, ctx.author.id, timeout=60.0)
+
+# Discord's limit for a text input in a modal
+MODAL_TEXT_LIMIT = 4000
+
+
+class Conversations:
+    def __init__(self):
+        # (channel id, author id) -> futures waiting for that author's next message there
+        self._waiting = {}
+
+    def __len__(self):
+        return sum(len(futures) for futures in self._waiting.values())
+
+    async def wait_for_reply(self, channel_id, author_id, timeout=60.0):
+        """
+        Returns the next message author_id sends in channel_id. Raises
+        asyncio.TimeoutError if none comes within timeout seconds.
+        """
+        key = (channel_id, author_id)
+        future = asyncio.get_running_loop().create_future()
+        # A list, so two open prompts of one user both get the reply (as with wait_for)
+        self._waiting.setdefault(key, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            futures = self._waiting.get(key)
+            if futures is not None and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._waiting[key]
+
+    def feed(self, message):
+        """Passes message to the prompts waiting for it. True if there were any."""
+        if not self._waiting:
+            return False
+        futures = self._waiting.pop((message.channel.id, message.author.id), None)
+        if not futures:
+            return False
+        for future in futures:
+            if not future.done():
+                future.set_result(message)
+        return True
+
+
+class TextModal(discord.ui.Modal):
+    """One paragraph field; on_text(interaction, text) gets what was typed."""
+
+    def __init__(self, title, label, on_text):
+        super().__init__(title=title)
+        self.text = discord.ui.TextInput(style=discord.TextStyle.paragraph, max_length=MODAL_TEXT_LIMIT)
+        self.add_item(discord.ui.Label(text=label, component=self.text))
+        self.on_text = on_text
+
+    async def on_submit(self, interaction):
+        await self.on_text(interaction, self.text.value)
@@ -0,0 +1,270 @@
+import contextlib
+import inspect
+import time
+
+import discord
+
+# -------------------------------
+# Helpers for getting LLM output into Discord
+# -------------------------------
+
+# Discord message limit
+DISCORD_MESSAGE_LIMIT = 2000
+# An embed's description holds twice as much, so long outputs are paged in embeds
+EMBED_DESCRIPTION_LIMIT = 4096
+# Page buttons stop working after this long without a click
+PAGES_TIMEOUT = 10 * 60
+
+CODE_FENCE = "```"
+
+# Edit the live message after this many tokens or this many milliseconds...
+EDIT_EVERY_TOKENS = 24
+EDIT_EVERY_MS = 1500
+# ...but never faster than this. Discord allows roughly 5 edits per 5 seconds
+# on a channel; staying under that keeps us out of 429 retries.
+MIN_EDIT_INTERVAL = 1.1
+
+
+async def stream_to_discord(destination, tokens, prefix="", edit_every_tokens=EDIT_EVERY_TOKENS, edit_every_ms=EDIT_EVERY_MS):
+    """
+    Streams an LLM token iterator into one Discord message. The first visible
+    text is sent as soon as it arrives, then the message is edited every N
+    tokens or T milliseconds. Once the text outgrows DISCORD_MESSAGE_LIMIT
+    the message shows the embed page being written, and when the stream ends
+    it becomes page 1 of the pages send_text() would have sent, with buttons
+    for the rest. tokens should already be free of <think> reasoning
+    (llm_backend.stream_chat is).
+
+    destination is anything with an async send() (ctx, channel, followup).
+    Returns the full visible text.
+    """
+    message = None
+    current = prefix      # text that belongs in the message
+    shown = None          # text the message currently displays
+    full_text = []
+    tokens_since_edit = 0
+    last_edit = 0.0
+
+    async def push(text):
+        nonlocal message, shown, last_edit, tokens_since_edit
+        if len(text) <= DISCORD_MESSAGE_LIMIT:
+            kwargs = {"content": text}
+        else:
+            # Past one message: show the page being written
+            kwargs = {"content": None, "embed": discord.Embed(description=chunks(text, EMBED_DESCRIPTION_LIMIT)[-1])}
+        if message is None:
+            message = await destination.send(**kwargs)
+        elif text != shown:
+            await message.edit(**kwargs)
+        shown = text
+        last_edit = time.monotonic()
+        tokens_since_edit = 0
+
+    async for visible in tokens:
+        tokens_since_edit += 1
+        if not visible:
+            continue
+        if not full_text:
+            # Reasoning models open with blank lines right after </think>
+            visible = visible.lstrip()
+            if not visible:
+                continue
+        full_text.append(visible)
+        current += visible
+
+        elapsed = time.monotonic() - last_edit
+        if message is None:
+            # Time to first visible token is what users notice, so don't wait
+            await push(current)
+        elif elapsed >= MIN_EDIT_INTERVAL and (
+            tokens_since_edit >= edit_every_tokens or elapsed * 1000 >= edit_every_ms
+        ):
+            await push(current)
+
+    if not full_text:
+        await push(prefix + "No response received.")
+    elif len(current) > DISCORD_MESSAGE_LIMIT:
+        pages = chunks(current, EMBED_DESCRIPTION_LIMIT)
+        view = Pages(len(pages), lambda index: discord.Embed(description=pages[index]), _author_id(destination))
+        kwargs = {"content": None, "embed": await view.page(0), "view": view if len(pages) > 1 else None}
+        if message is None:
+            message = await destination.send(**kwargs)
+        else:
+            await message.edit(**kwargs)
+        if len(pages) > 1:
+            view.message = message
+    elif current.strip() and current != shown:
+        await push(current)
+
+    return "".join(full_text).strip()
+
+
+def split_point(text, limit):
+    """
+    Picks where to cut text so the first part fits in limit characters,
+    preferring just after a paragraph, then a line break, then a space, over
+    cutting a word in half.
+    """
+    for separator in ("\n\n", "\n", " "):
+        cut = text.rfind(separator, 0, limit)
+        if cut > limit // 2:
+            return cut + len(separator)
+    return limit
+
+
+def open_fence(text):
+    """The line that opened a code block text leaves unclosed (such as "```py"), or None."""
+    fence = None
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line.startswith(CODE_FENCE):
+            continue
+        if fence is None and line.count(CODE_FENCE) == 1:
+            fence = line
+        elif fence is not None:
+            fence = None
+    # A long info string would eat into every later piece
+    if fence is not None and len(fence) > 20:
+        fence = CODE_FENCE
+    return fence
+
+
+def cut_text(text, limit):
+    """
+    Splits text into (head, rest) with head at most limit characters, at the
+    split_point. A code block that head leaves open is closed at its end and
+    opened again at the start of rest, so both still render as code.
+    """
+    if len(text) <= limit:
+        return text, ""
+    cut = split_point(text, limit - len("\n" + CODE_FENCE))
+    head, rest = text[:cut], text[cut:]
+    fence = open_fence(head)
+    if fence is None:
+        return head, rest
+    return head.rstrip("\n") + "\n" + CODE_FENCE, fence + "\n" + rest
+
+
+def chunks(text, limit=DISCORD_MESSAGE_LIMIT):
+    """text cut (with cut_text) into pieces of at most limit characters."""
+    pieces = []
+    while text:
+        head, text = cut_text(text, limit)
+        if head.strip():
+            pieces.append(head)
+    return pieces
+
+
+# -------------------------------
+# Long outputs as one message with page buttons
+# -------------------------------
+async def send(destination, **kwargs):
+    """
+    Sends a message to a ctx, a channel or an interaction (as its response,
+    or as a followup once it has been answered or deferred) and returns it.
+    """
+    if isinstance(destination, discord.Interaction):
+        if not destination.response.is_done():
+            callback = await destination.response.send_message(**kwargs)
+            return callback.resource
+        return await destination.followup.send(wait=True, **kwargs)
+    return await destination.send(**kwargs)
+
+
+class Pages(discord.ui.View):
+    """
+    Page buttons under a message that shows one embed of a long output at a
+    time. render(index) builds the embed of page index (it may be async, to
+    fetch just that page) and runs only when someone opens the page, once.
+    Only author_id can turn the pages; None lets anyone.
+    """
+
+    def __init__(self, page_count, render, author_id=None, index=0, timeout=PAGES_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.page_count = page_count
+        self.render = render
+        self.author_id = author_id
+        self.index = min(max(index, 0), page_count - 1)
+        self.message = None
+        self._rendered = {}
+        self.update_buttons()
+
+    async def page(self, index):
+        if index not in self._rendered:
+            embed = self.render(index)
+            if inspect.isawaitable(embed):
+                embed = await embed
+            self._rendered[index] = embed
+        return self._rendered[index]
+
+    def update_buttons(self):
+        self.first.disabled = self.previous.disabled = self.index == 0
+        self.next.disabled = self.last.disabled = self.index == self.page_count - 1
+        self.counter.label = f"{self.index + 1}/{self.page_count}"
+
+    async def show(self, interaction, index):
+        self.index = index
+        self.update_buttons()
+        await interaction.response.edit_message(embed=await self.page(index), view=self)
+
+    async def interaction_check(self, interaction):
+        if self.author_id is None or interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message("Only whoever ran the command can turn these pages.", ephemeral=True)
+        return False
+
+    async def on_timeout(self):
+        if self.message is not None:
+            with contextlib.suppress(discord.HTTPException):
+                await self.message.edit(view=None)
+
+    @discord.ui.button(label="«", style=discord.ButtonStyle.secondary)
+    async def first(self, interaction, button):
+        await self.show(interaction, 0)
+
+    @discord.ui.button(label="‹", style=discord.ButtonStyle.primary)
+    async def previous(self, interaction, button):
+        await self.show(interaction, self.index - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def counter(self, interaction, button):
+        pass
+
+    @discord.ui.button(label="›", style=discord.ButtonStyle.primary)
+    async def next(self, interaction, button):
+        await self.show(interaction, self.index + 1)
+
+    @discord.ui.button(label="»", style=discord.ButtonStyle.secondary)
+    async def last(self, interaction, button):
+        await self.show(interaction, self.page_count - 1)
+
+
+def _author_id(destination):
+    # Whoever ran the command: ctx.author or interaction.user (None for a plain channel)
+    author = getattr(destination, "author", None) or getattr(destination, "user", None)
+    return author.id if author is not None else None
+
+
+async def send_pages(destination, page_count, render, index=0):
+    """
+    Sends page index of a page_count page output (see Pages) as one message,
+    with page buttons when there is more than one page. Only the user who
+    ran the command (ctx.author, interaction.user) can turn the pages.
+    """
+    if page_count <= 1:
+        return await send(destination, embed=await Pages(1, render).page(0))
+    view = Pages(page_count, render, _author_id(destination), index)
+    view.message = await send(destination, embed=await view.page(view.index), view=view)
+    return view.message
+
+
+async def send_text(destination, text):
+    """
+    Sends text as one plain message if it fits, otherwise as pages of embeds
+    cut on line and code block boundaries, instead of one message per
+    DISCORD_MESSAGE_LIMIT characters.
+    """
+    if len(text) <= DISCORD_MESSAGE_LIMIT:
+        return await send(destination, content=text)
+    pages = chunks(text, EMBED_DESCRIPTION_LIMIT)
+    return await send_pages(destination, len(pages), lambda index: discord.Embed(description=pages[index]))
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import random
+import time
+
+import aiohttp  # Already installed with discord.py
+
+# =================================================================================
+#                   POOLED HTTP CLIENT FOR THE LLM BACKENDS
+# =================================================================================
+# One aiohttp session per process keeps connections to Ollama and OpenRouter
+# alive between calls (no TCP/TLS handshake per request). Each backend has its
+# own timeouts, retries 429/5xx and connection errors with jittered
+# exponential backoff, and sits behind a circuit breaker: after
+# FAILURE_THRESHOLD failures in a row calls fail immediately with
+# BackendUnavailable for RESET_TIMEOUT seconds instead of piling up.
+
+MAX_CONNECTIONS = 32
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 8.0
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0  # seconds the circuit stays open
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+
+
+class BackendUnavailable(Exception):
+    """The backend is down, timed out or kept failing; the message is fit for users."""
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through. open: calls fail fast until reset_timeout has
+    passed. Then a single trial call is let through (half-open); its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def retry_in(self):
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        # One trial at a time; one that never reported back (its caller was
+        # cancelled) stops counting after another reset_timeout
+        now = time.monotonic()
+        if state == "half-open" and (self._trial_started is None or now - self._trial_started >= self.reset_timeout):
+            self._trial_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_started = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+def get_session():
+    """The process-wide aiohttp session (created on first use, inside the loop)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, keepalive_timeout=60))
+    return _session
+
+
+async def close():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+class HTTPBackend:
+    def __init__(self, name, base_url, total_timeout, connect_timeout=10, read_timeout=None, headers=None, max_retries=MAX_RETRIES, breaker=None):
+        """
+        Timeouts are in seconds: the whole call, establishing the connection,
+        and the longest gap between two chunks of the response. headers is a
+        dict or a function returning one (evaluated per call, e.g. for API
+        keys read from env).
+        """
+        self.name = name
+        if "://" not in base_url:
+            base_url = "http://" + base_url
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.headers = headers
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+
+    async def post_json(self, path, payload):
+        """POSTs payload as JSON and returns the decoded JSON response."""
+        async with self._request(path, payload) as response:
+            return await response.json(content_type=None)
+
+    async def stream_json(self, path, payload):
+        """POSTs payload and yields each line of an NDJSON response, decoded."""
+        async with self._request(path, payload) as response:
+            async for line in response.content:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _request(self, path, payload):
+        return _Request(self, path, payload)
+
+    def _unavailable(self, reason):
+        return BackendUnavailable(f"{self.name} is unavailable ({reason}). Please try again later.")
+
+    async def _open(self, path, payload):
+        # Connects and checks the status, retrying what is worth retrying.
+        # Returns an open response; the caller reads and releases it.
+        if not self.breaker.allow():
+            raise self._unavailable(f"retrying in {self.breaker.retry_in():.0f}s")
+        headers = self.headers() if callable(self.headers) else self.headers
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await get_session().post(self.base_url + path, json=payload, headers=headers, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # A hung backend: retrying would only make users wait longer
+                self.breaker.record_failure()
+                raise self._unavailable("timed out")
+            except aiohttp.ClientConnectionError:
+                reason = "can't connect"
+            except aiohttp.ClientError as e:
+                reason = type(e).__name__
+            else:
+                if response.status < 400:
+                    return response
+                reason = f"HTTP {response.status}"
+                if response.status == 429:
+                    retry_after = _retry_after(response)
+                response.release()
+                if response.status not in RETRY_STATUSES:
+                    # A bad request won't get better by retrying, but the backend did answer
+                    self.breaker.record_success()
+                    raise self._unavailable(reason)
+            if attempt < self.max_retries:
+                await asyncio.sleep(retry_after if retry_after is not None else _backoff(attempt))
+        self.breaker.record_failure()
+        raise self._unavailable(reason)
+
+
+class _Request:
+    # async context manager around one backend call, so the breaker sees
+    # timeouts that happen while the body is being read too
+    def __init__(self, backend, path, payload):
+        self.backend = backend
+        self.path = path
+        self.payload = payload
+        self.response = None
+
+    async def __aenter__(self):
+        self.response = await self.backend._open(self.path, self.payload)
+        return self.response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.response.release()
+        if exc_type is None:
+            self.backend.breaker.record_success()
+        elif issubclass(exc_type, (asyncio.TimeoutError, aiohttp.ClientError)):
+            self.backend.breaker.record_failure()
+            raise self.backend._unavailable("timed out" if issubclass(exc_type, asyncio.TimeoutError) else "connection lost") from exc
+        elif issubclass(exc_type, Exception):
+            # Our own error (e.g. bad JSON handling): the backend did its part
+            self.backend.breaker.record_success()
+        return False
+
+
+def _backoff(attempt):
+    # "Full jitter": spreads out retries from many callers hitting the same outage
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_after(response):
+    try:
+        return min(BACKOFF_CAP, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
@@ -0,0 +1,436 @@
+import os
+import time
+
+import llm_cache
+import metrics
+from bot_logging import get_logger
+from http_client import HTTPBackend, BackendUnavailable
+from llm_router import LARGE, SMALL, LLMRouter, MockBackend, Route
+from model_lifecycle import ModelLifecycle
+from scheduler import LLMScheduler, current_request, llm_scheduler
+
+# -------------------------------
+# Shared async LLM backend used by every bot
+# -------------------------------
+# ollama.chat was synchronous, so calling it from a command handler freezes the
+# whole discord.py event loop (missed heartbeats, gateway disconnects) for the
+# tens of seconds a reasoning model needs. Everything here is awaited instead.
+
+# How many generations may run against the local Ollama server at once, and
+# who goes next, is decided by scheduler.llm_scheduler. The HTTP calls share
+# one pooled session (http_client) with per-backend timeouts, retries and a
+# circuit breaker; a backend that is down raises BackendUnavailable quickly.
+
+# Reasoning models can think for minutes, but a dead server should be noticed at once
+OLLAMA = HTTPBackend(
+    "Ollama", os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+    total_timeout=600, connect_timeout=5, read_timeout=180,
+)
+OPENROUTER = HTTPBackend(
+    "OpenRouter", "https://openrouter.ai/api/v1",
+    total_timeout=180, connect_timeout=10, read_timeout=120,
+    headers=lambda: {"Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}"},
+)
+
+SMALL_MODEL = os.getenv("OLLAMA_SMALL_MODEL", "deepseek-r1:1.5b")
+LARGE_MODEL = os.getenv("OLLAMA_LARGE_MODEL", "deepseek-r1:7b")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "deepseek/deepseek-r1:free")
+# Hosted calls don't compete for the local GPU, so they get their own queue
+OPENROUTER_CONCURRENCY = int(os.getenv("OPENROUTER_CONCURRENCY", "4"))
+
+# -------------------------------
+# Reasoning budget
+# -------------------------------
+# DeepSeek R1 writes a <think> block before every answer, often longer than
+# the answer itself, and users never see it. LLM_REASONING picks how much of
+# it to pay for:
+#   full    let the model think as long as it likes (the old behaviour)
+#   capped  stop it after THINK_TOKEN_BUDGET reasoning tokens and have the
+#           same generation go on to the answer from there
+#   off     ask for the answer directly (Ollama's "think": false, 0.9+), the
+#           fastest and the default
+# Outside "full", generations are also capped at num_predict tokens.
+REASONING = os.getenv("LLM_REASONING", "off")
+THINK_TOKEN_BUDGET = int(os.getenv("LLM_THINK_TOKENS", "256"))
+ANSWER_TOKEN_BUDGET = int(os.getenv("LLM_ANSWER_TOKENS", "1024"))
+# Every LLM_BASELINE_EVERY-th generation of a command thinks in full, as the
+# baseline the other modes' saved tokens and seconds are measured against
+# (0: never, and nothing is reported as saved)
+BASELINE_EVERY = int(os.getenv("LLM_BASELINE_EVERY", "50"))
+CHARS_PER_TOKEN = 4
+
+log = get_logger("llm_backend")
+
+
+def _num_predict(mode, thinking):
+    if mode == "full":
+        return None
+    return ANSWER_TOKEN_BUDGET + (THINK_TOKEN_BUDGET if thinking else 0)
+
+
+async def ollama_stream_chat(prompt, model, mode=None, reasoning=None):
+    """
+    Yields the raw reply to a single user prompt (reasoning included, in
+    <think> tags, unless mode is "off") piece by piece as Ollama produces
+    it (NDJSON stream from /api/chat). With reasoning (the raw reply so far,
+    cut off inside its <think> block), the reply is continued from there
+    with the reasoning closed: Ollama carries on after a trailing assistant
+    message, so only the answer is generated. mode defaults to LLM_REASONING.
+    """
+    mode = mode or REASONING
+    messages = [{"role": "user", "content": prompt}]
+    payload = {"model": model, "messages": messages, "stream": True, "keep_alive": models.keep_alive(model)}
+    if reasoning is not None:
+        messages.append({"role": "assistant", "content": f"{reasoning}\n{ThinkFilter.CLOSE}\n\n"})
+    elif mode == "off":
+        payload["think"] = False
+    num_predict = _num_predict(mode, mode != "off" and reasoning is None)
+    if num_predict is not None:
+        payload["options"] = {"num_predict": num_predict}
+    async for part in OLLAMA.stream_json("/api/chat", payload):
+        if part.get("done"):
+            models.observe(model, part.get("load_duration", 0) / 1e9)
+        yield part["message"]["content"]
+
+
+async def openrouter_chat(prompt, model=OPENROUTER_MODEL, mode=None):
+    """
+    Sends one prompt to OpenRouter (key from OPENROUTER_API_KEY) and returns
+    the reply text. OpenRouter returns R1's reasoning separately; it is
+    capped or turned down per mode (default LLM_REASONING) and never
+    requested back.
+    """
+    mode = mode or REASONING
+    data = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+    if mode != "full":
+        data["reasoning"] = {"max_tokens": THINK_TOKEN_BUDGET, "exclude": True} if mode == "capped" else {"effort": "low", "exclude": True}
+    response = await OPENROUTER.post_json("/chat/completions", data)
+    return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+
+async def _one_piece(answer):
+    yield await answer
+
+
+class GenerationStats:
+    """
+    Latency and output tokens (estimated from characters) per command, kept
+    here for a quick look. Every baseline_every-th generation of a command
+    runs with full reasoning; against the mean of those, the reasoning
+    tokens and seconds the other generations saved are counted and exported
+    to the metrics endpoint along with the latency and tokens.
+    """
+
+    def __init__(self, baseline_every=BASELINE_EVERY):
+        self.baseline_every = baseline_every
+        self.commands = {}
+        self._started = {}
+
+    def mode_for(self, command):
+        """The reasoning mode for the next generation of command."""
+        self._started[command] = started = self._started.get(command, 0) + 1
+        if self.baseline_every and started % self.baseline_every == 0:
+            return "full"
+        return REASONING
+
+    def record(self, command, mode, seconds, first_token, reasoning_tokens, answer_tokens, cut):
+        entry = self.commands.setdefault(command, {
+            "calls": 0, "seconds": 0.0, "reasoning_tokens": 0, "answer_tokens": 0, "cut": 0,
+            "baseline_calls": 0, "baseline_seconds": 0.0, "baseline_reasoning_tokens": 0,
+            "saved_tokens": 0, "saved_seconds": 0.0,
+        })
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["reasoning_tokens"] += reasoning_tokens
+        entry["answer_tokens"] += answer_tokens
+        entry["cut"] += cut
+        if mode == "full":
+            entry["baseline_calls"] += 1
+            entry["baseline_seconds"] += seconds
+            entry["baseline_reasoning_tokens"] += reasoning_tokens
+        elif entry["baseline_calls"]:
+            saved_tokens = max(0, entry["baseline_reasoning_tokens"] // entry["baseline_calls"] - reasoning_tokens)
+            saved_seconds = max(0.0, entry["baseline_seconds"] / entry["baseline_calls"] - seconds)
+            entry["saved_tokens"] += saved_tokens
+            entry["saved_seconds"] += saved_seconds
+            metrics.LLM_REASONING_TOKENS_SAVED.inc(saved_tokens, command=command)
+            metrics.LLM_REASONING_SECONDS_SAVED.inc(saved_seconds, command=command)
+        log.info("generation command=%s mode=%s seconds=%.2f reasoning_tokens=%d answer_tokens=%d cut=%s",
+                 command, mode, seconds, reasoning_tokens, answer_tokens, cut)
+
+        metrics.LLM_GENERATION_SECONDS.observe(seconds, command=command)
+        if first_token is not None:
+            metrics.LLM_FIRST_TOKEN_SECONDS.observe(first_token, command=command)
+        if seconds > 0:
+            metrics.LLM_TOKENS_PER_SECOND.observe((reasoning_tokens + answer_tokens) / seconds, command=command)
+        metrics.LLM_TOKENS.inc(reasoning_tokens, kind="reasoning")
+        metrics.LLM_TOKENS.inc(answer_tokens, kind="answer")
+
+    def snapshot(self):
+        return {
+            command: dict(entry, mean_seconds=entry["seconds"] / entry["calls"])
+            for command, entry in self.commands.items()
+        }
+
+
+generation_stats = GenerationStats()
+
+
+async def answer_stream(open_stream):
+    """
+    The one place <think> reasoning is handled. open_stream(mode) starts a
+    raw generation with that reasoning mode and returns an async iterator of
+    its text, and open_stream(mode, reasoning) continues one after the raw
+    text it had produced; this yields only the answer, stopping the
+    reasoning per the mode, and records the call in generation_stats.
+    """
+    began = time.monotonic()
+    request = current_request.get()
+    command = request.command if request and request.command else "other"
+    mode = generation_stats.mode_for(command)
+    think = ThinkFilter()
+    answer_chars = 0
+    first_token = None
+    cut = False
+    raw = open_stream(mode)
+    received = []  # Raw text of the first generation, until the reasoning is cut
+    current = None
+    try:
+        while raw is not None:
+            current, raw = raw, None
+            async for piece in current:
+                if not cut:
+                    received.append(piece)
+                visible = think.feed(piece)
+                if not answer_chars:
+                    # Reasoning models open with blank lines right after </think>
+                    visible = visible.lstrip()
+                if visible:
+                    if first_token is None:
+                        first_token = time.monotonic() - began
+                    answer_chars += len(visible)
+                    yield visible
+                elif (mode == "capped" and not cut and think.inside
+                      and think.hidden_chars > THINK_TOKEN_BUDGET * CHARS_PER_TOKEN):
+                    # Stop reasoning here and go on with the answer, keeping what was thought so far
+                    await current.aclose()
+                    cut = True
+                    think = ThinkFilter(hidden_chars=think.hidden_chars)
+                    raw = open_stream(mode, "".join(received))
+                    break
+        rest = think.flush()
+        if rest:
+            answer_chars += len(rest)
+            yield rest
+    finally:
+        if current is not None:
+            await current.aclose()
+
+    seconds = time.monotonic() - began
+    if request is not None:
+        request.add_timing("generating", seconds)
+        if first_token is not None and "first_token" not in request.timings:
+            request.add_timing("first_token", first_token)
+    generation_stats.record(
+        command,
+        mode,
+        seconds,
+        first_token,
+        think.hidden_chars // CHARS_PER_TOKEN,
+        answer_chars // CHARS_PER_TOKEN,
+        cut,
+    )
+
+
+async def answer(open_stream):
+    """The whole answer of answer_stream() as one string."""
+    return "".join([piece async for piece in answer_stream(open_stream)]).strip()
+
+
+# -------------------------------
+# Routing
+# -------------------------------
+# Which backend and model answers a prompt is decided per call by llm_router.
+# LLM_ROUTES lists the routes to use, e.g. "openrouter" for a deployment
+# without a local Ollama, or "mock" to run the bot with no model at all.
+# The default is both local models, plus OpenRouter when OPENROUTER_API_KEY
+# is set.
+def _route(name, size, opener, **kwargs):
+    # opener(prompt) -> open_stream(mode, reasoning=None) for answer_stream()
+    return Route(
+        name, size,
+        lambda prompt: answer(opener(prompt)),
+        lambda prompt: answer_stream(opener(prompt)),
+        **kwargs,
+    )
+
+
+def _ollama_opener(model):
+    return lambda prompt: lambda mode, reasoning=None: ollama_stream_chat(prompt, model, mode, reasoning)
+
+
+def _ollama_route(name, size, model, expected_latency):
+    return _route(name, size, _ollama_opener(model), breaker=OLLAMA.breaker, expected_latency=expected_latency)
+
+
+def _openrouter_route():
+    # OpenRouter keeps the reasoning out of the reply, so it is never cut short here
+    return _route(
+        "openrouter", LARGE, lambda prompt: lambda mode, reasoning=None: _one_piece(openrouter_chat(prompt, mode=mode)),
+        breaker=OPENROUTER.breaker, scheduler=LLMScheduler(OPENROUTER_CONCURRENCY), expected_latency=30.0,
+    )
+
+
+def _mock_route():
+    mock = MockBackend()
+    return _route("mock", SMALL, lambda prompt: lambda mode, reasoning=None: mock.stream_chat(prompt),
+                  breaker=mock.breaker, expected_latency=mock.latency)
+
+
+ROUTES = {
+    "ollama-small": lambda: _ollama_route("ollama-small", SMALL, SMALL_MODEL, 5.0),
+    "ollama-large": lambda: _ollama_route("ollama-large", LARGE, LARGE_MODEL, 20.0),
+    "openrouter": _openrouter_route,
+    "mock": _mock_route,
+}
+
+
+def build_router(names=None):
+    if names is None:
+        default = "ollama-small,ollama-large" + (",openrouter" if os.getenv("OPENROUTER_API_KEY") else "")
+        names = os.getenv("LLM_ROUTES", default)
+    names = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(ROUTES))
+    if unknown:
+        raise SystemExit(f"Unknown routes in LLM_ROUTES: {', '.join(unknown)} (available: {', '.join(ROUTES)})")
+    return LLMRouter([ROUTES[name]() for name in names])
+
+
+router = build_router()
+
+# Preloading, keep_alive and quiet-hour unloads for the Ollama models in use
+# (started by the bot once it's online)
+OLLAMA_MODELS = {"ollama-small": SMALL_MODEL, "ollama-large": LARGE_MODEL}
+models = ModelLifecycle(OLLAMA, [OLLAMA_MODELS[route.name] for route in router.routes if route.name in OLLAMA_MODELS])
+
+
+async def chat(prompt, model=None):
+    """
+    Returns the answer to a single user prompt, without reasoning. Without
+    a model the router picks one (and falls back to the next on failure);
+    with one, that Ollama model is used. Either way the call waits its turn
+    in a scheduler without blocking the loop.
+    """
+    if model is None:
+        return await router.chat(prompt)
+    async with llm_scheduler.slot(prompt):
+        return await answer(_ollama_opener(model)(prompt))
+
+
+async def stream_chat(prompt, model=None):
+    """Like chat(), but yields the answer piece by piece as it is generated."""
+    if model is None:
+        async for piece in router.stream_chat(prompt):
+            yield piece
+        return
+    async with llm_scheduler.slot(prompt):
+        async for piece in answer_stream(_ollama_opener(model)(prompt)):
+            yield piece
+
+
+# -------------------------------
+# Cached entry points
+# -------------------------------
+# template is the prompt with a {text} placeholder; text is the (already
+# truncated) user input. Both go into the cache key along with the model
+# ("auto" for routed calls) and the reasoning budget.
+RAW_PROMPT = "{text}"
+
+
+def _cache_key(model, template, text):
+    return llm_cache.make_key(model or "auto", template, text, {"reasoning": REASONING, "think_tokens": THINK_TOKEN_BUDGET})
+
+
+async def cached_chat(template, text, model=None):
+    key = _cache_key(model, template, text)
+    return await llm_cache.cache.get_or_generate(key, lambda: chat(template.format(text=text), model=model))
+
+
+def cached_stream_chat(template, text, model=None):
+    key = _cache_key(model, template, text)
+    return llm_cache.cache.stream_or_generate(key, lambda: stream_chat(template.format(text=text), model=model))
+
+
+def completer(model=None):
+    """
+    Returns an async prompt -> answer function (cached) for the
+    summarization helpers.
+    """
+    async def complete(prompt):
+        return await cached_chat(RAW_PROMPT, prompt, model=model)
+    return complete
+
+
+# -------------------------------
+# Streaming
+# -------------------------------
+# Set STREAM_RESPONSES=0 to fall back to waiting for the whole completion
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"
+
+
+class ThinkFilter:
+    """
+    Removes DeepSeek R1 <think>...</think> spans from a token stream as it
+    arrives. Tags may be split across tokens, so a possible partial tag is
+    held back until the next feed(). hidden_chars counts the reasoning
+    dropped so far.
+    """
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self, hidden_chars=0):
+        self._buffer = ""
+        self.inside = False
+        self.hidden_chars = hidden_chars
+
+    def feed(self, text):
+        """Adds a piece of the stream and returns whatever is safe to show."""
+        self._buffer += text
+        visible = []
+        while True:
+            if self.inside:
+                end = self._buffer.find(self.CLOSE)
+                if end == -1:
+                    # Only a partial closing tag can matter from here on
+                    keep = self._buffer[-(len(self.CLOSE) - 1):]
+                    self.hidden_chars += len(self._buffer) - len(keep)
+                    self._buffer = keep
+                    break
+                self.hidden_chars += end
+                self._buffer = self._buffer[end + len(self.CLOSE):]
+                self.inside = False
+            else:
+                start = self._buffer.find(self.OPEN)
+                if start == -1:
+                    keep = _partial_tag_length(self._buffer, self.OPEN)
+                    visible.append(self._buffer[:len(self._buffer) - keep])
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(self.OPEN):]
+                self.inside = True
+        return "".join(visible)
+
+    def flush(self):
+        """Returns any held-back text once the stream has ended."""
+        rest = "" if self.inside else self._buffer
+        self._buffer = ""
+        return rest
+
+
+def _partial_tag_length(text, tag):
+    # Length of the longest suffix of text that is a prefix of tag
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
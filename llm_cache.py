@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+import metrics
+from storage import AsyncDatabase
+
+# =================================================================================
+#                   CONTENT-ADDRESSED CACHE FOR LLM RESPONSES
+# =================================================================================
+# Retried !summarize / !ask / /perform_review requests with the same input
+# otherwise cost a full DeepSeek R1 generation each time. Responses are kept
+# in memory (LRU + TTL) and, when LLM_CACHE_PATH is set, in SQLite so they
+# survive restarts. Identical requests that arrive while a generation is
+# still running wait for that one instead of starting their own.
+
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_SIZE", "512"))
+TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL", str(6 * 60 * 60)))
+DISK_PATH = os.getenv("LLM_CACHE_PATH")  # e.g. "llm_cache.db"; unset keeps it memory-only
+DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_SIZE", "10000"))
+# Expired and surplus rows are deleted with every PURGE_EVERY-th write, not each one
+PURGE_EVERY = 100
+
+DISK_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache (expires_at)",
+]
+SELECT_ENTRY = "SELECT response, expires_at FROM llm_cache WHERE key = ?"
+UPSERT_ENTRY = "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)"
+DELETE_EXPIRED = "DELETE FROM llm_cache WHERE expires_at < ?"
+# Every row shares one TTL, so the soonest to expire are also the oldest
+DELETE_OLDEST = "DELETE FROM llm_cache WHERE expires_at < (SELECT expires_at FROM llm_cache ORDER BY expires_at DESC LIMIT 1 OFFSET ?)"
+
+# What an in-flight generation resolves to when its owner was cancelled or
+# stopped reading before the end: the requests waiting on it generate instead
+_ABANDONED = object()
+
+
+def make_key(model, template, text, options=None):
+    """
+    Cache key for one generation: the model, the prompt template, the
+    (already truncated) input and any generation options.
+    """
+    payload = json.dumps([model, template, text, options or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# stats() attribute -> result label of metrics.LLM_CACHE_LOOKUPS
+LOOKUP_RESULTS = {"hits": "hit", "shared": "shared", "misses": "miss"}
+
+
+class ResponseCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_path=DISK_PATH, disk_max_entries=DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, response), oldest first
+        self._inflight = {}  # key -> Future shared by identical concurrent requests
+        self._disk = AsyncDatabase(disk_path, readers=1, schema=DISK_SCHEMA) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.shared = 0  # requests that joined an in-flight generation
+        self._puts = 0
+
+    def _count(self, result):
+        # The attributes feed stats(); the same lookups are exported as metrics.LLM_CACHE_LOOKUPS
+        setattr(self, result, getattr(self, result) + 1)
+        metrics.LLM_CACHE_LOOKUPS.inc(result=LOOKUP_RESULTS[result])
+
+    def stats(self):
+        lookups = self.hits + self.shared + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "entries": len(self._entries),
+            "hit_rate": (self.hits + self.shared) / lookups if lookups else 0.0,
+        }
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        if self._disk is not None:
+            row = await self._disk.fetchone(SELECT_ENTRY, (key,))
+            if row is not None and row[1] > now:
+                self.disk_hits += 1
+                self._remember(key, row[0], row[1])
+                return row[0]
+        return None
+
+    async def put(self, key, response):
+        expires_at = time.time() + self.ttl
+        self._remember(key, response, expires_at)
+        if self._disk is not None:
+            statements = [(UPSERT_ENTRY, (key, response, expires_at))]
+            self._puts += 1
+            if self._puts % PURGE_EVERY == 0:
+                statements.append((DELETE_EXPIRED, (time.time(),)))
+                statements.append((DELETE_OLDEST, (self.disk_max_entries - 1,)))
+            await self._disk.write(statements)
+
+    async def close(self):
+        if self._disk is not None:
+            await self._disk.close()
+            self._disk = None
+
+    def _remember(self, key, response, expires_at):
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_generate(self, key, generate):
+        """
+        Returns the cached response for key, or awaits generate() (a
+        zero-argument coroutine function) once and caches its result.
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+        while key in self._inflight:
+            response = await asyncio.shield(self._inflight[key])
+            if response is not _ABANDONED:
+                self._count("shared")
+                return response
+            # Nobody is generating it any more (or someone else took over)
+
+        self._count("misses")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await generate()
+            future.set_result(response)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited failure isn't logged
+            raise
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                future.set_result(_ABANDONED)  # We were cancelled; a waiter takes over
+        await self.put(key, response)
+        return response
+
+    async def stream_or_generate(self, key, stream):
+        """
+        Streaming flavour of get_or_generate: yields the cached response in
+        one piece on a hit, otherwise yields stream()'s tokens as they arrive
+        and caches the full text once the stream finishes.
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            self._count("hits")
+            yield cached
+            return
+        while key in self._inflight:
+            response = await asyncio.shield(self._inflight[key])
+            if response is not _ABANDONED:
+                self._count("shared")
+                yield response
+                return
+
+        self._count("misses")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        parts = []
+        try:
+            async for token in stream():
+                parts.append(token)
+                yield token
+            response = "".join(parts)
+            future.set_result(response)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                # The consumer stopped early; don't cache a partial answer, a waiter takes over
+                future.set_result(_ABANDONED)
+        await self.put(key, response)
+
+
+# Shared by every bot in the process
+cache = ResponseCache()
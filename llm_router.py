@@ -0,0 +1,194 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import metrics
+from bot_logging import get_logger
+from http_client import BackendUnavailable, CircuitBreaker
+from scheduler import SHORT_PROMPT_TOKENS, llm_scheduler
+
+# =================================================================================
+#                   PICKS A BACKEND AND MODEL PER REQUEST
+# =================================================================================
+# A route is one model on one backend (deepseek-r1:1.5b on the local Ollama,
+# DeepSeek R1 on OpenRouter, ...). For every call the router orders the
+# routes by how soon each is expected to answer: its recent p95 latency,
+# scaled up by how many calls are queued or running in front of it. Short
+# prompts prefer small models and long ones large models; a route of the
+# other size only wins if it is SIZE_MISMATCH_PENALTY times faster. Routes
+# whose circuit breaker is open go last. When a route fails or times out the
+# next one is tried.
+
+SMALL, LARGE = "small", "large"
+# Recent successful calls per route the p95 is taken over
+LATENCY_WINDOW = 50
+SIZE_MISMATCH_PENALTY = 4.0
+# Errors that mean "try somewhere else"; anything else is the caller's problem
+FALLBACK_ERRORS = (BackendUnavailable, asyncio.TimeoutError)
+
+log = get_logger("llm_router")
+
+
+class Route:
+    def __init__(self, name, size, chat, stream_chat=None, breaker=None, scheduler=llm_scheduler, expected_latency=10.0):
+        """
+        chat is an async prompt -> answer function and stream_chat an async
+        generator of answer pieces (without it, the answer arrives in one
+        piece). breaker is the backend's CircuitBreaker, only read here.
+        expected_latency (seconds) stands in for the p95 until calls have
+        been measured.
+        """
+        self.name = name
+        self.size = size
+        self._chat = chat
+        self._stream_chat = stream_chat
+        self.breaker = breaker
+        self.scheduler = scheduler
+        self.expected_latency = expected_latency
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+
+    def p95(self):
+        if not self.latencies:
+            return self.expected_latency
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def expected_wait(self):
+        scheduler = self.scheduler
+        busy = scheduler.in_flight + scheduler.waiting
+        return self.p95() * (1 + busy / scheduler.max_in_flight)
+
+    def available(self):
+        return self.breaker is None or self.breaker.state != "open"
+
+    async def chat(self, prompt):
+        self.calls += 1
+        async with self.scheduler.slot(prompt):
+            began = time.monotonic()
+            try:
+                answer = await self._chat(prompt)
+            except FALLBACK_ERRORS:
+                self.failures += 1
+                metrics.LLM_ROUTE_FAILURES.inc(route=self.name)
+                raise
+            self.latencies.append(time.monotonic() - began)
+        return answer
+
+    async def stream_chat(self, prompt):
+        if self._stream_chat is None:
+            yield await self.chat(prompt)
+            return
+        self.calls += 1
+        async with self.scheduler.slot(prompt):
+            began = time.monotonic()
+            try:
+                async for piece in self._stream_chat(prompt):
+                    yield piece
+            except FALLBACK_ERRORS:
+                self.failures += 1
+                metrics.LLM_ROUTE_FAILURES.inc(route=self.name)
+                raise
+            self.latencies.append(time.monotonic() - began)
+
+
+class LLMRouter:
+    def __init__(self, routes):
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = list(routes)
+        self.fallbacks = 0
+
+    def candidates(self, prompt):
+        """The routes to try for prompt, best first."""
+        size = SMALL if len(prompt) // 4 <= SHORT_PROMPT_TOKENS else LARGE
+
+        def cost(route):
+            wait = route.expected_wait()
+            if route.size != size:
+                wait *= SIZE_MISMATCH_PENALTY
+            return (not route.available(), wait)
+
+        return sorted(self.routes, key=cost)
+
+    async def chat(self, prompt):
+        error = None
+        for route in self.candidates(prompt):
+            if error is not None:
+                self._fell_back(error, route)
+            try:
+                return await route.chat(prompt)
+            except FALLBACK_ERRORS as e:
+                error = e
+        raise _give_up(error)
+
+    async def stream_chat(self, prompt):
+        """
+        Streams from the first route that works. Once a route has produced
+        output, a failure is raised instead of starting over elsewhere
+        (the caller has already shown part of the answer).
+        """
+        error = None
+        for route in self.candidates(prompt):
+            if error is not None:
+                self._fell_back(error, route)
+            started = False
+            try:
+                async for piece in route.stream_chat(prompt):
+                    started = True
+                    yield piece
+                return
+            except FALLBACK_ERRORS as e:
+                if started:
+                    raise _give_up(e)
+                error = e
+        raise _give_up(error)
+
+    def _fell_back(self, error, route):
+        self.fallbacks += 1
+        metrics.LLM_FALLBACKS.inc()
+        log.warning("fallback to=%s error=%s", route.name, str(error) or type(error).__name__)
+
+    def stats(self):
+        return {
+            route.name: {"calls": route.calls, "failures": route.failures, "p95": route.p95(), "available": route.available()}
+            for route in self.routes
+        }
+
+
+def _give_up(error):
+    if isinstance(error, BackendUnavailable):
+        return error
+    return BackendUnavailable("The AI backends timed out. Please try again later.")
+
+
+class MockBackend:
+    """
+    In-process stand-in for a model server, for running the bot and the
+    benchmarks without Ollama. Answers after about latency seconds and fails
+    failure_rate of the calls, behind a circuit breaker like a real backend.
+    """
+
+    def __init__(self, name="Mock", latency=0.5, failure_rate=0.0, seed=None):
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.breaker = CircuitBreaker()
+        self._random = random.Random(seed)
+
+    async def chat(self, prompt):
+        if not self.breaker.allow():
+            raise BackendUnavailable(f"{self.name} is unavailable (retrying in {self.breaker.retry_in():.0f}s). Please try again later.")
+        await asyncio.sleep(self.latency * self._random.uniform(0.5, 1.5))
+        if self._random.random() < self.failure_rate:
+            self.breaker.record_failure()
+            raise BackendUnavailable(f"{self.name} is unavailable (HTTP 503). Please try again later.")
+        self.breaker.record_success()
+        return f"<think>mock reasoning</think>{self.name} read {len(prompt)} characters."
+
+    async def stream_chat(self, prompt):
+        answer = await self.chat(prompt)
+        for n, word in enumerate(answer.split(" ")):
+            yield word if n == 0 else " " + word
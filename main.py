@@ -0,0 +1,216 @@
+# =================================================================================
+#                   ONE PROCESS FOR EVERY BOT FEATURE
+# =================================================================================
+# Replaces running DPB, Joel's Bot, bot.py and WideShmeer side by side (four
+# gateway connections, four copies of every library). Features are cogs in
+# cogs/; pick them per deployment:
+#
+#     BOT_COGS=llm,shorts python main.py
+#
+# The four old scripts are now launchers that run this with their own cogs.
+#
+# DISCORD_BOT_TOKEN is the bot token. COMMAND_GUILD_ID, if set, syncs slash
+# commands to that one server (instant) instead of globally.
+#
+# Gateway intents are worked out from the enabled cogs, so the process isn't
+# sent presence and member updates nobody handles. For large guild counts,
+# run several processes that each own a range of shards:
+#
+#     SHARD_COUNT=8 SHARD_IDS=0-3 python main.py
+#     SHARD_COUNT=8 SHARD_IDS=4-7 python main.py
+#
+# Without SHARD_COUNT, Discord's recommended shard count is used and all
+# shards run in this process.
+#
+# GATEWAY_RECORD=events.jsonl appends every received dispatch event to that
+# file, for replaying with benchmarks/bench_gateway_replay.py.
+#
+# Metrics (command latency, LLM queue/generation time, SQLite, downloads,
+# event-loop lag) are served at http://127.0.0.1:9108/metrics; METRICS_PORT
+# moves it, METRICS_PORT=0 turns it off. Commands that used the model also
+# log a trace line splitting their time into queued / generating.
+import asyncio
+import logging
+import os
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import cogs
+import conversations
+import metrics
+from bot_logging import get_logger
+from scheduler import current_request
+
+log = get_logger("commands")
+
+
+def intents_for(cog_names):
+    """The smallest set of gateway intents the given cogs work with."""
+    intents = discord.Intents.none()
+    intents.guilds = True
+    for name in cog_names:
+        for flag in cogs.INTENTS[name]:
+            setattr(intents, flag, True)
+    return intents
+
+
+def parse_shard_ids(text):
+    """ "0-3,8" -> [0, 1, 2, 3, 8] """
+    shard_ids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-")
+            shard_ids.update(range(int(first), int(last) + 1))
+        elif part:
+            shard_ids.add(int(part))
+    return sorted(shard_ids)
+
+
+def shard_settings():
+    """(shard_ids, shard_count) from SHARD_IDS / SHARD_COUNT."""
+    shard_count = int(os.environ["SHARD_COUNT"]) if os.getenv("SHARD_COUNT") else None
+    shard_ids = parse_shard_ids(os.environ["SHARD_IDS"]) if os.getenv("SHARD_IDS") else None
+    if shard_ids is not None:
+        if shard_count is None:
+            raise SystemExit("SHARD_IDS needs SHARD_COUNT (the total across all processes)")
+        if shard_ids[-1] >= shard_count:
+            raise SystemExit(f"SHARD_IDS go up to {shard_ids[-1]} but SHARD_COUNT is {shard_count}")
+    return shard_ids, shard_count
+
+
+def record_command(command, kind, status, seconds):
+    metrics.COMMAND_SECONDS.observe(seconds, command=command, kind=kind, status=status)
+    request = current_request.get()
+    if request is not None and request.timings:
+        timings = " ".join(f"{name}={value:.2f}" for name, value in sorted(request.timings.items()))
+        log.info("trace command=%s kind=%s status=%s seconds=%.2f %s", command, kind, status, seconds, timings)
+
+
+def _since(interaction):
+    return (discord.utils.utcnow() - interaction.created_at).total_seconds()
+
+
+class MetricsTree(app_commands.CommandTree):
+    async def on_error(self, interaction, error):
+        if interaction.command is not None:
+            record_command(interaction.command.qualified_name, "slash", "error", _since(interaction))
+        await super().on_error(interaction, error)
+
+
+def enabled_cogs():
+    names = [name.strip() for name in os.getenv("BOT_COGS", ",".join(cogs.AVAILABLE)).split(",") if name.strip()]
+    unknown = sorted(set(names) - set(cogs.AVAILABLE))
+    if unknown:
+        raise SystemExit(f"Unknown cogs in BOT_COGS: {', '.join(unknown)} (available: {', '.join(cogs.AVAILABLE)})")
+    return names
+
+
+class Bot(commands.AutoShardedBot):
+    def __init__(self, cog_names, shard_ids=None, shard_count=None, **kwargs):
+        record_path = os.getenv("GATEWAY_RECORD")
+        super().__init__(
+            command_prefix="!",
+            intents=intents_for(cog_names),
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            # No cog looks at member lists, so don't download them on connect
+            chunk_guilds_at_startup=False,
+            enable_debug_events=bool(record_path),
+            tree_cls=MetricsTree,
+            **kwargs,
+        )
+        self.cog_names = cog_names
+        # Prompts waiting for the user's next message (instead of wait_for listeners)
+        self.conversations = conversations.Conversations()
+        self._store = None
+        self._metrics = metrics.MetricsServer() if metrics.METRICS_PORT else None
+        self._record = open(record_path, "a", encoding="utf-8") if record_path else None
+
+    @property
+    def store(self):
+        """Groups, thoughts and submissions store, opened in setup_hook when an enabled cog uses it."""
+        return self._store
+
+    async def open_store(self):
+        if cogs.USES_STORE.intersection(self.cog_names):
+            import bot_store
+            # Reads the old flat files on a first run; keep that off the event loop
+            await asyncio.to_thread(bot_store.import_legacy_files)
+            self._store = bot_store.BotStore()
+
+    async def setup_hook(self):
+        if self._metrics is not None:
+            await self._metrics.start()
+        await self.open_store()
+        for name in self.cog_names:
+            await self.load_extension(f"cogs.{name}")
+
+        guild_id = os.getenv("COMMAND_GUILD_ID")
+        if guild_id:
+            guild = discord.Object(id=int(guild_id))
+            self.tree.copy_global_to(guild=guild)
+            synced = await self.tree.sync(guild=guild)
+        else:
+            synced = await self.tree.sync()
+        logging.getLogger("bot").info("cogs=%s slash_commands=%d", ",".join(self.cog_names), len(synced))
+
+    async def close(self):
+        import http_client
+        await http_client.close()
+        if self._metrics is not None:
+            await self._metrics.stop()
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+        # Unloads the cogs, which close their own databases
+        await super().close()
+        if self._store is not None:
+            await self._store.db.close()
+            self._store = None
+
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        began = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            # command_failed: raised, or caught by the handler (metrics.command_failed)
+            record_command(ctx.command.qualified_name, "prefix", "error" if ctx.command_failed else "ok", time.perf_counter() - began)
+
+    async def on_message(self, message):
+        # A reply to an open prompt is an answer, not a command
+        if self.conversations.feed(message):
+            return
+        await self.process_commands(message)
+
+    async def on_app_command_completion(self, interaction, command):
+        # Measured from when the user sent it: deferring and followups included
+        status = "error" if interaction.extras.get("failed") else "ok"
+        record_command(command.qualified_name, "slash", status, _since(interaction))
+
+    async def on_ready(self):
+        print(f'Logged in as {self.user} (shards {sorted(self.shards)} of {self.shard_count})')
+
+    async def on_socket_raw_receive(self, payload):
+        # Only dispatched when GATEWAY_RECORD is set (enable_debug_events); op 0 is an event
+        if self._record is not None and '"op":0' in payload:
+            self._record.write(payload + "\n")
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if not token:
+        raise SystemExit("Error: DISCORD_BOT_TOKEN is missing!")
+    shard_ids, shard_count = shard_settings()
+    Bot(enabled_cogs(), shard_ids=shard_ids, shard_count=shard_count).run(token)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import asyncio
+import contextlib
+import os
+import shutil
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+import metrics
+from storage import AsyncDatabase
+
+# =================================================================================
+#                   PERSISTENT CACHE FOR DOWNLOADED SHORTS
+# =================================================================================
+# The same Short gets posted in channel after channel. Downloaded videos are
+# kept on disk by video id (least recently used evicted past MAX_BYTES), and
+# once one has been uploaded its Discord attachment URL is remembered, so a
+# repeat post is answered with that link: no download and no upload. Signed
+# CDN links expire, after which the file on disk is uploaded again.
+
+CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "/root/ytshortsbot/MediaCache/")
+MAX_BYTES = int(os.getenv("MEDIA_CACHE_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Used when an attachment URL carries no "ex" expiry parameter
+ATTACHMENT_URL_TTL = 20 * 60 * 60
+# Don't hand out a link that is about to expire
+URL_EXPIRY_MARGIN = 5 * 60
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS media (
+        video_id TEXT PRIMARY KEY,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL,
+        attachment_url TEXT,
+        url_expires_at REAL
+    )
+    ''',
+]
+SELECT_ALL = "SELECT video_id, filename, size, last_used, attachment_url, url_expires_at FROM media ORDER BY last_used"
+UPSERT_ENTRY = "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)"
+TOUCH_ENTRY = "UPDATE media SET last_used = ? WHERE video_id = ?"
+SET_ATTACHMENT_URL = "UPDATE media SET attachment_url = ?, url_expires_at = ? WHERE video_id = ?"
+DELETE_ENTRY = "DELETE FROM media WHERE video_id = ?"
+
+# What an in-flight download resolves to when its owner was cancelled: the
+# posts waiting on it download instead
+_ABANDONED = object()
+
+
+def url_expiry(url):
+    """When a Discord CDN link stops working (its hex "ex" parameter)."""
+    expires = parse_qs(urlparse(url).query).get("ex")
+    if expires:
+        try:
+            return int(expires[0], 16)
+        except ValueError:
+            pass
+    return time.time() + ATTACHMENT_URL_TTL
+
+
+class MediaCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.db = AsyncDatabase(os.path.join(directory, "index.db"), readers=1, schema=SCHEMA)
+        # video id -> [filename, size, attachment_url, url_expires_at], least recently used first
+        self._entries = None
+        self._loading = asyncio.Lock()
+        self._pins = {}  # video id -> number of posts currently sending it; never evicted
+        self._downloads = {}  # video id -> Future shared by concurrent misses
+        self.total_bytes = 0
+        self.url_hits = 0
+        self.file_hits = 0
+        self.misses = 0
+
+    def stats(self):
+        # Lookups are also exported as metrics.MEDIA_CACHE_LOOKUPS
+        lookups = self.url_hits + self.file_hits + self.misses
+        return {
+            "url_hits": self.url_hits,
+            "file_hits": self.file_hits,
+            "misses": self.misses,
+            "entries": len(self._entries or ()),
+            "bytes": self.total_bytes,
+            "hit_rate": (self.url_hits + self.file_hits) / lookups if lookups else 0.0,
+        }
+
+    async def _load(self):
+        async with self._loading:
+            if self._entries is not None:
+                return
+            entries = OrderedDict()
+            for video_id, filename, size, _, url, expires_at in await self.db.fetchall(SELECT_ALL):
+                if os.path.exists(os.path.join(self.directory, filename)):
+                    entries[video_id] = [filename, size, url, expires_at]
+                    self.total_bytes += size
+            self._entries = entries
+
+    async def lookup(self, video_id):
+        """
+        Returns (attachment_url, path) for a cached video: a still valid
+        Discord link if there is one, otherwise the file on disk. Both are
+        None on a miss.
+        """
+        if self._entries is None:
+            await self._load()
+        entry = self._entries.get(video_id)
+        if entry is None:
+            self.misses += 1
+            metrics.MEDIA_CACHE_LOOKUPS.inc(result="miss")
+            return None, None
+        self._entries.move_to_end(video_id)
+        await self.db.write([(TOUCH_ENTRY, (time.time(), video_id))])
+        filename, _, url, expires_at = entry
+        if url and expires_at - time.time() > URL_EXPIRY_MARGIN:
+            self.url_hits += 1
+            metrics.MEDIA_CACHE_LOOKUPS.inc(result="url_hit")
+            return url, None
+        self.file_hits += 1
+        metrics.MEDIA_CACHE_LOOKUPS.inc(result="file_hit")
+        return None, os.path.join(self.directory, filename)
+
+    async def add(self, video_id, source_path):
+        """Moves a downloaded file into the cache and returns its new path."""
+        if self._entries is None:
+            await self._load()
+        filename = video_id + os.path.splitext(source_path)[1]
+        path = os.path.join(self.directory, filename)
+        await asyncio.to_thread(shutil.move, source_path, path)
+        size = os.path.getsize(path)
+
+        old = self._entries.pop(video_id, None)
+        if old is not None:
+            self.total_bytes -= old[1]
+        self._entries[video_id] = [filename, size, None, None]
+        self.total_bytes += size
+        statements = [(UPSERT_ENTRY, (video_id, filename, size, time.time(), None, None))]
+
+        evicted = []
+        for evicted_id in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if evicted_id == video_id or evicted_id in self._pins:
+                continue
+            evicted_file, evicted_size, _, _ = self._entries.pop(evicted_id)
+            self.total_bytes -= evicted_size
+            statements.append((DELETE_ENTRY, (evicted_id,)))
+            evicted.append(os.path.join(self.directory, evicted_file))
+        for evicted_path in evicted:
+            await asyncio.to_thread(_remove, evicted_path)
+        await self.db.write(statements)
+        return path
+
+    @contextlib.asynccontextmanager
+    async def pinned(self, video_id):
+        """
+        Keeps video_id's file from being evicted while the block runs, so a
+        path returned by lookup() or add() is still there to upload.
+        """
+        self._pins[video_id] = self._pins.get(video_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._pins[video_id] -= 1
+            if not self._pins[video_id]:
+                del self._pins[video_id]
+
+    async def fetch(self, video_id, download):
+        """
+        Awaits download() (a zero-argument coroutine function that returns
+        the cached path, or None) once per video: posts of the same Short
+        that miss while it is downloading wait for that download.
+        """
+        while video_id in self._downloads:
+            path = await asyncio.shield(self._downloads[video_id])
+            if path is not _ABANDONED:
+                return path
+            # Nobody is downloading it any more (or someone else took over)
+
+        future = asyncio.get_running_loop().create_future()
+        self._downloads[video_id] = future
+        try:
+            path = await download()
+            future.set_result(path)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited failure isn't logged
+            raise
+        finally:
+            del self._downloads[video_id]
+            if not future.done():
+                future.set_result(_ABANDONED)  # We were cancelled; a waiter takes over
+        return path
+
+    async def remember_attachment(self, video_id, url):
+        """Records the CDN link of an upload so the next post can reuse it."""
+        entry = self._entries.get(video_id) if self._entries else None
+        if entry is None:
+            return
+        entry[2], entry[3] = url, url_expiry(url)
+        await self.db.write([(SET_ATTACHMENT_URL, (url, entry[3], video_id))])
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
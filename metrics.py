@@ -0,0 +1,215 @@
+import asyncio
+import bisect
+import contextlib
+import os
+import time
+
+# =================================================================================
+#                   IN-PROCESS METRICS, PROMETHEUS TEXT FORMAT
+# =================================================================================
+# Counters, gauges and histograms kept in plain dicts: recording a value is a
+# tuple build, a dict lookup and a bisect, so it's fine on every command and
+# query. main.py serves them at http://METRICS_HOST:METRICS_PORT/metrics for
+# Prometheus to scrape, and measures event-loop lag while it does.
+#
+# Labels are passed as keywords and must be low-cardinality (command names,
+# not user ids).
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 turns the endpoint off
+# How often the loop-lag probe wakes up
+LAG_INTERVAL = 0.5
+
+# Seconds; covers a SQLite read up to a long R1 generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REGISTRY = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key, extra=""):
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{self._labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A value that is set, or read from fn() at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self.fn is not None:
+            return [f"{self.name} {self.fn()}"]
+        return [f"{self.name}{self._labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # [count per bucket (last one is +Inf), sum, count]
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = self._labels(key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+@contextlib.contextmanager
+def timer(histogram, **labels):
+    """Observes how long the with-block took (also when it raises)."""
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - began, **labels)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# -------------------------------
+# What the bots record
+# -------------------------------
+COMMAND_SECONDS = Histogram("bot_command_seconds", "Time to handle a command", ("command", "kind", "status"))
+WAIT_FOR_TIMEOUTS = Counter("bot_wait_for_timeouts_total", "Commands whose follow-up message never came", ("command",))
+LLM_QUEUE_SECONDS = Histogram("llm_queue_seconds", "Time a model call waited for a scheduler slot", ("command",))
+LLM_GENERATION_SECONDS = Histogram("llm_generation_seconds", "Time a model call spent generating", ("command",))
+LLM_FIRST_TOKEN_SECONDS = Histogram("llm_time_to_first_token_seconds", "Time until the first answer text of a model call", ("command",))
+LLM_TOKENS_PER_SECOND = Histogram("llm_tokens_per_second", "Output tokens per second of a model call", ("command",),
+                                  buckets=(1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 400))
+LLM_TOKENS = Counter("llm_tokens_total", "Output tokens generated (estimated)", ("kind",))
+LLM_REASONING_TOKENS_SAVED = Counter("llm_reasoning_tokens_saved_total", "Reasoning tokens not generated, against the sampled full-reasoning baseline", ("command",))
+LLM_REASONING_SECONDS_SAVED = Counter("llm_reasoning_seconds_saved_total", "Generation time saved, against the sampled full-reasoning baseline", ("command",))
+LLM_MODEL_LOAD_SECONDS = Histogram("llm_model_load_seconds", "Time Ollama spent loading the model for a call", ("command",))
+LLM_COLD_STARTS = Counter("llm_cold_starts_total", "Model calls that waited for the model to load", ("command",))
+LLM_COLD_STARTS_AVOIDED = Counter("llm_cold_starts_avoided_total", "Model calls that found the model loaded thanks to preloading or keep_alive", ("command",))
+LLM_COLD_START_SAVED_SECONDS = Counter("llm_cold_start_saved_seconds_total", "Model load time spared by preloading and keep_alive", ("command",))
+LLM_CACHE_LOOKUPS = Counter("llm_cache_lookups_total", "LLM response cache lookups (hit, shared with an in-flight generation, or miss)", ("result",))
+LLM_ROUTE_FAILURES = Counter("llm_route_failures_total", "Model calls that failed on a route", ("route",))
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Model calls retried on another route")
+SQLITE_SECONDS = Histogram("sqlite_query_seconds", "SQLite reads and write jobs, including time queued", ("db", "op"))
+DOWNLOAD_SECONDS = Histogram("shorts_download_seconds", "yt-dlp probes and downloads", ("step", "status"))
+MEDIA_CACHE_LOOKUPS = Counter("media_cache_lookups_total", "Shorts media cache lookups (url_hit, file_hit or miss)", ("result",))
+AVAILABILITY_UPDATE_SECONDS = Histogram("availability_update_seconds", "Updating the common availability for one change", ("command",))
+LOOP_LAG_SECONDS = Histogram("event_loop_lag_seconds", "How late the event loop ran a timer",
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+
+def command_failed(source):
+    """
+    For handlers that catch their own errors and answer with a message:
+    records the command (source is its commands.Context or Interaction)
+    under status="error" in COMMAND_SECONDS instead of "ok".
+    """
+    if hasattr(source, "extras"):
+        source.extras["failed"] = True
+    else:
+        source.command_failed = True
+
+
+# -------------------------------
+# Endpoint and loop-lag probe
+# -------------------------------
+async def _watch_loop_lag(interval=LAG_INTERVAL):
+    while True:
+        began = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - began - interval))
+
+
+class MetricsServer:
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._runner = None
+        self._lag_task = None
+
+    async def start(self):
+        from aiohttp import web  # Already installed with discord.py
+
+        async def handle(request):
+            return web.Response(text=render(), content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.get_running_loop().create_task(_watch_loop_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,209 @@
+import asyncio
+import contextlib
+import datetime
+import os
+import time
+from collections import deque
+
+import metrics
+from bot_logging import get_logger
+from http_client import BackendUnavailable
+from scheduler import current_request
+
+# =================================================================================
+#                   KEEPING THE OLLAMA MODELS LOADED
+# =================================================================================
+# Ollama unloads a model keep_alive seconds (5 minutes by default) after its
+# last request, and the next request waits for it to load again: several
+# seconds for deepseek-r1:7b. With both models in use they can also push each
+# other out of VRAM. ModelLifecycle
+#   - loads every configured model as soon as the bot is online,
+#   - sends each request a keep_alive sized to that model's traffic (twice
+#     the usual gap between its requests, between MIN_ and MAX_KEEP_ALIVE),
+#   - keeps the busiest model loaded for good ("pinned"),
+#   - unloads idle models during LLM_QUIET_HOURS and loads them again when
+#     the quiet hours end.
+# Every Ollama reply says how long it spent loading the model. Calls that
+# waited for a load count as cold starts; calls that found the model loaded
+# where Ollama's default would have unloaded it count as cold starts avoided,
+# with the model's last measured load time as the latency saved. Both are
+# per command on the metrics endpoint.
+
+# Local hours ("1-7", wraps past midnight as in "23-6"); empty for none
+QUIET_HOURS = os.getenv("LLM_QUIET_HOURS", "")
+PIN_HOT_MODEL = os.getenv("LLM_PIN_HOT_MODEL", "1") == "1"
+OLLAMA_DEFAULT_KEEP_ALIVE = 5 * 60
+MIN_KEEP_ALIVE = OLLAMA_DEFAULT_KEEP_ALIVE
+MAX_KEEP_ALIVE = 2 * 60 * 60
+# The hot model is the one with the most calls in this window
+HOT_WINDOW = 10 * 60
+# How often pins and quiet hours are looked at
+CHECK_INTERVAL = 60
+# During quiet hours, models idle this long are unloaded
+QUIET_IDLE = 15 * 60
+# Inter-request gaps remembered per model
+GAP_HISTORY = 50
+# Ollama reports a few milliseconds of load_duration even for a loaded model
+COLD_LOAD_SECONDS = 0.5
+
+log = get_logger("model_lifecycle")
+
+
+def parse_hours(text):
+    """ "1-7" -> {1, 2, 3, 4, 5, 6}, "23-2" -> {23, 0, 1} """
+    hours = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, end = (int(value) for value in part.split("-"))
+        hour = start
+        while hour != end:
+            hours.add(hour)
+            hour = (hour + 1) % 24
+    return hours
+
+
+class ModelLifecycle:
+    def __init__(self, backend, models, quiet_hours=QUIET_HOURS, pin_hot=PIN_HOT_MODEL,
+                 min_keep_alive=MIN_KEEP_ALIVE, max_keep_alive=MAX_KEEP_ALIVE, default_keep_alive=OLLAMA_DEFAULT_KEEP_ALIVE,
+                 hot_window=HOT_WINDOW, check_interval=CHECK_INTERVAL, quiet_idle=QUIET_IDLE,
+                 clock=time.monotonic, hour=lambda: datetime.datetime.now().hour):
+        self.backend = backend
+        self.models = list(models)
+        self.quiet_hours = parse_hours(quiet_hours)
+        self.pin_hot = pin_hot
+        self.min_keep_alive = min_keep_alive
+        self.max_keep_alive = max_keep_alive
+        self.default_keep_alive = default_keep_alive
+        self.hot_window = hot_window
+        self.check_interval = check_interval
+        self.quiet_idle = quiet_idle
+        self.clock = clock
+        self.hour = hour
+        self.load_seconds = {}  # model -> its last measured load time
+        self.commands = {}  # command -> calls / cold_starts / avoided / saved_seconds
+        self._last_use = {}
+        self._gaps = {model: deque(maxlen=GAP_HISTORY) for model in self.models}
+        self._recent = {model: deque() for model in self.models}
+        self._loaded = set()
+        self._pinned = None
+        self._task = None
+
+    def start(self):
+        """Preloads the models and starts the background checks (once; on_ready fires again on reconnects)."""
+        if self.models and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def quiet(self):
+        return self.hour() in self.quiet_hours
+
+    def hot_model(self):
+        now = self.clock()
+        best, best_calls = None, 0
+        for model, calls in self._recent.items():
+            while calls and now - calls[0] > self.hot_window:
+                calls.popleft()
+            if len(calls) > best_calls:
+                best, best_calls = model, len(calls)
+        return best
+
+    def keep_alive(self, model):
+        """Seconds Ollama should keep model loaded after a request (-1: until told otherwise)."""
+        if self.quiet():
+            return self.min_keep_alive
+        if self.pin_hot and model == self.hot_model():
+            return -1
+        gaps = sorted(self._gaps.get(model, ()))
+        if not gaps:
+            return self.min_keep_alive
+        usual_gap = gaps[int(0.9 * (len(gaps) - 1))]
+        return int(min(self.max_keep_alive, max(self.min_keep_alive, 2 * usual_gap)))
+
+    def observe(self, model, load_duration):
+        """Called with every finished Ollama reply; load_duration in seconds."""
+        now = self.clock()
+        request = current_request.get()
+        command = request.command if request and request.command else "other"
+        entry = self.commands.setdefault(command, {"calls": 0, "cold_starts": 0, "avoided": 0, "saved_seconds": 0.0})
+        entry["calls"] += 1
+
+        last = self._last_use.get(model)
+        metrics.LLM_MODEL_LOAD_SECONDS.observe(load_duration, command=command)
+        if load_duration >= COLD_LOAD_SECONDS:
+            self.load_seconds[model] = load_duration
+            entry["cold_starts"] += 1
+            metrics.LLM_COLD_STARTS.inc(command=command)
+        elif last is None or now - last > self.default_keep_alive:
+            # Without the preload or the longer keep_alive this would have been a cold start
+            saved = self.load_seconds.get(model, 0.0)
+            entry["avoided"] += 1
+            entry["saved_seconds"] += saved
+            metrics.LLM_COLD_STARTS_AVOIDED.inc(command=command)
+            metrics.LLM_COLD_START_SAVED_SECONDS.inc(saved, command=command)
+
+        if last is not None:
+            self._gaps.setdefault(model, deque(maxlen=GAP_HISTORY)).append(now - last)
+        self._last_use[model] = now
+        self._recent.setdefault(model, deque()).append(now)
+        self._loaded.add(model)
+
+    async def load(self, model, keep_alive=None):
+        """Loads model (or refreshes its keep_alive); keep_alive 0 unloads it."""
+        if keep_alive is None:
+            keep_alive = self.keep_alive(model)
+        try:
+            reply = await self.backend.post_json("/api/generate", {"model": model, "keep_alive": keep_alive, "stream": False})
+        except BackendUnavailable as e:
+            log.warning("model=%s keep_alive=%s failed: %s", model, keep_alive, e)
+            return
+        if keep_alive == 0:
+            self._loaded.discard(model)
+            log.info("unloaded model=%s", model)
+            return
+        self._loaded.add(model)
+        load_duration = reply.get("load_duration", 0) / 1e9
+        if load_duration >= COLD_LOAD_SECONDS:
+            self.load_seconds[model] = load_duration
+        log.info("loaded model=%s seconds=%.2f keep_alive=%s", model, load_duration, keep_alive)
+
+    async def preload(self):
+        # One at a time, so two models don't compete for VRAM while loading
+        for model in self.models:
+            await self.load(model)
+
+    async def _run(self):
+        await self.preload()
+        was_quiet = self.quiet()
+        while True:
+            await asyncio.sleep(self.check_interval)
+            now = self.clock()
+            if self.quiet():
+                for model in list(self._loaded):
+                    if now - self._last_use.get(model, 0.0) > self.quiet_idle:
+                        await self.load(model, keep_alive=0)
+                self._pinned = None
+                was_quiet = True
+                continue
+            if was_quiet:
+                # Quiet hours just ended: be loaded before the first request
+                await self.preload()
+                was_quiet = False
+            hot = self.hot_model() if self.pin_hot else None
+            if hot != self._pinned:
+                if hot is not None:
+                    await self.load(hot, keep_alive=-1)
+                if self._pinned is not None:
+                    # No longer the busiest: back to a keep_alive that expires
+                    await self.load(self._pinned)
+                self._pinned = hot
+
+    def snapshot(self):
+        return {command: dict(entry) for command, entry in self.commands.items()}
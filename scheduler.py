@@ -0,0 +1,223 @@
+import asyncio
+import contextlib
+import contextvars
+import os
+import time
+from collections import OrderedDict, deque
+
+import metrics
+
+# =================================================================================
+#                   REQUEST SCHEDULER IN FRONT OF THE LLM SERVER
+# =================================================================================
+# Every model call waits here for one of MAX_IN_FLIGHT slots. Waiting work is
+# queued per guild and per user and served round-robin, so one busy guild or
+# one user spamming !ask can't starve everyone else. Short prompts go first
+# (with a cap so long ones still get through), users are told their place in
+# the queue, and work whose Discord reply can no longer be delivered is
+# dropped instead of generated.
+#
+# Commands describe who is asking with track_command(ctx) or
+# track_interaction(interaction). That is stored in a context variable, so
+# every model call made while handling that command (map-reduce chunks too)
+# is attributed to it without passing it through each function.
+
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+# Prompts up to this many (estimated) tokens count as short
+SHORT_PROMPT_TOKENS = 200
+# After this many short jobs in a row, let a waiting long job through
+MAX_SHORT_STREAK = 3
+# Interaction tokens are valid for 15 minutes; stop a bit before that
+INTERACTION_TTL = 15 * 60 - 30
+# Nobody wants an answer to a prefix command from ten minutes ago
+COMMAND_TTL = 10 * 60
+
+SHORT, LONG = 0, 1
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed while it was waiting in the queue."""
+
+    def __init__(self, message="the request expired while waiting for the model"):
+        super().__init__(message)
+
+
+class RequestInfo:
+    def __init__(self, guild_id=None, user_id=None, deadline=None, on_position=None, command=None):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.command = command  # for per-command generation stats
+        self.deadline = deadline  # time.time() after which the work is useless
+        self.on_position = on_position  # async callback(position) while queued
+        self.notified = False
+        self.timings = {}  # queued / generating / first_token seconds, summed over the command's model calls
+
+    def expired(self):
+        return self.deadline is not None and time.time() > self.deadline
+
+    def add_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def track_command(ctx):
+    """Attributes the model calls of a prefix command to its guild and author."""
+    async def on_position(position):
+        await ctx.send(f"⏳ The model is busy, you're #{position} in the queue.")
+
+    current_request.set(RequestInfo(
+        guild_id=ctx.guild.id if ctx.guild else None,
+        user_id=ctx.author.id,
+        deadline=ctx.message.created_at.timestamp() + COMMAND_TTL,
+        on_position=on_position,
+        command=ctx.command.qualified_name if ctx.command else None,
+    ))
+
+
+def track_interaction(interaction):
+    """Same as track_command for slash commands (call after deferring)."""
+    async def on_position(position):
+        await interaction.followup.send(f"⏳ The model is busy, you're #{position} in the queue.", ephemeral=True)
+
+    current_request.set(RequestInfo(
+        guild_id=interaction.guild_id,
+        user_id=interaction.user.id,
+        deadline=interaction.created_at.timestamp() + INTERACTION_TTL,
+        on_position=on_position,
+        command=interaction.command.qualified_name if interaction.command else None,
+    ))
+
+
+class _Job:
+    def __init__(self, request, future):
+        self.request = request
+        self.future = future
+
+
+class LLMScheduler:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiting = 0
+        # One queue per tier: guild -> user -> jobs, both levels in round-robin order
+        self._tiers = (OrderedDict(), OrderedDict())
+        self._short_streak = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, prompt=""):
+        """Holds one of the in-flight slots for the duration of a model call."""
+        await self._acquire(len(prompt) // 4)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    async def _acquire(self, prompt_tokens):
+        request = current_request.get() or RequestInfo()
+        if request.expired():
+            raise DeadlineExceeded()
+        if self.in_flight < self.max_in_flight and self.waiting == 0:
+            self.in_flight += 1
+            metrics.LLM_QUEUE_SECONDS.observe(0.0, command=request.command or "other")
+            return
+        began = time.perf_counter()
+        try:
+            await self._wait(request, prompt_tokens)
+        finally:
+            waited = time.perf_counter() - began
+            metrics.LLM_QUEUE_SECONDS.observe(waited, command=request.command or "other")
+            request.add_timing("queued", waited)
+
+    async def _wait(self, request, prompt_tokens):
+        job = _Job(request, asyncio.get_running_loop().create_future())
+        tier = self._tiers[SHORT if prompt_tokens <= SHORT_PROMPT_TOKENS else LONG]
+        users = tier.setdefault(request.guild_id, OrderedDict())
+        users.setdefault(request.user_id, deque()).append(job)
+        self.waiting += 1
+
+        try:
+            if request.on_position is not None and not request.notified:
+                request.notified = True
+                with contextlib.suppress(Exception):
+                    await request.on_position(self._position(job))
+            await job.future
+        except asyncio.CancelledError:
+            if not job.future.done():
+                # Cancelled while telling the user their place: _dispatch skips cancelled jobs
+                job.future.cancel()
+            elif not job.future.cancelled():
+                # Granted a slot just as we were cancelled; hand it back
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+
+    def _next_job(self):
+        job, self._short_streak = _take_next(self._tiers, self._short_streak)
+        if job is not None:
+            self.waiting -= 1
+        return job
+
+    def _position(self, job):
+        """job's place in the queue (1 = next to get a slot), in the order _dispatch will serve it."""
+        tiers = tuple(
+            OrderedDict((guild_id, OrderedDict((user_id, deque(jobs)) for user_id, jobs in users.items()))
+                        for guild_id, users in tier.items())
+            for tier in self._tiers
+        )
+        short_streak = self._short_streak
+        position = 1
+        while True:
+            ahead, short_streak = _take_next(tiers, short_streak)
+            if ahead is job or ahead is None:
+                return position
+            if not ahead.future.done() and not ahead.request.expired():
+                position += 1  # Cancelled and expired jobs are skipped, not served
+
+    def _dispatch(self):
+        while self.in_flight < self.max_in_flight:
+            job = self._next_job()
+            if job is None:
+                return
+            if job.future.done():
+                continue  # Caller gave up while waiting
+            if job.request.expired():
+                job.future.set_exception(DeadlineExceeded())
+                continue
+            self.in_flight += 1
+            job.future.set_result(None)
+
+
+def _take_next(tiers, short_streak):
+    """
+    Removes the job to serve next from tiers (short, long): round-robin by
+    guild, then by user, short prompts first up to MAX_SHORT_STREAK in a
+    row. Returns it (None when empty) and the new short streak.
+    """
+    short, long = tiers
+    if short and (not long or short_streak < MAX_SHORT_STREAK):
+        tier = short
+        short_streak += 1
+    elif long:
+        tier = long
+        short_streak = 0
+    else:
+        return None, short_streak
+
+    guild_id, users = tier.popitem(last=False)
+    user_id, jobs = users.popitem(last=False)
+    job = jobs.popleft()
+    if jobs:
+        users[user_id] = jobs  # Back of this guild's line
+    if users:
+        tier[guild_id] = users  # Back of the guild line
+    return job, short_streak
+
+
+# Shared by every model call in the process
+llm_scheduler = LLMScheduler()
+
+metrics.Gauge("llm_queue_depth", "Model calls waiting for a local slot", fn=lambda: llm_scheduler.waiting)
+metrics.Gauge("llm_in_flight", "Local model calls running", fn=lambda: llm_scheduler.in_flight)
@@ -0,0 +1,201 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+import metrics
+
+# =================================================================================
+#                   ASYNC YOUTUBE SHORTS DOWNLOADS
+# =================================================================================
+# Used by the on_message listener of cogs/shorts.py. yt-dlp runs as
+# an asyncio subprocess so the bot keeps answering while it works, every
+# download gets its own temporary directory (no os.chdir, no guessing which
+# file in a shared folder is ours), at most DOWNLOAD_WORKERS run at once and
+# a download that takes longer than DOWNLOAD_TIMEOUT is killed.
+#
+# Before downloading, the video's formats are probed (yt-dlp -J) and the best
+# one that fits under Discord's upload limit is picked, so an oversized Short
+# is refused without transferring a byte of it.
+
+YT_DLP = os.getenv("YT_DLP_PATH", "/root/ytshortsbot/venv/bin/yt-dlp")
+# Temporary job directories are created under here
+WORK_DIR = os.getenv("SHORTS_WORK_DIR", "/root/ytshortsbot/FileCache/")
+DOWNLOAD_WORKERS = int(os.getenv("SHORTS_DOWNLOAD_WORKERS", "2"))
+DOWNLOAD_TIMEOUT = 120  # seconds
+# Discord's upload limit without boosts
+UPLOAD_LIMIT = 25 * 1024 * 1024
+# Probe results kept per video id
+PROBE_CACHE_SIZE = 512
+
+# Compiled once; on_message runs this against every message the bot can see
+SHORTS_URL = re.compile(
+    r"(?:https?://)?(?:www\.|m\.)?(?:youtube\.com/shorts/|youtu\.be/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])",
+    re.IGNORECASE,
+)
+CANONICAL_URL = "https://www.youtube.com/shorts/{}"
+
+
+class DownloadError(Exception):
+    """yt-dlp failed, timed out or produced no file."""
+
+
+class VideoTooLarge(Exception):
+    """No format of the video fits under the upload limit."""
+
+
+def find_shorts(text):
+    """
+    Returns (video_id, canonical url) for each distinct youtube.com/shorts or
+    youtu.be link in text, in order. Ordinary chat is rejected with a
+    substring check before the regex runs.
+    """
+    # Every link SHORTS_URL can match contains one of these, and a substring
+    # test is far cheaper than the case-insensitive regex on long messages
+    lowered = text.lower()
+    if "/shorts/" not in lowered and "youtu.be/" not in lowered:
+        return []
+    found = {}
+    for match in SHORTS_URL.finditer(text):
+        found.setdefault(match.group(1), CANONICAL_URL.format(match.group(1)))
+    return list(found.items())
+
+
+class ShortsDownloader:
+    def __init__(self, workers=DOWNLOAD_WORKERS, timeout=DOWNLOAD_TIMEOUT, work_dir=WORK_DIR, yt_dlp=YT_DLP):
+        self.timeout = timeout
+        self.work_dir = work_dir
+        self.yt_dlp = yt_dlp
+        self._workers = asyncio.Semaphore(workers)
+        self._probes = OrderedDict()  # video id -> (format spec, estimated bytes), oldest first
+
+    async def probe(self, video_id, url, limit=UPLOAD_LIMIT):
+        """
+        Returns (format spec, estimated bytes) for the best format of url that
+        fits in limit, or raises VideoTooLarge. Results are cached per video id.
+        The spec is None when yt-dlp reports no sizes at all.
+        """
+        choice = self._probes.get(video_id)
+        if choice is None:
+            async with self._workers:
+                output = await self._timed_run("probe", ["-J", "--no-playlist", url])
+            try:
+                info = json.loads(output)
+            except ValueError:
+                raise DownloadError("yt-dlp returned unreadable metadata")
+            choice = choose_format(info.get("formats") or [], info.get("duration"), limit)
+            self._probes[video_id] = choice
+            while len(self._probes) > PROBE_CACHE_SIZE:
+                self._probes.popitem(last=False)
+        self._probes.move_to_end(video_id)
+        if choice[0] is None and choice[1] is not None:
+            raise VideoTooLarge(f"smallest format is about {choice[1] // (1024 * 1024)}MB")
+        return choice
+
+    @contextlib.asynccontextmanager
+    async def download(self, url, format_spec=None):
+        """
+        Downloads url (in format_spec, if given) and yields the path of the
+        video file. The file and its job directory are deleted when the block
+        exits.
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        job_dir = tempfile.mkdtemp(prefix="short-", dir=self.work_dir)
+        args = ["--no-playlist", "-o", os.path.join(job_dir, "%(id)s.%(ext)s")]
+        if format_spec:
+            args += ["-f", format_spec]
+        try:
+            async with self._workers:
+                await self._timed_run("download", args + [url])
+            yield self._downloaded_file(job_dir)
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    async def _timed_run(self, step, args):
+        began = time.perf_counter()
+        status = "error"
+        try:
+            output = await self._run(args)
+            status = "ok"
+            return output
+        finally:
+            metrics.DOWNLOAD_SECONDS.observe(time.perf_counter() - began, step=step, status=status)
+
+    async def _run(self, args):
+        """Runs yt-dlp with args and returns its stdout."""
+        process = await asyncio.create_subprocess_exec(
+            self.yt_dlp, *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            raise DownloadError(f"yt-dlp took longer than {self.timeout}s")
+        finally:
+            if process.returncode is None:
+                # Timed out or cancelled: don't leave yt-dlp running
+                process.kill()
+                await process.wait()
+        if process.returncode != 0:
+            raise DownloadError(stderr.decode(errors="replace").strip() or f"yt-dlp exited with {process.returncode}")
+        return stdout.decode(errors="replace")
+
+    @staticmethod
+    def _downloaded_file(job_dir):
+        files = [name for name in os.listdir(job_dir) if not name.endswith((".part", ".ytdl"))]
+        if not files:
+            raise DownloadError("yt-dlp produced no file")
+        return os.path.join(job_dir, files[0])
+
+
+def format_size(fmt, duration):
+    """Bytes of one yt-dlp format: exact if known, else estimated from its bitrate."""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return size
+    if fmt.get("tbr") and duration:
+        return int(fmt["tbr"] * 1000 / 8 * duration)
+    return None
+
+
+def choose_format(formats, duration=None, limit=UPLOAD_LIMIT):
+    """
+    Picks the highest quality single file or video+audio pair whose size fits
+    in limit. Returns (format spec, estimated bytes), or (None, smallest
+    estimated bytes) if nothing fits. Formats of unknown size are skipped; if
+    no size is known at all, returns (None, None) and the caller has to check
+    the downloaded file instead.
+    """
+    combined, video, audio = [], [], []
+    for fmt in formats:
+        size = format_size(fmt, duration)
+        if size is None:
+            continue
+        has_video = fmt.get("vcodec", "none") != "none"
+        has_audio = fmt.get("acodec", "none") != "none"
+        quality = (fmt.get("height") or 0, fmt.get("tbr") or 0)
+        entry = (quality, size, fmt["format_id"])
+        if has_video and has_audio:
+            combined.append(entry)
+        elif has_video:
+            video.append(entry)
+        elif has_audio:
+            audio.append(entry)
+
+    candidates = list(combined)
+    for v_quality, v_size, v_id in video:
+        for a_quality, a_size, a_id in audio:
+            # Ties on video quality go to the better audio
+            candidates.append(((v_quality[0], v_quality[1] + a_quality[1]), v_size + a_size, f"{v_id}+{a_id}"))
+
+    fitting = [candidate for candidate in candidates if candidate[1] <= limit]
+    if fitting:
+        _, size, spec = max(fitting)
+        return spec, size
+    return None, min((candidate[1] for candidate in candidates), default=None)
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# =================================================================================
+#                       SHARED ASYNC SQLITE STORAGE LAYER
+# =================================================================================
+# sqlite3 calls block, so running them from command handlers stalls the whole
+# event loop. Here every query runs on a worker thread instead:
+#   * one writer thread owns the only writing connection. Writes from many
+#     interactions are queued and group-committed in a single transaction,
+#     so a burst of /register calls costs one fsync instead of one each.
+#   * a few reader threads with their own connections. In WAL mode they read
+#     a consistent snapshot and never wait on the writer.
+# The sqlite3 module keeps a per-connection statement cache, so passing the
+# same SQL strings (module constants in the bots) reuses prepared statements.
+
+# Max number of queued write jobs folded into one transaction
+MAX_BATCH = 256
+
+
+class AsyncDatabase:
+    """
+    SQLite database usable from async code. Writes are lists of (sql, params)
+    pairs applied atomically; a list of parameter tuples runs executemany.
+    """
+
+    def __init__(self, path, readers=2, schema=()):
+        self.path = path
+        self.name = os.path.basename(path)  # metrics label
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="sqlite-reader")
+        self._local = threading.local()
+        self._queue = None
+        self._writer_task = None
+
+        # The writer connection is only ever used from the writer thread
+        # once the bot is running; schema setup happens before that.
+        self._write_conn = self._connect()
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        for statement in schema:
+            self._write_conn.execute(statement)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, skips an fsync per commit
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # -------------------------------
+    # Reads
+    # -------------------------------
+    def _reader_conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    async def fetchall(self, sql, params=()):
+        loop = asyncio.get_running_loop()
+        with metrics.timer(metrics.SQLITE_SECONDS, db=self.name, op="read"):
+            return await loop.run_in_executor(
+                self._readers, lambda: self._reader_conn().execute(sql, params).fetchall()
+            )
+
+    async def fetchone(self, sql, params=()):
+        loop = asyncio.get_running_loop()
+        with metrics.timer(metrics.SQLITE_SECONDS, db=self.name, op="read"):
+            return await loop.run_in_executor(
+                self._readers, lambda: self._reader_conn().execute(sql, params).fetchone()
+            )
+
+    # -------------------------------
+    # Writes
+    # -------------------------------
+    async def write(self, statements):
+        """
+        Queues statements as one atomic job and waits until the transaction
+        holding it has committed. Raises if this job's statements failed;
+        other jobs in the same batch are unaffected.
+        """
+        if self._writer_task is None:
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.get_running_loop().create_task(self._write_loop())
+        future = asyncio.get_running_loop().create_future()
+        with metrics.timer(metrics.SQLITE_SECONDS, db=self.name, op="write"):
+            await self._queue.put((list(statements), future))
+            return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Group commit: everything that queued up meanwhile rides along
+            while len(batch) < MAX_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._writer, self._commit_batch, [job for job, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _commit_batch(self, jobs):
+        conn = self._write_conn
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statements in jobs:
+                # A savepoint per job so one bad interaction can't sink the batch
+                conn.execute("SAVEPOINT job")
+                try:
+                    rowcount = 0
+                    for sql, params in statements:
+                        if isinstance(params, list):
+                            rowcount += conn.executemany(sql, params).rowcount
+                        else:
+                            rowcount += conn.execute(sql, params).rowcount
+                    conn.execute("RELEASE job")
+                    results.append(rowcount)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append(e)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return results
+
+    async def close(self):
+        if self._writer_task is not None:
+            # An empty job commits after everything queued before it
+            await self.write([])
+            self._writer_task.cancel()
+        self._writer.submit(self._write_conn.close).result()
+        self._writer.shutdown()
+        self._readers.shutdown()
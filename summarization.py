@@ -0,0 +1,109 @@
+import asyncio
+
+# =================================================================================
+#                   LONG-INPUT AND INCREMENTAL SUMMARIZATION
+# =================================================================================
+# Helpers that only build prompts and combine results. The actual model call
+# is passed in as `complete`, an async function taking a prompt and returning
+# the answer text with any <think> reasoning already removed, so the same code
+# works for the local Ollama bots and the OpenRouter one.
+#
+# Long inputs are never cut off: they are split on paragraph / line /
+# sentence / word boundaries into chunks that fit the model's context, the
+# chunks are summarized in parallel (map), and the partial summaries are
+# joined and, if still too long, reduced again before the final prompt.
+
+# deepseek-r1 on Ollama defaults to a 2048-token window. Leave room for the
+# instructions and the answer.
+CONTEXT_TOKEN_BUDGET = 1000
+# English averages about four characters per token
+CHARS_PER_TOKEN = 4
+# Chunk summaries in flight at once per request (llm_backend still caps the
+# total against the Ollama server)
+MAP_CONCURRENCY = 4
+# Stop reducing after this many rounds even if the model keeps rambling
+MAX_REDUCE_ROUNDS = 4
+
+# Preferred places to split, best first
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+MAP_PROMPT = "Summarize this part of a longer text, keeping its key points:\n\n{text}"
+
+OPINIONS_PROMPT = "For user {username}, summarize their opinions in 20 words or less: {thoughts}"
+FOLD_PROMPT = (
+    "For user {username}, this is a summary of their opinions so far: {summary}\n\n"
+    "They have since shared these new thoughts:\n{thoughts}\n\n"
+    "Update the summary of their opinions in 20 words or less."
+)
+OPINIONS_MAP_PROMPT = "Summarize the opinions of user {username} expressed in these notes in a few sentences:\n{text}"
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_text(text, max_tokens=CONTEXT_TOKEN_BUDGET, separators=SEPARATORS):
+    """
+    Splits text into chunks of at most max_tokens, cutting at the coarsest
+    boundary that works: paragraphs, then lines, sentences and words.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if not separators:
+        # The longest piece estimate_tokens still counts as max_tokens
+        size = max_tokens * CHARS_PER_TOKEN - 1
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    separator, finer = separators[0], separators[1:]
+    chunks = []
+    current = ""
+    for piece in text.split(separator):
+        candidate = current + separator + piece if current else piece
+        if estimate_tokens(candidate) <= max_tokens:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        if estimate_tokens(piece) > max_tokens:
+            chunks.extend(split_text(piece, max_tokens, finer))
+            current = ""
+        else:
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def condense(complete, text, map_prompt=MAP_PROMPT, budget=CONTEXT_TOKEN_BUDGET, concurrency=MAP_CONCURRENCY, **fields):
+    """
+    Returns text unchanged if it fits in budget tokens, otherwise a
+    map-reduced version of it that does. map_prompt has a {text} placeholder
+    plus any extra **fields.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize_chunk(chunk):
+        async with semaphore:
+            return await complete(map_prompt.format(text=chunk, **fields))
+
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if estimate_tokens(text) <= budget:
+            return text
+        partials = await asyncio.gather(*(summarize_chunk(chunk) for chunk in split_text(text, budget)))
+        text = "\n\n".join(partials)
+    return text[:budget * CHARS_PER_TOKEN]
+
+
+async def fold_summary(complete, username, previous_summary, new_thoughts, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Returns an updated summary of a user's opinions. Only the thoughts saved
+    since previous_summary was made are sent; if even those don't fit in the
+    context window they are first reduced hierarchically.
+    """
+    lines = "\n".join(f"user {username}: {thought}" for thought in new_thoughts)
+    thoughts = await condense(complete, lines, OPINIONS_MAP_PROMPT, budget, username=username)
+    if previous_summary:
+        prompt = FOLD_PROMPT.format(username=username, summary=previous_summary, thoughts=thoughts)
+    else:
+        prompt = OPINIONS_PROMPT.format(username=username, thoughts=thoughts)
+    return await complete(prompt)
@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from availability import AvailabilityIndex
+from cogs import scheduling
+
+
+def index_with(users):
+    index = AvailabilityIndex(quorum=1.0)
+    for user_id, (start, end) in users.items():
+        index.set_user(user_id, "CS")
+        index.set_interval(user_id, "Monday", start, end)
+    return index
+
+
+def test_restore_user_undoes_an_interval_change():
+    index = index_with({"a": (540, 720), "b": (600, 780)})
+    saved = index.snapshot_user("a")
+
+    index.set_interval("a", "Monday", 0, 60)
+    assert index.slots["Monday"] == []
+    index.restore_user(saved)
+
+    assert index.slots["Monday"] == [(600, 720)]
+    assert index.query(quorum=1.0) == {"Monday": [(600, 720)]}
+
+
+def test_restore_user_removes_a_user_who_was_not_registered():
+    index = index_with({"a": (540, 720), "b": (600, 780), "c": (660, 840)})
+    saved = index.snapshot_user("new")
+
+    index.set_user("new", "Math")
+    index.set_interval("new", "Monday", 0, 60)
+    index.restore_user(saved)
+
+    assert index.total_users == 3
+    assert sorted(index.rows.values()) == [0, 1, 2]
+    assert index.slots["Monday"] == [(660, 720)]
+    # The row that moved into the hole kept its intervals
+    index.set_interval("c", "Monday", 540, 840)
+    assert index.slots["Monday"] == [(600, 720)]
+
+
+def test_diff_slots_brings_stored_rows_in_line():
+    index = index_with({"a": (540, 720), "b": (600, 780)})
+    stored = [("Monday", "09:00", "12:00"), ("Tuesday", "10:00", "11:00")]
+
+    assert index.diff_slots(stored) == {
+        "Monday": ([(540, 720)], [(600, 720)]),
+        "Tuesday": ([(600, 660)], []),
+    }
+    assert index.diff_slots([("Monday", "10:00", "12:00")]) == {}
+
+
+def test_failed_write_leaves_index_and_tables_in_sync(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cog = scheduling.Scheduling(None)
+    cog.db._write_conn.execute(
+        "CREATE TRIGGER reject BEFORE INSERT ON availability WHEN NEW.start_time = '23:00' "
+        "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+    )
+
+    async def scenario():
+        await cog.cog_load()
+        for user_id, end in (("a", "12:00"), ("b", "13:00")):
+            await cog.write_user(user_id, [(scheduling.UPSERT_AVAILABILITY, (user_id, "Monday", "10:00", end))],
+                                 lambda user_id=user_id: cog.availability.set_user(user_id, "CS"))
+            await cog.write_user(user_id, [(scheduling.UPSERT_AVAILABILITY, (user_id, "Monday", "10:00", end))],
+                                 lambda user_id=user_id, end=end: cog.availability.set_interval(
+                                     user_id, "Monday", 600, scheduling.time_to_minutes(end)))
+        before = await cog.db.fetchall(scheduling.SELECT_COMMON_SLOTS)
+
+        with pytest.raises(sqlite3.IntegrityError):
+            await cog.write_user("a", [(scheduling.UPSERT_AVAILABILITY, ("a", "Monday", "23:00", "23:30"))],
+                                 lambda: cog.availability.set_interval("a", "Monday", 1380, 1410))
+
+        after = await cog.db.fetchall(scheduling.SELECT_COMMON_SLOTS)
+        await cog.db.close()
+        return before, after
+
+    before, after = asyncio.run(scenario())
+
+    assert cog.availability.slots["Monday"] == [(600, 720)]
+    assert before == after
+    assert cog.availability.diff_slots(after) == {}
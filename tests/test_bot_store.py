@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+
+from bot_store import SELECT_THOUGHT_AUTHOR, SELECT_THOUGHTS_SINCE, BotStore, import_legacy_files
+
+
+def test_thoughts_and_summaries_are_kept_per_guild(tmp_path):
+    store = BotStore(str(tmp_path / "store.db"))
+
+    async def scenario():
+        await store.add_thought("g1", "u1", "sam", "reviews are slow")
+        await store.add_thought("g2", "u2", "sam", "standups are too long")
+        await store.add_thought("g1", "u1", "sam", "tests help")
+        await store.save_opinion_summary("g1", "u1", "Wants faster reviews.", 1)
+
+        author = await store.thought_author("g1", "sam")
+        elsewhere = await store.thought_author("g3", "sam")
+        g1 = await store.thoughts_since("g1", "u1", "sam")
+        g2 = await store.thoughts_since("g2", "u2", "sam")
+        summaries = (await store.opinion_summary("g1", "u1"), await store.opinion_summary("g2", "u2"))
+        await store.db.close()
+        return author, elsewhere, g1, g2, summaries
+
+    author, elsewhere, g1, g2, summaries = asyncio.run(scenario())
+
+    assert author == (True, "u1")
+    assert elsewhere == (False, None)
+    assert [thought for _, thought in g1] == ["reviews are slow", "tests help"]
+    assert [thought for _, thought in g2] == ["standups are too long"]
+    assert summaries == (("Wants faster reviews.", 1), None)
+
+
+def test_imported_thoughts_count_for_the_member_with_that_name(tmp_path):
+    path = str(tmp_path / "store.db")
+    legacy = tmp_path / "thoughts.txt"
+    legacy.write_text("user sam: from the old bot\nuser kim: someone else\n")
+    import_legacy_files(path, groups_file=str(tmp_path / "missing.txt"), thoughts_file=str(legacy))
+    store = BotStore(path)
+
+    async def scenario():
+        only_imported = await store.thought_author("g1", "sam")
+        await store.add_thought("g1", "u1", "sam", "new thought")
+        author = await store.thought_author("g1", "sam")
+        thoughts = await store.thoughts_since("g1", "u1", "sam")
+        await store.db.close()
+        return only_imported, author, thoughts
+
+    only_imported, author, thoughts = asyncio.run(scenario())
+
+    assert only_imported == (True, None)
+    assert author == (True, "u1")
+    assert [thought for _, thought in thoughts] == ["from the old bot", "new thought"]
+
+
+def test_thought_lookups_use_the_guild_indexes(tmp_path):
+    path = str(tmp_path / "store.db")
+    BotStore(path)
+    conn = sqlite3.connect(path)
+
+    for sql, params in ((SELECT_THOUGHT_AUTHOR, ("g1", "sam", "sam")), (SELECT_THOUGHTS_SINCE, ("g1", "u1", "sam", 0))):
+        plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        assert "SCAN thoughts" not in plan, plan
+    conn.close()
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from conversations import Conversations
+
+
+def message(channel_id, author_id, content=""):
+    return SimpleNamespace(channel=SimpleNamespace(id=channel_id), author=SimpleNamespace(id=author_id), content=content)
+
+
+def test_feed_hands_the_authors_next_message_in_that_channel_to_the_prompt():
+    conversations = Conversations()
+
+    async def scenario():
+        waiting = asyncio.create_task(conversations.wait_for_reply(1, 7))
+        await asyncio.sleep(0)
+        fed = [
+            conversations.feed(message(1, 8, "someone else")),
+            conversations.feed(message(2, 7, "another channel")),
+            conversations.feed(message(1, 7, "the text")),
+            conversations.feed(message(1, 7, "a later command")),
+        ]
+        return fed, await waiting
+
+    fed, reply = asyncio.run(scenario())
+
+    assert fed == [False, False, True, False]
+    assert reply.content == "the text"
+    assert len(conversations) == 0
+
+
+def test_every_open_prompt_of_the_author_gets_the_reply():
+    conversations = Conversations()
+
+    async def scenario():
+        waiting = [asyncio.create_task(conversations.wait_for_reply(1, 7)) for _ in range(2)]
+        await asyncio.sleep(0)
+        open_prompts = len(conversations)
+        conversations.feed(message(1, 7, "the text"))
+        return open_prompts, await asyncio.gather(*waiting)
+
+    open_prompts, replies = asyncio.run(scenario())
+
+    assert open_prompts == 2
+    assert [reply.content for reply in replies] == ["the text", "the text"]
+
+
+def test_expired_and_cancelled_prompts_are_forgotten():
+    conversations = Conversations()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await conversations.wait_for_reply(1, 7, timeout=0.01)
+        after_timeout = len(conversations)
+
+        cancelled = asyncio.create_task(conversations.wait_for_reply(1, 8))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return after_timeout, len(conversations), conversations.feed(message(1, 7)), conversations.feed(message(1, 8))
+
+    after_timeout, after_cancel, fed_7, fed_8 = asyncio.run(scenario())
+
+    assert (after_timeout, after_cancel) == (0, 0)
+    # A message after the prompt expired is an ordinary message again
+    assert (fed_7, fed_8) == (False, False)
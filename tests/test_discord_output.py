@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+import discord_output
+from discord_output import DISCORD_MESSAGE_LIMIT, EMBED_DESCRIPTION_LIMIT
+
+
+class Message:
+    def __init__(self, **kwargs):
+        self.states = [kwargs]
+
+    async def edit(self, **kwargs):
+        self.states.append(dict(self.states[-1], **kwargs))
+
+
+class Channel:
+    """A ctx stand-in: records the messages sent, each with its edits."""
+
+    def __init__(self, author_id=7):
+        self.author = SimpleNamespace(id=author_id)
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        message = Message(content=content, **kwargs)
+        self.messages.append(message)
+        return message
+
+
+async def words(text, size=50):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def stream(text, prefix=""):
+    channel = Channel()
+
+    async def run():
+        returned = await discord_output.stream_to_discord(channel, words(text), prefix=prefix, edit_every_tokens=1)
+        return returned, channel
+
+    return asyncio.run(run())
+
+
+def test_a_short_stream_stays_one_plain_message():
+    returned, channel = stream("A short answer.", prefix="**Review:**\n")
+
+    assert returned == "A short answer."
+    assert len(channel.messages) == 1
+    assert channel.messages[0].states[-1]["content"] == "**Review:**\nA short answer."
+
+
+def test_a_long_stream_becomes_pages_of_the_same_message():
+    text = "".join(f"Line {n} of a long answer.\n" for n in range(600))  # About 15000 characters
+
+    returned, channel = stream(text, prefix="**Summary:**\n")
+
+    assert returned == text.strip()
+    assert len(channel.messages) == 1
+    final = channel.messages[0].states[-1]
+    pages = discord_output.chunks("**Summary:**\n" + text, EMBED_DESCRIPTION_LIMIT)
+    assert final["content"] is None
+    assert final["embed"].description == pages[0]
+    assert final["view"].page_count == len(pages) > 1
+    assert final["view"].author_id == 7
+    assert final["view"].message is channel.messages[0]
+
+
+def test_a_stream_between_the_two_limits_is_one_embed_without_buttons():
+    text = "word " * ((DISCORD_MESSAGE_LIMIT + 500) // 5)
+
+    _, channel = stream(text)
+
+    final = channel.messages[0].states[-1]
+    assert len(channel.messages) == 1
+    assert final["embed"].description == text
+    assert final["view"] is None
+
+
+def test_cut_text_prefers_paragraphs_and_keeps_short_text_whole():
+    text = "First paragraph.\n\nSecond paragraph that goes on."
+
+    assert discord_output.cut_text(text, 100) == (text, "")
+    assert discord_output.cut_text(text, 30) == ("First paragraph.\n\n", "Second paragraph that goes on.")
+
+
+def test_cut_text_closes_and_reopens_a_code_block():
+    text = "Here:\n```py\n" + "".join(f"print({n})\n" for n in range(50)) + "```\nDone."
+
+    head, rest = discord_output.cut_text(text, 200)
+
+    assert len(head) <= 200
+    assert head.endswith("\n```")
+    assert rest.startswith("```py\n")
+    assert discord_output.open_fence(head) is None
+
+
+def test_chunks_fit_both_limits_without_losing_text():
+    text = "".join(f"Paragraph {n}: " + "word " * (n % 40) + "\n\n" for n in range(400))
+
+    for limit in (DISCORD_MESSAGE_LIMIT, EMBED_DESCRIPTION_LIMIT):
+        pieces = discord_output.chunks(text, limit)
+        assert len(pieces) > 1
+        assert all(len(piece) <= limit for piece in pieces)
+        assert "".join(pieces) == text
+
+
+def test_chunks_keep_every_piece_of_a_long_code_block_renderable():
+    text = "```python\n" + "x = 1\n" * 1000 + "```"
+
+    pieces = discord_output.chunks(text, DISCORD_MESSAGE_LIMIT)
+
+    assert len(pieces) > 1
+    for piece in pieces:
+        assert len(piece) <= DISCORD_MESSAGE_LIMIT
+        assert piece.startswith("```python\n") and piece.rstrip().endswith("```")
+
+
+class Interaction:
+    def __init__(self, user_id):
+        self.user = SimpleNamespace(id=user_id)
+        self.edits = []
+        self.sent = []
+        self.response = SimpleNamespace(edit_message=self.edit_message, send_message=self.send_message)
+
+    async def edit_message(self, **kwargs):
+        self.edits.append(kwargs)
+
+    async def send_message(self, content, **kwargs):
+        self.sent.append(content)
+
+
+def test_pages_turn_render_each_page_once_and_only_for_the_author():
+    rendered = []
+
+    def render(index):
+        rendered.append(index)
+        return discord.Embed(description=f"page {index + 1}")
+
+    async def scenario():
+        view = discord_output.Pages(3, render, author_id=7)
+        states = [(view.counter.label, view.previous.disabled, view.next.disabled)]
+        author = Interaction(7)
+        for button in (view.next, view.next, view.first, view.last):
+            await button.callback(author)
+            states.append((view.counter.label, view.previous.disabled, view.next.disabled))
+        allowed = await view.interaction_check(author), await view.interaction_check(Interaction(8))
+        return states, author, allowed
+
+    states, author, allowed = asyncio.run(scenario())
+
+    assert states == [("1/3", True, False), ("2/3", False, False), ("3/3", False, True),
+                      ("1/3", True, False), ("3/3", False, True)]
+    assert [edit["embed"].description for edit in author.edits] == ["page 2", "page 3", "page 1", "page 3"]
+    assert sorted(rendered) == [0, 1, 2]
+    assert allowed == (True, False)
+
+
+def test_send_text_pages_only_what_does_not_fit_one_message():
+    async def scenario(text):
+        channel = Channel()
+        await discord_output.send_text(channel, text)
+        return channel.messages[0].states[0]
+
+    short = asyncio.run(scenario("x" * DISCORD_MESSAGE_LIMIT))
+    long = asyncio.run(scenario("word " * 2000))
+
+    assert short["content"] == "x" * DISCORD_MESSAGE_LIMIT
+    assert long["content"] is None
+    assert long["view"].page_count == 3
+    assert long["view"].message is not None
@@ -0,0 +1,149 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+
+import http_client
+from http_client import BACKOFF_BASE, BackendUnavailable, CircuitBreaker, HTTPBackend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_the_breaker_opens_after_the_threshold_and_half_opens_after_the_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_in() == 30
+
+    clock.now += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # One trial at a time
+
+    breaker.record_failure()  # The trial failed: open for another reset_timeout
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_a_trial_that_never_reports_back_stops_blocking_the_next_one(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.allow()  # Its caller is then cancelled
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+class Response:
+    def __init__(self, status, headers=None, body=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+    async def json(self, content_type=None):
+        return self.body
+
+
+class Session:
+    """Answers each post with the next of responses (an exception is raised instead)."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = 0
+
+    async def post(self, url, **kwargs):
+        self.posts += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", sleep)  # Nothing else in these tests sleeps
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)  # The longest jittered wait
+    return sleeps
+
+
+def call(monkeypatch, responses, max_retries=3):
+    session = Session(responses)
+    monkeypatch.setattr(http_client, "get_session", lambda: session)
+    backend = HTTPBackend("Stub", "localhost:1", total_timeout=5, max_retries=max_retries)
+
+    async def run():
+        try:
+            return await backend.post_json("/api", {}), None
+        except BackendUnavailable as e:
+            return None, e
+
+    result, error = asyncio.run(run())
+    return result, error, session, backend.breaker
+
+
+def test_server_errors_are_retried_with_exponential_backoff(monkeypatch, sleeps):
+    result, error, session, breaker = call(monkeypatch, [Response(503), Response(502), Response(200, body={"ok": 1})])
+
+    assert result == {"ok": 1} and error is None
+    assert session.posts == 3
+    assert sleeps == [BACKOFF_BASE, BACKOFF_BASE * 2]
+    assert breaker.failures == 0
+
+
+def test_rate_limits_wait_as_long_as_retry_after_says(monkeypatch, sleeps):
+    result, _, _, _ = call(monkeypatch, [Response(429, {"Retry-After": "2"}), Response(200, body={})])
+
+    assert result == {}
+    assert sleeps == [2.0]
+
+
+def test_a_bad_request_is_not_retried_and_does_not_count_against_the_backend(monkeypatch, sleeps):
+    _, error, session, breaker = call(monkeypatch, [Response(400)])
+
+    assert "HTTP 400" in str(error)
+    assert session.posts == 1 and sleeps == []
+    assert breaker.failures == 0
+
+
+def test_giving_up_after_the_retries_counts_one_failure(monkeypatch, sleeps):
+    _, error, session, breaker = call(monkeypatch, [aiohttp.ClientConnectionError()] * 3, max_retries=2)
+
+    assert "can't connect" in str(error)
+    assert session.posts == 3
+    assert sleeps == [BACKOFF_BASE, BACKOFF_BASE * 2]
+    assert breaker.failures == 1
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import pytest
+
+import llm_backend
+import metrics
+import scheduler
+from llm_router import SMALL, LLMRouter
+from scheduler import LLMScheduler
+
+TOKEN_SECONDS = 0.02
+LAG_PROBE_INTERVAL = 0.01
+
+
+def slow_route():
+    """A model that streams one token per word of the prompt, TOKEN_SECONDS apart."""
+    async def generate(prompt):
+        yield "<think>stub</think>"
+        for _ in prompt.split():
+            await asyncio.sleep(TOKEN_SECONDS)
+            yield "tok "
+
+    return llm_backend._route("slow", SMALL, lambda prompt: lambda mode, reasoning=None: generate(prompt),
+                              scheduler=LLMScheduler(2), expected_latency=1.0)
+
+
+async def max_lag(stop):
+    """How late, at most, a LAG_PROBE_INTERVAL timer fired until stop is set."""
+    worst = 0.0
+    while not stop.is_set():
+        began = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        worst = max(worst, time.perf_counter() - began - LAG_PROBE_INTERVAL)
+    return worst
+
+
+def test_a_second_command_finishes_while_the_first_is_generating(monkeypatch):
+    monkeypatch.setattr(llm_backend, "router", LLMRouter([slow_route()]))
+    finished = []
+
+    async def command(name, prompt):
+        answer = await llm_backend.chat(prompt)
+        finished.append(name)
+        return answer
+
+    async def scenario():
+        stop = asyncio.Event()
+        lag = asyncio.create_task(max_lag(stop))
+        long = asyncio.create_task(command("long", "word " * 50))  # About a second of tokens
+        await asyncio.sleep(TOKEN_SECONDS * 2)
+        short = await command("short", "two words")
+        still_generating = not long.done()
+        answers = (await long, short)
+        stop.set()
+        return still_generating, answers, await lag
+
+    still_generating, (long_answer, short_answer), lag = asyncio.run(scenario())
+
+    assert finished == ["short", "long"]
+    assert still_generating
+    assert long_answer == "tok " * 49 + "tok"
+    assert short_answer == "tok tok"
+    assert lag < 0.1
+
+
+def test_capped_reasoning_is_continued_not_asked_again(monkeypatch):
+    monkeypatch.setattr(llm_backend, "REASONING", "capped")
+    monkeypatch.setattr(llm_backend, "THINK_TOKEN_BUDGET", 4)
+    calls = []
+
+    async def generate(mode, reasoning=None):
+        calls.append((mode, reasoning))
+        if reasoning is None:
+            yield "<think>"
+            for n in range(100):  # Would go on well past the budget
+                yield f"step {n} "
+        yield "The answer."
+
+    answer = asyncio.run(llm_backend.answer(generate))
+
+    assert answer == "The answer."
+    assert len(calls) == 2
+    # Everything up to the piece that went over 16 characters of reasoning
+    assert calls[1] == ("capped", "<think>step 0 step 1 step 2 step 3 ")
+
+
+def test_continuation_closes_the_reasoning_in_an_assistant_message(monkeypatch):
+    payloads = []
+
+    async def stream_json(path, payload):
+        payloads.append(payload)
+        yield {"message": {"content": "The answer."}, "done": True}
+
+    monkeypatch.setattr(llm_backend.OLLAMA, "stream_json", stream_json)
+
+    async def collect():
+        return [piece async for piece in llm_backend.ollama_stream_chat("Why?", "r1", "capped", reasoning="<think>Because")]
+
+    assert asyncio.run(collect()) == ["The answer."]
+    messages = payloads[0]["messages"]
+    assert messages[-1] == {"role": "assistant", "content": "<think>Because\n</think>\n\n"}
+    assert "think" not in payloads[0]
+    assert payloads[0]["options"]["num_predict"] == llm_backend.ANSWER_TOKEN_BUDGET
+
+
+def test_saved_reasoning_is_measured_against_sampled_full_generations(monkeypatch):
+    monkeypatch.setattr(llm_backend, "REASONING", "off")
+    monkeypatch.setattr(llm_backend, "generation_stats", llm_backend.GenerationStats(baseline_every=3))
+    modes = []
+
+    async def generate(mode, reasoning=None):
+        modes.append(mode)
+        if mode == "full":
+            yield "<think>" + "x" * 400 + "</think>"  # 100 tokens of reasoning
+            await asyncio.sleep(0.05)
+        yield "The answer."
+
+    async def scenario():
+        scheduler.current_request.set(scheduler.RequestInfo(command="baseline_test"))
+        for _ in range(5):
+            await llm_backend.answer(generate)
+
+    before = metrics.LLM_REASONING_TOKENS_SAVED.value(command="baseline_test")
+    asyncio.run(scenario())
+
+    stats = llm_backend.generation_stats.snapshot()["baseline_test"]
+    assert modes == ["off", "off", "full", "off", "off"]
+    assert stats["baseline_calls"] == 1
+    # Only the two calls after the baseline count as saving anything
+    assert stats["saved_tokens"] == 2 * 100
+    assert stats["saved_seconds"] == pytest.approx(2 * stats["baseline_seconds"], abs=0.01)
+    assert metrics.LLM_REASONING_TOKENS_SAVED.value(command="baseline_test") - before == 200
+    assert metrics.LLM_REASONING_SECONDS_SAVED.value(command="baseline_test") > 0
@@ -0,0 +1,130 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import llm_cache
+import metrics
+from http_client import BackendUnavailable
+from llm_cache import DELETE_EXPIRED, ResponseCache
+
+
+def test_identical_requests_share_one_generation():
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(cache.get_or_generate("key", generate) for _ in range(3)))
+        assert results == ["answer"] * 3
+        assert len(calls) == 1
+        assert cache.stats()["shared"] == 2
+        assert await cache.get_or_generate("key", generate) == "answer"
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiters_generate_themselves_when_the_owner_is_cancelled():
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+            return "never"
+
+        async def quick():
+            return "answer"
+
+        owner = asyncio.create_task(cache.get_or_generate("key", slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_generate("key", quick))
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        assert await waiter == "answer"
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+
+    asyncio.run(scenario())
+
+
+def test_waiters_take_over_when_the_streaming_owner_stops_early():
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+
+        async def tokens():
+            for token in ("a", "b", "c"):
+                await asyncio.sleep(0.01)
+                yield token
+
+        owner = cache.stream_or_generate("key", tokens)
+        assert await owner.__anext__() == "a"
+        waiter = asyncio.create_task(cache.get_or_generate("key", lambda: asyncio.sleep(0, "whole answer")))
+        await asyncio.sleep(0)
+        await owner.aclose()  # Stops reading after the first token
+
+        assert await waiter == "whole answer"
+
+    asyncio.run(scenario())
+
+
+def test_waiters_get_the_owners_failure():
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise BackendUnavailable("Ollama is unavailable")
+
+        results = await asyncio.gather(*(cache.get_or_generate("key", failing) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(result, BackendUnavailable) for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_lookups_are_exported_as_hits_shares_and_misses():
+    def lookups():
+        return {result: metrics.LLM_CACHE_LOOKUPS.value(result=result) for result in ("hit", "shared", "miss")}
+
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+
+        async def generate():
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        await asyncio.gather(*(cache.get_or_generate("key", generate) for _ in range(2)))
+        await cache.get_or_generate("key", generate)
+
+    before = lookups()
+    asyncio.run(scenario())
+    after = lookups()
+
+    assert {result: after[result] - before[result] for result in after} == {"hit": 1, "shared": 1, "miss": 1}
+
+
+def test_the_disk_tier_keeps_at_most_disk_max_entries_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "PURGE_EVERY", 5)
+    path = str(tmp_path / "llm_cache.db")
+
+    async def scenario():
+        cache = ResponseCache(disk_path=path, disk_max_entries=3)
+        for n in range(10):
+            await cache.put(f"key{n}", f"answer {n}")
+        await cache._disk.close()
+
+    asyncio.run(scenario())
+    conn = sqlite3.connect(path)
+    keys = [key for key, in conn.execute("SELECT key FROM llm_cache ORDER BY expires_at")]
+    plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {DELETE_EXPIRED}", (0,)))
+    conn.close()
+
+    assert keys == ["key7", "key8", "key9"]
+    assert "llm_cache_expires" in plan, plan
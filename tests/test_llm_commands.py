@@ -0,0 +1,60 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import discord
+
+import cogs.llm
+
+
+class Sent:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+        return self
+
+
+class Progress:
+    async def edit(self, **kwargs):
+        raise discord.HTTPException(SimpleNamespace(status=401, reason="Unauthorized"), "Invalid Webhook Token")
+
+
+def test_a_batch_that_outlasts_the_interaction_reports_in_the_channel(monkeypatch):
+    followup, channel = Sent(), Sent()
+
+    async def send_followup(content=None, wait=False, **kwargs):
+        await followup.send(content, **kwargs)
+        return Progress()
+
+    async def defer():
+        pass
+
+    async def review_batch(texts, on_progress=None):
+        for done in range(1, len(texts) + 1):
+            await on_progress(done, len(texts))
+        return [f"Review of {text}" for text in texts]
+
+    async def group_users(guild_id, guild_name, group):
+        return [("u1", "sam"), ("u2", "kim")]
+
+    async def submissions(guild_id):
+        return {"u1": "sam's work", "u2": "kim's work"}
+
+    monkeypatch.setattr(cogs.llm, "review_batch", review_batch)
+    interaction = SimpleNamespace(
+        created_at=discord.utils.utcnow() - datetime.timedelta(minutes=14, seconds=50),
+        guild=SimpleNamespace(id=1, name="guild"), guild_id=1, user=SimpleNamespace(id=7, mention="<@7>"),
+        command=None, channel=channel, response=SimpleNamespace(defer=defer),
+        followup=SimpleNamespace(send=send_followup),
+    )
+    interaction.expires_at = interaction.created_at + datetime.timedelta(minutes=15)
+    bot = SimpleNamespace(store=SimpleNamespace(group_users=group_users, submissions=submissions))
+
+    asyncio.run(cogs.llm.LLM.batch_review.callback(cogs.llm.LLM(bot), interaction, group="team"))
+
+    assert followup.messages == ["Reviewing 2 submissions from group team..."]
+    assert len(channel.messages) == 1
+    assert channel.messages[0].startswith("<@7> **Batch review of group team:** 2 reviewed")
+    assert "Review of kim's work" in channel.messages[0]
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from http_client import BackendUnavailable
+from llm_router import LARGE, SMALL, LLMRouter, MockBackend, Route
+from scheduler import LLMScheduler
+
+SHORT_PROMPT = "What makes a good code review?"
+
+
+def mock_route(name, size=SMALL, latency=0.001, failure_rate=0.0, chat=None, expected_latency=1.0):
+    backend = MockBackend(name, latency=latency, failure_rate=failure_rate, seed=1)
+    route = Route(name, size, chat or backend.chat, backend.stream_chat, breaker=backend.breaker,
+                  scheduler=LLMScheduler(2), expected_latency=expected_latency)
+    route.backend = backend
+    return route
+
+
+def test_falls_back_when_a_backend_is_unavailable():
+    down = mock_route("down", failure_rate=1.0, expected_latency=0.1)
+    up = mock_route("up", expected_latency=1.0)
+    router = LLMRouter([down, up])
+
+    answer = asyncio.run(router.chat(SHORT_PROMPT))
+
+    assert answer.endswith(f"up read {len(SHORT_PROMPT)} characters.")
+    assert (down.calls, down.failures, up.calls) == (1, 1, 1)
+    assert router.fallbacks == 1
+
+
+def test_falls_back_when_a_backend_times_out():
+    slow_backend = MockBackend("slow", latency=1.0, seed=1)
+    slow = mock_route("slow", chat=lambda prompt: asyncio.wait_for(slow_backend.chat(prompt), 0.01), expected_latency=0.1)
+    fast = mock_route("fast", expected_latency=1.0)
+    router = LLMRouter([slow, fast])
+
+    answer = asyncio.run(router.chat(SHORT_PROMPT))
+
+    assert "fast read" in answer
+    assert slow.failures == 1
+    assert router.fallbacks == 1
+
+
+def test_stream_falls_back_before_any_output():
+    down = mock_route("down", failure_rate=1.0, expected_latency=0.1)
+    up = mock_route("up", expected_latency=1.0)
+    router = LLMRouter([down, up])
+
+    async def collect():
+        return "".join([piece async for piece in router.stream_chat(SHORT_PROMPT)])
+
+    assert asyncio.run(collect()).endswith(f"up read {len(SHORT_PROMPT)} characters.")
+    assert down.failures == 1
+
+
+def test_gives_up_with_backend_unavailable_when_every_route_fails():
+    router = LLMRouter([mock_route("a", failure_rate=1.0), mock_route("b", failure_rate=1.0)])
+
+    with pytest.raises(BackendUnavailable):
+        asyncio.run(router.chat(SHORT_PROMPT))
+
+
+def test_candidates_ordered_by_p95_latency():
+    slow, fast, medium = mock_route("slow"), mock_route("fast"), mock_route("medium")
+    slow.latencies.extend([0.1] * 18 + [5.0] * 2)  # Fast on average, but its p95 is 5 s
+    fast.latencies.extend([0.2] * 20)
+    medium.latencies.extend([1.0] * 20)
+    router = LLMRouter([slow, fast, medium])
+
+    assert [route.name for route in router.candidates(SHORT_PROMPT)] == ["fast", "medium", "slow"]
+
+
+def test_candidates_account_for_queued_calls():
+    idle, busy = mock_route("idle"), mock_route("busy")
+    idle.latencies.extend([1.0] * 20)
+    busy.latencies.extend([0.5] * 20)
+    busy.scheduler.in_flight = 2
+    busy.scheduler.waiting = 2  # 0.5 s * (1 + 4 / 2) = 1.5 s expected
+
+    assert [route.name for route in LLMRouter([busy, idle]).candidates(SHORT_PROMPT)] == ["idle", "busy"]
+
+
+def test_candidates_prefer_the_model_size_that_fits_the_prompt():
+    small, large = mock_route("small", SMALL), mock_route("large", LARGE)
+    small.latencies.extend([2.0] * 20)
+    large.latencies.extend([1.0] * 20)  # Faster, but not SIZE_MISMATCH_PENALTY times faster
+    router = LLMRouter([large, small])
+
+    assert router.candidates(SHORT_PROMPT)[0] is small
+    assert router.candidates("word " * 1000)[0] is large
+
+
+def test_routes_with_an_open_circuit_are_skipped():
+    broken = mock_route("broken", expected_latency=0.1)
+    working = mock_route("working", expected_latency=1.0)
+    for _ in range(broken.backend.breaker.failure_threshold):
+        broken.backend.breaker.record_failure()
+    assert broken.backend.breaker.state == "open"
+    router = LLMRouter([broken, working])
+
+    assert [route.name for route in router.candidates(SHORT_PROMPT)] == ["working", "broken"]
+    assert "working read" in asyncio.run(router.chat(SHORT_PROMPT))
+    assert broken.calls == 0
+    assert router.fallbacks == 0
@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+import main
+import metrics
+
+
+def make_bot(monkeypatch, record_path=None):
+    if record_path is not None:
+        monkeypatch.setenv("GATEWAY_RECORD", str(record_path))
+    monkeypatch.setattr(main.metrics, "METRICS_PORT", 0)
+    return main.Bot([])
+
+
+def test_handled_errors_are_recorded_as_errors(monkeypatch):
+    bot = make_bot(monkeypatch)
+    backend_up = True
+
+    @commands.command()
+    async def flaky(ctx):
+        try:
+            if not backend_up:
+                raise RuntimeError("backend down")
+        except RuntimeError:
+            metrics.command_failed(ctx)
+            # ...and tell the user, without raising
+
+    bot.add_command(flaky)
+
+    def invoke():
+        message = SimpleNamespace(content="!flaky", author=SimpleNamespace(id=1), guild=None, attachments=[],
+                                  channel=None, _state=bot._connection)
+        ctx = commands.Context(message=message, bot=bot, view=commands.view.StringView(""),
+                               prefix="!", invoked_with="flaky", command=flaky)
+        asyncio.run(bot.invoke(ctx))
+
+    invoke()
+    backend_up = False
+    invoke()
+
+    assert metrics.COMMAND_SECONDS.count(command="flaky", kind="prefix", status="error") == 1
+    assert metrics.COMMAND_SECONDS.count(command="flaky", kind="prefix", status="ok") == 1
+
+
+def test_handled_slash_errors_are_recorded_as_errors(monkeypatch):
+    bot = make_bot(monkeypatch)
+    command = SimpleNamespace(qualified_name="flaky_slash")
+    failed = SimpleNamespace(extras={}, created_at=discord.utils.utcnow())
+    metrics.command_failed(failed)
+
+    asyncio.run(bot.on_app_command_completion(failed, command))
+    asyncio.run(bot.on_app_command_completion(SimpleNamespace(extras={}, created_at=discord.utils.utcnow()), command))
+
+    assert metrics.COMMAND_SECONDS.count(command="flaky_slash", kind="slash", status="error") == 1
+    assert metrics.COMMAND_SECONDS.count(command="flaky_slash", kind="slash", status="ok") == 1
+
+
+def test_close_closes_the_gateway_record(monkeypatch, tmp_path):
+    bot = make_bot(monkeypatch, tmp_path / "events.jsonl")
+    record = bot._record
+
+    async def disconnect(self):
+        pass  # Never connected: there are no shards to close
+
+    monkeypatch.setattr(commands.AutoShardedBot, "close", disconnect)
+
+    asyncio.run(bot.close())
+
+    assert record.closed
+    assert bot._record is None
+
+
+def test_setup_hook_opens_the_store_and_close_closes_every_database(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "thoughts.txt").write_text("user sam: from the old bot\n")
+    bot = make_bot(monkeypatch)
+    bot.cog_names = ["groups", "scheduling"]
+
+    async def sync(guild=None):
+        return []
+
+    async def disconnect(self):
+        pass  # Never connected: there are no shards to close
+
+    monkeypatch.setattr(bot.tree, "sync", sync)
+    monkeypatch.setattr(discord.AutoShardedClient, "close", disconnect)
+
+    async def scenario():
+        await bot.setup_hook()
+        store, scheduling = bot.store, bot.get_cog("Scheduling")
+        imported = await store.thought_author("g1", "sam")
+        await bot.close()
+        return store, scheduling, imported
+
+    store, scheduling, imported = asyncio.run(scenario())
+
+    assert imported == (True, None)
+    assert bot.store is None
+    assert store.db._writer._shutdown and scheduling.db._writer._shutdown
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+
+import metrics
+from media_cache import MediaCache
+
+
+def lookups():
+    return {result: metrics.MEDIA_CACHE_LOOKUPS.value(result=result) for result in ("url_hit", "file_hit", "miss")}
+
+
+def download(tmp_path, name, size=100):
+    path = tmp_path / f"{name}.mp4"
+    path.write_bytes(b"v" * size)
+    return str(path)
+
+
+def test_lookups_are_counted_as_misses_file_hits_and_url_hits(tmp_path):
+    cache = MediaCache(str(tmp_path / "cache"))
+    expires = format(int(time.time()) + 3600, "x")
+
+    async def scenario():
+        await cache.lookup("abc")
+        await cache.add("abc", download(tmp_path, "abc"))
+        _, path = await cache.lookup("abc")
+        await cache.remember_attachment("abc", f"https://cdn.discordapp.com/abc.mp4?ex={expires}")
+        url, _ = await cache.lookup("abc")
+        await cache.db.close()
+        return path, url
+
+    before = lookups()
+    path, url = asyncio.run(scenario())
+    after = lookups()
+
+    assert path.endswith("abc.mp4")
+    assert url.startswith("https://cdn.discordapp.com/abc.mp4")
+    assert {result: after[result] - before[result] for result in after} == {"url_hit": 1, "file_hit": 1, "miss": 1}
+    assert cache.stats()["hit_rate"] == 2 / 3
+
+
+def test_eviction_skips_videos_that_are_being_sent(tmp_path):
+    cache = MediaCache(str(tmp_path / "cache"), max_bytes=250)
+
+    async def scenario():
+        first = await cache.add("a", download(tmp_path, "a"))
+        await cache.add("b", download(tmp_path, "b"))
+        async with cache.pinned("a"):
+            await cache.add("c", download(tmp_path, "c"))  # Over the limit: "a" is oldest but pinned
+        entries = list(cache._entries)
+        await cache.db.close()
+        return first, entries
+
+    first, entries = asyncio.run(scenario())
+
+    assert entries == ["a", "c"]
+    assert os.path.exists(first)
+    assert not os.path.exists(str(tmp_path / "cache" / "b.mp4"))
+    assert cache.total_bytes == 200
+
+
+def test_concurrent_misses_share_one_download(tmp_path):
+    cache = MediaCache(str(tmp_path / "cache"))
+    downloads = []
+
+    async def fetch():
+        downloads.append("abc")
+        await asyncio.sleep(0.05)
+        return await cache.add("abc", download(tmp_path, "abc"))
+
+    async def scenario():
+        paths = await asyncio.gather(*(cache.fetch("abc", fetch) for _ in range(3)))
+        await cache.db.close()
+        return paths
+
+    paths = asyncio.run(scenario())
+
+    assert downloads == ["abc"]
+    assert len(set(paths)) == 1 and paths[0].endswith("abc.mp4")
+
+
+def test_a_waiter_downloads_when_the_first_download_is_cancelled(tmp_path):
+    cache = MediaCache(str(tmp_path / "cache"))
+    downloads = []
+
+    async def fetch():
+        downloads.append("abc")
+        await asyncio.sleep(0.05)
+        return await cache.add("abc", download(tmp_path, f"abc{len(downloads)}"))
+
+    async def scenario():
+        first = asyncio.create_task(cache.fetch("abc", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.fetch("abc", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        path = await second
+        await cache.db.close()
+        return path
+
+    path = asyncio.run(scenario())
+
+    assert downloads == ["abc", "abc"]
+    assert path.endswith("abc.mp4")
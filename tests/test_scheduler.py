@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+
+from scheduler import MAX_SHORT_STREAK, SHORT_PROMPT_TOKENS, DeadlineExceeded, LLMScheduler, RequestInfo, current_request
+
+SHORT_PROMPT = "word " * 10
+LONG_PROMPT = "x" * (SHORT_PROMPT_TOKENS * 4 + 4)
+
+
+def test_cancelled_while_announcing_queue_position_releases_nothing():
+    async def scenario():
+        scheduler = LLMScheduler(1)
+        announcing = asyncio.Event()
+
+        async def on_position(position):
+            announcing.set()
+            await asyncio.sleep(10)  # A Discord send that never finishes
+
+        async def hold(release):
+            async with scheduler.slot():
+                await release.wait()
+
+        async def queued():
+            current_request.set(RequestInfo(on_position=on_position))
+            async with scheduler.slot():
+                pass
+
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(queued())
+        await announcing.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        release.set()
+        await holder
+        # The cancelled job must not have been handed the freed slot
+        assert scheduler.in_flight == 0
+        async with scheduler.slot():
+            assert scheduler.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiters_are_served_in_turn():
+    async def scenario():
+        scheduler = LLMScheduler(1)
+        order = []
+
+        async def call(name):
+            async with scheduler.slot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call(name) for name in "abc"))
+        assert order == ["a", "b", "c"]
+        assert (scheduler.in_flight, scheduler.waiting) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+async def queue_behind_one_call(scheduler, calls, hold=0.0):
+    """
+    Queues calls (name, RequestInfo, prompt), in the order given, behind a
+    first call that holds the only slot for hold seconds. Returns the names
+    in the order they got the slot and what each one raised.
+    """
+    order, errors = [], {}
+    release = asyncio.Event()
+
+    async def first():
+        async with scheduler.slot():
+            await release.wait()
+
+    async def call(name, request, prompt):
+        current_request.set(request)
+        try:
+            async with scheduler.slot(prompt):
+                order.append(name)
+        except DeadlineExceeded as e:
+            errors[name] = e
+
+    holder = asyncio.create_task(first())
+    await asyncio.sleep(0)
+    tasks = []
+    for name, request, prompt in calls:
+        tasks.append(asyncio.create_task(call(name, request, prompt)))
+        await asyncio.sleep(0)  # Queued in this order
+    await asyncio.sleep(hold)
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order, errors
+
+
+def test_guilds_take_turns_and_are_told_their_real_place():
+    positions = {}
+
+    def request(name, guild_id):
+        async def on_position(position):
+            positions[name] = position
+        return RequestInfo(guild_id=guild_id, user_id=guild_id, on_position=on_position)
+
+    calls = [("a1", request("a1", 1), ""), ("a2", request("a2", 1), ""), ("a3", request("a3", 1), ""),
+             ("b1", request("b1", 2), "")]
+    order, _ = asyncio.run(queue_behind_one_call(LLMScheduler(1), calls))
+
+    assert order == ["a1", "b1", "a2", "a3"]
+    # Fourth in line by arrival, but served second
+    assert positions == {"a1": 1, "a2": 2, "a3": 3, "b1": 2}
+
+
+def test_short_prompts_go_first_but_long_ones_still_get_through():
+    calls = [("long", RequestInfo(), LONG_PROMPT)]
+    calls += [(f"short{n}", RequestInfo(), SHORT_PROMPT) for n in range(MAX_SHORT_STREAK + 1)]
+    order, _ = asyncio.run(queue_behind_one_call(LLMScheduler(1), calls))
+
+    assert order == [f"short{n}" for n in range(MAX_SHORT_STREAK)] + ["long", f"short{MAX_SHORT_STREAK}"]
+
+
+def test_work_whose_deadline_passed_while_queued_is_dropped():
+    calls = [("stale", RequestInfo(deadline=time.time() + 0.05), ""), ("fresh", RequestInfo(), "")]
+    order, errors = asyncio.run(queue_behind_one_call(LLMScheduler(1), calls, hold=0.1))
+
+    assert order == ["fresh"]
+    assert isinstance(errors["stale"], DeadlineExceeded)
+
+
+def test_work_already_past_its_deadline_never_queues():
+    async def scenario():
+        current_request.set(RequestInfo(deadline=time.time() - 1))
+        async with LLMScheduler(1).slot():
+            pass
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
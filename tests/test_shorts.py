@@ -0,0 +1,167 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import cogs.shorts
+import shorts
+from benchmarks import fake_yt_dlp
+
+MB = fake_yt_dlp.MB
+FAKE_YT_DLP = os.path.abspath(fake_yt_dlp.__file__)
+URL = "https://www.youtube.com/shorts/{}"
+
+
+ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("text", [
+    f"https://youtu.be/{ID}",
+    f"https://www.youtube.com/shorts/{ID}",
+    f"https://m.youtube.com/shorts/{ID}",
+    f"youtube.com/shorts/{ID}",
+    f"YOUTUBE.COM/SHORTS/{ID}",
+    f"https://youtu.be/{ID}?si=Ab12Cd34",
+    f"https://www.youtube.com/shorts/{ID}?feature=share&t=3",
+    f"look <https://youtube.com/shorts/{ID}>!",
+])
+def test_find_shorts_accepts_both_link_forms_with_or_without_a_query(text):
+    assert shorts.find_shorts(text) == [(ID, URL.format(ID))]
+
+
+@pytest.mark.parametrize("text", [
+    f"https://www.youtube.com/watch?v={ID}",
+    f"https://youtube.com/shorts/{ID}x",  # Twelve characters is no video id
+    "https://youtube.com/shorts/short",
+    "talking about /shorts/ and youtu.be/ in general",
+    "",
+])
+def test_find_shorts_ignores_everything_else(text):
+    assert shorts.find_shorts(text) == []
+
+
+def test_find_shorts_returns_each_video_of_a_message_once_in_order():
+    text = "first youtu.be/aaaaaaaaaaa, then https://youtube.com/shorts/bbbbbbbbbbb?feature=share and youtu.be/aaaaaaaaaaa again"
+
+    assert shorts.find_shorts(text) == [("aaaaaaaaaaa", URL.format("aaaaaaaaaaa")), ("bbbbbbbbbbb", URL.format("bbbbbbbbbbb"))]
+
+
+def test_choose_format_picks_the_best_pair_that_fits():
+    formats = fake_yt_dlp.formats_for("abc")
+
+    # 137+140 is exactly 25MB, but 251's bitrate estimate is smaller and better
+    assert shorts.choose_format(formats, fake_yt_dlp.DURATION) == ("137+251", 24 * MB + 160 * 1000 // 8 * 45)
+    assert shorts.choose_format(formats, fake_yt_dlp.DURATION, limit=10 * MB) == ("22", 9 * MB)
+
+
+def test_choose_format_counts_a_size_at_the_limit_as_fitting():
+    formats = fake_yt_dlp.formats_for("abc")
+
+    # Without a duration 251 has no size, leaving 137+140 at exactly the limit
+    assert shorts.choose_format(formats) == ("137+140", 25 * MB)
+
+
+def test_choose_format_reports_the_smallest_size_when_nothing_fits():
+    assert shorts.choose_format(fake_yt_dlp.formats_for("big"), fake_yt_dlp.DURATION) == (None, 30 * MB)
+
+
+def test_choose_format_without_any_sizes():
+    formats = [{"format_id": "18", "vcodec": "avc1", "acodec": "mp4a", "height": 360}]
+
+    assert shorts.choose_format(formats, fake_yt_dlp.DURATION) == (None, None)
+    assert shorts.choose_format([]) == (None, None)
+
+
+def downloader(**kwargs):
+    kwargs.setdefault("yt_dlp", FAKE_YT_DLP)
+    downloader = shorts.ShortsDownloader(**kwargs)
+    downloader.runs = 0
+    run = downloader._run
+
+    async def counted(args):
+        downloader.runs += 1
+        return await run(args)
+
+    downloader._run = counted
+    return downloader
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="runs fake_yt_dlp.py as an executable")
+def test_probe_chooses_a_format_and_caches_it():
+    d = downloader()
+
+    async def scenario():
+        first = await d.probe("abc", URL.format("abc"))
+        again = await d.probe("abc", URL.format("abc"))
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert first == again == ("137+251", 24 * MB + 160 * 1000 // 8 * 45)
+    assert d.runs == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="runs fake_yt_dlp.py as an executable")
+def test_probe_raises_video_too_large_every_time():
+    d = downloader()
+
+    for _ in range(2):
+        with pytest.raises(shorts.VideoTooLarge, match="about 30MB"):
+            asyncio.run(d.probe("big1", URL.format("big1")))
+    assert d.runs == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="runs fake_yt_dlp.py as an executable")
+def test_probe_failures_raise_download_error_and_are_not_cached():
+    d = downloader()
+
+    for _ in range(2):
+        with pytest.raises(shorts.DownloadError, match="Video unavailable"):
+            asyncio.run(d.probe("fail1", URL.format("fail1")))
+    assert d.runs == 2
+    assert "fail1" not in d._probes
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="runs echo as yt-dlp")
+def test_probe_rejects_unreadable_metadata():
+    d = downloader(yt_dlp="echo")
+
+    with pytest.raises(shorts.DownloadError, match="unreadable metadata"):
+        asyncio.run(d.probe("abc", URL.format("abc")))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="runs fake_yt_dlp.py as an executable")
+def test_probe_times_out(monkeypatch):
+    monkeypatch.setenv("FAKE_YT_DLP_DELAY", "5")
+    d = downloader(timeout=0.2)
+
+    with pytest.raises(shorts.DownloadError, match="longer than 0.2s"):
+        asyncio.run(d.probe("abc", URL.format("abc")))
+
+
+def test_a_short_in_someone_elses_message_is_sent_without_manage_messages(monkeypatch):
+    monkeypatch.setattr(cogs.shorts.media_cache, "MediaCache", lambda: None)
+    cog = cogs.shorts.Shorts(bot=None)
+    sent, edits = [], []
+
+    async def send_short(channel, video_id, url):
+        sent.append(video_id)
+
+    async def send(content):
+        pass
+
+    async def edit(**kwargs):
+        edits.append(kwargs)
+        raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+
+    cog.send_short = send_short
+    message = SimpleNamespace(author=SimpleNamespace(bot=False, mention="<@1>"), content=URL.format(ID),
+                              channel=SimpleNamespace(send=send), edit=edit)
+
+    asyncio.run(cog.on_message(message))
+
+    assert edits == [{"suppress": True}]
+    assert sent == [ID]
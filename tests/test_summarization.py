@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from summarization import estimate_tokens, split_text
+
+
+@pytest.mark.parametrize("max_tokens", [1, 2, 10, 100, 1000])
+def test_hard_split_chunks_fit_the_budget(max_tokens):
+    # No separators at all, so the text can only be cut at a fixed size
+    chunks = split_text("x" * (max_tokens * 37 + 5), max_tokens)
+    assert "".join(chunks) == "x" * (max_tokens * 37 + 5)
+    assert max(estimate_tokens(chunk) for chunk in chunks) <= max_tokens
+
+
+def test_random_text_chunks_fit_the_budget():
+    rng = random.Random(7)
+    alphabet = "abcdefghij" * 5 + " " * 8 + "\n" + "." * 2
+    for _ in range(200):
+        max_tokens = rng.randint(1, 120)
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3000))) + "a"
+        chunks = split_text(text, max_tokens)
+        assert all(estimate_tokens(chunk) <= max_tokens for chunk in chunks), max_tokens
+
+
+def test_splits_on_paragraphs_first():
+    paragraphs = ["word " * 60, "other " * 60, "third " * 60]
+    assert split_text("\n\n".join(paragraphs), max_tokens=100) == paragraphs